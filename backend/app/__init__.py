@@ -25,12 +25,26 @@ def create_app(config_class=Config):
     migrate.init_app(app, db)
     CORS(app)
     
+    # Resolve JWT identities to cached users
+    from .utils.user_cache import init_user_cache
+    init_user_cache(app)
+    
+    # Per-request latency, SQL and payload metrics, served on /metrics
+    from .utils.metrics import init_metrics
+    init_metrics(app)
+    
+    # Opt-in cProfile of requests sending a signed token, or a random sample
+    from .utils.profiling import init_profiling
+    init_profiling(app)
+    
     # Import and register blueprints
     from .routes import main_bp
     app.register_blueprint(main_bp)
     
-    # Create database tables if they don't exist
-    with app.app_context():
-        db.create_all()
-        
+    # Register CLI commands
+    from .cli import register_commands
+    register_commands(app)
+    
+    # The schema is managed by migrations ('flask db upgrade') or, for a
+    # throwaway database, 'flask init-db'; nothing touches it at boot
     return app
@@ -0,0 +1,79 @@
+import click
+from flask.cli import AppGroup
+from app import db
+from app.models.attendance_rollup import AttendanceDailyRollup
+
+rollups_cli = AppGroup('rollups', help='Maintain the daily attendance rollup counters.')
+reports_cli = AppGroup('reports', help='Generate attendance reports.')
+
+
+@rollups_cli.command('rebuild')
+def rebuild_rollups():
+    """Recompute every rollup counter from raw attendance."""
+    with db.engine.begin() as connection:
+        count = AttendanceDailyRollup.rebuild(connection)
+    click.echo(f'Rebuilt {count} rollup rows.')
+
+
+@rollups_cli.command('check')
+@click.option('--limit', default=100, show_default=True, help='Maximum mismatches to report in each direction.')
+def check_rollups(limit):
+    """Compare the rollup counters against raw attendance."""
+    with db.engine.connect() as connection:
+        result = AttendanceDailyRollup.find_inconsistencies(connection, limit=limit)
+    
+    if not result['missing'] and not result['unexpected']:
+        click.echo('Rollups are consistent with raw attendance.')
+        return
+    
+    for row in result['missing']:
+        click.echo(f'missing or wrong counter for raw group {row}')
+    for row in result['unexpected']:
+        click.echo(f'counter {row} does not match raw attendance')
+    raise SystemExit(1)
+
+
+@click.command('init-db')
+def init_db():
+    """Create any missing tables and mark the database as up to date with the migrations."""
+    from flask_migrate import stamp
+    
+    db.create_all()
+    stamp()
+    click.echo('Database initialized.')
+
+
+@reports_cli.command('cohort')
+@click.argument('output', type=click.Path(dir_okay=False, writable=True))
+@click.option('--subject-id', type=int, help='Only students with attendance in this subject, and only that subject.')
+@click.option('--start-date', type=click.DateTime(formats=['%Y-%m-%d']), help='Start of the report period.')
+@click.option('--end-date', type=click.DateTime(formats=['%Y-%m-%d']), help='End of the report period.')
+@click.option('--workers', type=int, help='Rendering processes; defaults to COHORT_REPORT_WORKERS.')
+def cohort_reports(output, subject_id, start_date, end_date, workers):
+    """Write one PDF per student in a cohort to a zip archive."""
+    from app.utils.cohort_reports import build_cohort_archive
+    
+    with click.progressbar(length=0, label='Rendering reports') as bar:
+        def progress(done, total):
+            bar.length = total
+            bar.update(1)
+        
+        try:
+            count = build_cohort_archive(
+                output,
+                subject_id=subject_id,
+                start_date=start_date.date() if start_date else None,
+                end_date=end_date.date() if end_date else None,
+                workers=workers,
+                progress=progress
+            )
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--subject-id')
+    click.echo(f'Wrote {count} reports to {output}.')
+
+
+def register_commands(app):
+    """Attach the maintenance commands to the Flask CLI."""
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(reports_cli)
+    app.cli.add_command(init_db)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 
 class Config:
@@ -17,6 +18,28 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key-change-in-production'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    CURRENT_USER_CACHE_SIZE = 10000  # Users whose id and role are cached per worker process
+    CURRENT_USER_CACHE_TTL_SECONDS = 60  # How long another worker may serve a stale role
+    
+    # Password hashing configuration
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))  # Existing hashes are upgraded on login when this changes
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # Threads hashing in each worker process
+    PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get('PASSWORD_HASH_QUEUE_LIMIT', 1))  # Hash calls allowed to wait; keep WORKERS + this below GUNICORN_THREADS so requests that do not hash always find a thread
+    PASSWORD_HASH_MAX_WAIT_SECONDS = float(os.environ.get('PASSWORD_HASH_MAX_WAIT_SECONDS', 1.0))  # Calls expected to queue longer than this are refused too
+    PASSWORD_HASH_RETRY_AFTER_SECONDS = 2  # Retry-After sent with those 503 responses
+    
+    # Metrics configuration
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+    METRICS_DIR = os.environ.get('METRICS_DIR')  # Shared by gunicorn workers to merge their metrics; unset serves this process only
+    METRICS_FLUSH_SECONDS = 5  # How stale another worker's metrics may be on /metrics
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # When set, /metrics requires "Authorization: Bearer <token>"; unset leaves it open
+    
+    # Request profiling configuration
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))  # Fraction of requests profiled at random; 0 profiles only token-bearing requests
+    PROFILE_TOKEN_MAX_AGE_SECONDS = 3600  # Lifetime of the tokens issued to admins
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'attendance-profiles')  # Shared by the workers on a host
+    PROFILE_MAX_FILES = 200  # Oldest profiles are deleted beyond this many
+    PROFILE_MAX_BYTES = 200 * 1024 * 1024  # ...or beyond this total size
     
     # File upload configuration
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static/uploads')
@@ -25,10 +48,34 @@ class Config:
     # Face recognition configuration
     FACE_RECOGNITION_TOLERANCE = 0.6
     FACE_RECOGNITION_MODEL = 'hog'  # 'hog' is faster, 'cnn' is more accurate but requires GPU
+    FACE_RECOGNITION_TOP_K = 3  # Number of candidate matches returned for 1:N identification
+    FACE_GALLERY_REFRESH_SECONDS = 5  # How long a face registered in another worker may go unrecognized here
     
     # Liveness detection configuration
     BLINK_THRESHOLD = 0.3
     MIN_BLINKS_REQUIRED = 2
+    BLINK_CONSEC_FRAMES = 2  # Consecutive closed-eye frames that count as one blink
+    LIVENESS_SESSION_MAX_FRAMES = 150  # Frame budget for a streaming liveness session
+    LIVENESS_SESSION_TIMEOUT_SECONDS = 30  # Time budget for a streaming liveness session
+    LIVENESS_SESSION_MAX_CHUNK_FRAMES = 10  # Maximum frames accepted per upload chunk
+    LIVENESS_POOL_WORKERS = int(os.environ.get('LIVENESS_POOL_WORKERS', 2))  # Processes per gunicorn worker; 0 or 1 disables the pool
+    LIVENESS_POOL_MIN_FRAMES = 8  # Shorter sequences are processed in-process
+    LIVENESS_POOL_TIMEOUT_SECONDS = 5  # Per-request budget before falling back to in-process extraction
     
     # Attendance configuration
+    APP_TIMEZONE = os.environ.get('APP_TIMEZONE', 'UTC')  # Zone of subject start and end times; attendance is still stored in UTC
     ATTENDANCE_WINDOW_MINUTES = 15  # Time window to mark attendance after class starts
+    TIMETABLE_REFRESH_SECONDS = 300  # Rebuild the in-memory timetable at least this often
+    ATTENDANCE_REPORT_PAGE_SIZE = 100  # Default page size for the attendance report
+    ATTENDANCE_REPORT_MAX_PAGE_SIZE = 1000  # Largest page a client may request
+    ATTENDANCE_EXPORT_BATCH_SIZE = 5000  # Rows fetched per server-side cursor batch when exporting
+    
+    # PDF report job configuration
+    REPORT_FOLDER = os.path.join(UPLOAD_FOLDER, 'reports')
+    REPORT_JOB_WORKERS = 2  # Background threads generating reports in each worker process
+    REPORT_JOB_TIMEOUT_SECONDS = 600  # Pending jobs older than this are considered lost
+    REPORT_CACHE_MAX_BYTES = 500 * 1024 * 1024  # Total size of cached report files
+    REPORT_CACHE_MAX_AGE_SECONDS = 24 * 60 * 60  # Cached reports older than this are evicted
+    REPORT_TABLE_CHUNK_ROWS = 1000  # Rows per table chunk laid out at a time in PDF reports
+    COHORT_REPORT_WORKERS = int(os.environ.get('COHORT_REPORT_WORKERS', 2))  # Processes rendering a cohort report, per job; 1 renders in-process
+    COHORT_REPORT_MIN_POOL_STUDENTS = 50  # Smaller cohorts are rendered in-process
@@ -1,50 +1,71 @@
-from flask import request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import request, jsonify, current_app, Response, stream_with_context
+from flask_jwt_extended import jwt_required, current_user
 from app import db
 from app.models.user import User
 from app.models.attendance import Attendance
 from app.models.subject import Subject
-from app.utils.pdf_generator import generate_attendance_report
-from datetime import datetime, timedelta
-import os
-import uuid
+from app.models.attendance_rollup import AttendanceDailyRollup
+from app.utils.attendance_utils import insert_attendances
+from app.utils.timetable import get_timetable, local_now
+from sqlalchemy import select, func, case, or_, and_
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta, time as dt_time
+import base64
+import binascii
+import csv
+import io
+import json
+
+VALID_STATUSES = ('present', 'absent', 'late')
 
 @jwt_required()
 def mark_attendance():
-    """Mark attendance for a user."""
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    """
+    Mark attendance for a user.
     
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
+    Without a subject_id, the subject is inferred from the timetable: the one
+    whose attendance window is open now, optionally narrowed to a teacher_id
+    (e.g. the kiosk's classroom teacher). Scheduled subjects only accept
+    attendance within ATTENDANCE_WINDOW_MINUTES of their start.
+    """
+    user_id = current_user.id
     
     # Get data from request
-    data = request.get_json()
-    
-    # Validate required fields
-    if 'subject_id' not in data:
-        return jsonify({'error': 'Subject ID is required'}), 400
-    
-    # Check if subject exists
-    subject = Subject.query.get(data['subject_id'])
-    if not subject:
-        return jsonify({'error': 'Subject not found'}), 404
+    data = request.get_json() or {}
     
-    # Check if attendance already marked for today
-    today = datetime.utcnow().date()
-    existing_attendance = Attendance.query.filter_by(
-        user_id=user_id,
-        subject_id=subject.id,
-        date=today
-    ).first()
+    # Subject times are wall-clock times in APP_TIMEZONE; the record itself
+    # keeps its UTC date and time
+    now = local_now(current_app.config.get('APP_TIMEZONE', 'UTC'))
+    window = current_app.config.get('ATTENDANCE_WINDOW_MINUTES', 15)
+    index = get_timetable(current_app.config.get('TIMETABLE_REFRESH_SECONDS', 300))
     
-    if existing_attendance:
-        return jsonify({
-            'message': 'Attendance already marked for today',
-            'attendance': existing_attendance.to_dict()
-        }), 200
+    if 'subject_id' in data:
+        # Check if subject exists
+        subject = Subject.query.get(data['subject_id'])
+        if not subject:
+            return jsonify({'error': 'Subject not found'}), 404
+        
+        if index.attendance_window_open(subject.id, now, window) is False:
+            return jsonify({'error': 'Attendance is not open for this subject right now'}), 403
+    else:
+        teacher_id = data.get('teacher_id')
+        if teacher_id is not None and not isinstance(teacher_id, int):
+            return jsonify({'error': 'Teacher ID must be an integer'}), 400
+        
+        sessions = index.open_for_attendance(now, window, teacher_id=teacher_id)
+        if not sessions:
+            return jsonify({'error': 'No subject is accepting attendance right now'}), 404
+        if len(sessions) > 1:
+            return jsonify({
+                'error': 'Several subjects are accepting attendance; specify subject_id',
+                'subject_ids': [session.subject_id for session in sessions]
+            }), 409
+        subject = db.session.get(Subject, sessions[0].subject_id)
+        if not subject:
+            return jsonify({'error': 'Subject not found'}), 404
     
-    # Create new attendance record
+    # Create new attendance record; the unique index on (user, subject, date)
+    # rejects a second record for today, so there is no read-then-write race
     try:
         attendance = Attendance(
             user_id=user_id,
@@ -61,71 +82,434 @@ def mark_attendance():
             'attendance': attendance.to_dict()
         }), 201
     
+    except IntegrityError:
+        db.session.rollback()
+        existing_attendance = Attendance.query.filter_by(
+            user_id=user_id,
+            subject_id=subject.id,
+            date=attendance.date
+        ).first()
+        if not existing_attendance:
+            return jsonify({'error': 'Could not mark attendance'}), 409
+        
+        return jsonify({
+            'message': 'Attendance already marked for today',
+            'attendance': existing_attendance.to_dict()
+        }), 200
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @jwt_required()
-def get_attendance_report():
-    """Get attendance report for a user or all users (for admin)."""
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+def mark_group_attendance():
+    """Recognize every face in a classroom photo and mark attendance for all matched students."""
+    # Deferred so that booting the app does not load numpy and OpenCV
+    from app.utils.face_recognition_utils import detect_faces, encode_faces
+    from app.utils.face_gallery import get_face_gallery
+    from app.utils.image_utils import decode_image
     
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
+    user = current_user
     
-    # Get query parameters
+    if user.role not in ('teacher', 'admin'):
+        return jsonify({'error': 'Only teachers and admins can mark group attendance'}), 403
+    
+    # Get data from request
+    data = request.get_json(silent=True) or {}
+    
+    # Validate required fields
+    if 'subject_id' not in data:
+        return jsonify({'error': 'Subject ID is required'}), 400
+    
+    if 'image' not in data:
+        return jsonify({'error': 'No image data provided'}), 400
+    
+    # Check if subject exists
+    subject = Subject.query.get(data['subject_id'])
+    if not subject:
+        return jsonify({'error': 'Subject not found'}), 404
+    
+    try:
+        # Decode the image straight into memory
+        image = decode_image(data['image'])
+        if image is None:
+            return jsonify({'error': 'Invalid image data'}), 400
+        
+        # Detect every face once, then encode them all in one batch
+        face_locations = detect_faces(image)
+        if not face_locations:
+            return jsonify({'error': 'No faces detected in the image'}), 400
+        
+        face_encodings = encode_faces(image, face_locations)
+        
+        # Match all faces against the gallery in one matrix operation
+        matches = get_face_gallery().match_many(
+            face_encodings,
+            tolerance=current_app.config['FACE_RECOGNITION_TOLERANCE']
+        )
+        recognized = {}
+        for location, match in zip(face_locations, matches):
+            if match is not None:
+                recognized[match[0]] = {
+                    'user_id': match[0],
+                    'distance': match[1],
+                    'face_location': list(location)
+                }
+        
+        # Write every new attendance record in one set-based insert and one commit;
+        # students already marked today are skipped by the unique index
+        now = datetime.utcnow()
+        inserted = insert_attendances([
+            {
+                'user_id': uid,
+                'subject_id': subject.id,
+                'date': now.date(),
+                'time': now.time(),
+                'status': data.get('status', 'present'),
+                'verification_method': 'face',
+                'liveness_verified': False
+            }
+            for uid in recognized
+        ])
+        db.session.commit()
+        
+        new_user_ids = [uid for uid in recognized if (uid, subject.id, now.date()) in inserted]
+        already_marked = [uid for uid in recognized if (uid, subject.id, now.date()) not in inserted]
+        
+        return jsonify({
+            'message': f'Attendance marked for {len(new_user_ids)} students',
+            'subject_id': subject.id,
+            'faces_detected': len(face_locations),
+            'unrecognized_faces': len(face_locations) - len(recognized),
+            'recognized': list(recognized.values()),
+            'marked': new_user_ids,
+            'already_marked': already_marked
+        }), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@jwt_required()
+def bulk_mark_attendance():
+    """Mark attendance for many students in one subject and day (roll call, manual corrections)."""
+    user = current_user
+    
+    if user.role not in ('teacher', 'admin'):
+        return jsonify({'error': 'Only teachers and admins can mark bulk attendance'}), 403
+    
+    # Get data from request
+    data = request.get_json(silent=True) or {}
+    
+    # Validate required fields
+    if 'subject_id' not in data:
+        return jsonify({'error': 'Subject ID is required'}), 400
+    
+    records = data.get('records')
+    if not isinstance(records, list) or not records:
+        return jsonify({'error': 'A non-empty list of records is required'}), 400
+    
+    # Check if subject exists
+    subject = Subject.query.get(data['subject_id'])
+    if not subject:
+        return jsonify({'error': 'Subject not found'}), 404
+    
+    now = datetime.utcnow()
+    attendance_date = now.date()
+    if data.get('date'):
+        try:
+            attendance_date = datetime.strptime(data['date'], '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+    
+    # Validate rows individually so one bad entry does not sink the batch
+    results = []
+    rows = {}
+    for record in records:
+        record_user_id = record.get('user_id') if isinstance(record, dict) else None
+        status = record.get('status', 'present') if isinstance(record, dict) else None
+        result = {'user_id': record_user_id}
+        results.append(result)
+        
+        if not isinstance(record_user_id, int) or status not in VALID_STATUSES:
+            result['outcome'] = 'invalid'
+        elif record_user_id in rows:
+            result['outcome'] = 'duplicate'
+        else:
+            rows[record_user_id] = {
+                'user_id': record_user_id,
+                'subject_id': subject.id,
+                'date': attendance_date,
+                'time': now.time(),
+                'status': status,
+                'verification_method': record.get('verification_method', 'manual'),
+                'liveness_verified': bool(record.get('liveness_verified', False))
+            }
+    
+    # Validate every referenced user with a single IN query
+    existing_users = set()
+    if rows:
+        existing_users = {
+            row.id for row in User.query.with_entities(User.id).filter(User.id.in_(list(rows)))
+        }
+    
+    try:
+        inserted = insert_attendances([row for uid, row in rows.items() if uid in existing_users])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    
+    for result in results:
+        if 'outcome' in result:
+            continue
+        if result['user_id'] not in existing_users:
+            result['outcome'] = 'user_not_found'
+        elif (result['user_id'], subject.id, attendance_date) in inserted:
+            result['outcome'] = 'created'
+        else:
+            result['outcome'] = 'already_marked'
+    
+    summary = {}
+    for result in results:
+        summary[result['outcome']] = summary.get(result['outcome'], 0) + 1
+    
+    return jsonify({
+        'subject_id': subject.id,
+        'date': attendance_date.isoformat(),
+        'summary': summary,
+        'results': results
+    }), 200
+
+# Columns the report API can return, in to_dict() order
+REPORT_COLUMNS = {
+    'id': Attendance.id,
+    'user_id': Attendance.user_id,
+    'subject_id': Attendance.subject_id,
+    'date': Attendance.date,
+    'time': Attendance.time,
+    'status': Attendance.status,
+    'verification_method': Attendance.verification_method,
+    'liveness_verified': Attendance.liveness_verified,
+    'created_at': Attendance.created_at
+}
+
+def _build_report_filters(user, allow_all_users=False):
+    """
+    Translate the report query parameters into filter conditions.
+    
+    Args:
+        user (CurrentUser): The requesting user
+        allow_all_users (bool): Let admins omit user_id to cover every user
+        
+    Returns:
+        tuple: (conditions, None) on success, or (None, error_response) on bad input
+    """
     subject_id = request.args.get('subject_id')
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
     user_id_param = request.args.get('user_id')  # For admin to query specific user
     
-    # Build query
-    query = Attendance.query
-    
     # Filter by user (if admin and user_id provided, use that, otherwise use current user)
     if user.role == 'admin' and user_id_param:
-        query = query.filter(Attendance.user_id == user_id_param)
+        conditions = [Attendance.user_id == user_id_param]
+    elif user.role == 'admin' and allow_all_users:
+        conditions = []
     else:
-        query = query.filter(Attendance.user_id == user_id)
+        conditions = [Attendance.user_id == user.id]
     
     # Apply additional filters
     if subject_id:
-        query = query.filter(Attendance.subject_id == subject_id)
+        conditions.append(Attendance.subject_id == subject_id)
     
     if start_date:
         try:
             start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            query = query.filter(Attendance.date >= start_date)
+            conditions.append(Attendance.date >= start_date)
         except ValueError:
-            return jsonify({'error': 'Invalid start_date format. Use YYYY-MM-DD'}), 400
+            return None, (jsonify({'error': 'Invalid start_date format. Use YYYY-MM-DD'}), 400)
     
     if end_date:
         try:
             end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-            query = query.filter(Attendance.date <= end_date)
+            conditions.append(Attendance.date <= end_date)
         except ValueError:
-            return jsonify({'error': 'Invalid end_date format. Use YYYY-MM-DD'}), 400
+            return None, (jsonify({'error': 'Invalid end_date format. Use YYYY-MM-DD'}), 400)
+    
+    return conditions, None
+
+def _parse_report_fields():
+    """
+    Read the comma-separated 'fields' parameter (all report columns by default).
+    
+    Returns:
+        tuple: (fields, None) on success, or (None, error_response) for unknown fields
+    """
+    if not request.args.get('fields'):
+        return list(REPORT_COLUMNS), None
+    
+    fields = [field.strip() for field in request.args['fields'].split(',') if field.strip()]
+    unknown = [field for field in fields if field not in REPORT_COLUMNS]
+    if unknown:
+        return None, (jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400)
+    return fields, None
+
+def _serialize_report_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+def _encode_cursor(row):
+    """Opaque keyset cursor pointing just past a row (date, time, id)."""
+    payload = json.dumps([row.date.isoformat(), row.time.isoformat(), row.id])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor):
+    """Return (date, time, id) from a cursor, or None if it is malformed."""
+    try:
+        date_str, time_str, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return (
+            datetime.strptime(date_str, '%Y-%m-%d').date(),
+            dt_time.fromisoformat(time_str),
+            int(row_id)
+        )
+    except (ValueError, TypeError, binascii.Error):
+        return None
+
+@jwt_required()
+def get_attendance_report():
+    """
+    Get attendance report for a user or all users (for admin).
+    
+    Results are paginated newest first with a keyset cursor on (date, time, id),
+    so every page costs the same regardless of how deep it is. Only the
+    requested fields are selected.
+    """
+    user = current_user
+    
+    conditions, error = _build_report_filters(user)
+    if error:
+        return error
+    
+    # Pagination parameters
+    max_page_size = current_app.config.get('ATTENDANCE_REPORT_MAX_PAGE_SIZE', 1000)
+    try:
+        limit = int(request.args.get('limit', current_app.config.get('ATTENDANCE_REPORT_PAGE_SIZE', 100)))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 1 or limit > max_page_size:
+        return jsonify({'error': f'limit must be between 1 and {max_page_size}'}), 400
+    
+    fields, error = _parse_report_fields()
+    if error:
+        return error
     
-    # Execute query and get results
-    attendances = query.order_by(Attendance.date.desc(), Attendance.time.desc()).all()
+    # The sort key is always selected so the next cursor can be built
+    selected = list(dict.fromkeys(fields + ['date', 'time', 'id']))
+    query = db.session.query(*(REPORT_COLUMNS[field].label(field) for field in selected)).filter(*conditions)
+    
+    include_total = request.args.get('include_total', 'false').lower() in ('1', 'true', 'yes')
+    total = query.order_by(None).count() if include_total else None
+    
+    cursor = request.args.get('cursor')
+    if cursor:
+        position = _decode_cursor(cursor)
+        if position is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        cursor_date, cursor_time, cursor_id = position
+        query = query.filter(or_(
+            Attendance.date < cursor_date,
+            and_(Attendance.date == cursor_date, Attendance.time < cursor_time),
+            and_(Attendance.date == cursor_date, Attendance.time == cursor_time, Attendance.id < cursor_id)
+        ))
+    
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(
+        Attendance.date.desc(), Attendance.time.desc(), Attendance.id.desc()
+    ).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
     
     # Format results
-    result = [attendance.to_dict() for attendance in attendances]
+    result = [
+        {field: _serialize_report_value(getattr(row, field)) for field in fields}
+        for row in rows
+    ]
     
-    return jsonify({
+    response = {
         'attendances': result,
-        'count': len(result)
-    }), 200
+        'count': len(result),
+        'next_cursor': _encode_cursor(rows[-1]) if has_more else None
+    }
+    if include_total:
+        response['total'] = total
+    
+    return jsonify(response), 200
+
+@jwt_required()
+def export_attendance():
+    """
+    Stream attendance records as NDJSON or CSV.
+    
+    Accepts the same filters and 'fields' as the report endpoint; admins who
+    omit user_id export every user. Rows are read through a server-side
+    cursor in fixed-size batches and written out batch by batch, so memory
+    use stays flat regardless of the number of rows.
+    """
+    user = current_user
+    
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'Invalid format. Use ndjson or csv'}), 400
+    
+    conditions, error = _build_report_filters(user, allow_all_users=True)
+    if error:
+        return error
+    
+    fields, error = _parse_report_fields()
+    if error:
+        return error
+    
+    batch_size = current_app.config.get('ATTENDANCE_EXPORT_BATCH_SIZE', 5000)
+    stmt = select(*(REPORT_COLUMNS[field] for field in fields)).where(*conditions).order_by(
+        Attendance.id
+    ).execution_options(yield_per=batch_size)
+    
+    def generate():
+        result = db.session.execute(stmt)
+        try:
+            if export_format == 'csv':
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(fields)
+                for batch in result.partitions():
+                    writer.writerows(
+                        [_serialize_report_value(value) for value in row] for row in batch
+                    )
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+                yield buffer.getvalue()
+            else:
+                for batch in result.partitions():
+                    yield ''.join(
+                        json.dumps(dict(zip(fields, (_serialize_report_value(value) for value in row)))) + '\n'
+                        for row in batch
+                    )
+        finally:
+            result.close()
+    
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=attendance_export.{export_format}'}
+    )
 
 @jwt_required()
 def get_attendance_stats():
     """Get attendance statistics for a user or all users (for admin)."""
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
+    user = current_user
     
     # Get query parameters
     subject_id = request.args.get('subject_id')
@@ -153,17 +537,34 @@ def get_attendance_stats():
     if user.role == 'admin' and user_id_param:
         target_user_id = user_id_param
     else:
-        target_user_id = user_id
+        target_user_id = user.id
+    
+    # Sum the pre-aggregated daily counters per subject instead of scanning raw attendance
+    counts = db.session.query(
+        AttendanceDailyRollup.subject_id.label('subject_id'),
+        func.sum(AttendanceDailyRollup.count).label('total'),
+        func.sum(case((AttendanceDailyRollup.status == 'present', AttendanceDailyRollup.count), else_=0)).label('present'),
+        func.sum(case((AttendanceDailyRollup.status == 'absent', AttendanceDailyRollup.count), else_=0)).label('absent'),
+        func.sum(case((AttendanceDailyRollup.status == 'late', AttendanceDailyRollup.count), else_=0)).label('late')
+    ).filter(
+        AttendanceDailyRollup.user_id == target_user_id,
+        AttendanceDailyRollup.date >= start_date
+    ).group_by(AttendanceDailyRollup.subject_id).subquery()
+    
+    # Join the counts to subjects so subjects without attendance still appear
+    # In a real app, you would have a user_subjects relationship
+    # This is a simplified version
+    query = db.session.query(
+        Subject.id, Subject.name, Subject.code,
+        counts.c.total, counts.c.present, counts.c.absent, counts.c.late
+    ).outerjoin(counts, counts.c.subject_id == Subject.id)
     
-    # Get all subjects for the user
     if subject_id:
-        subjects = [Subject.query.get(subject_id)]
-        if not subjects[0]:
-            return jsonify({'error': 'Subject not found'}), 404
-    else:
-        # In a real app, you would have a user_subjects relationship
-        # This is a simplified version
-        subjects = Subject.query.all()
+        query = query.filter(Subject.id == subject_id)
+    
+    rows = query.order_by(Subject.id).all()
+    if subject_id and not rows:
+        return jsonify({'error': 'Subject not found'}), 404
     
     # Calculate statistics
     stats = {
@@ -175,21 +576,12 @@ def get_attendance_stats():
         'subjects': []
     }
     
-    for subject in subjects:
-        # Get attendance records for this subject
-        attendances = Attendance.query.filter(
-            Attendance.user_id == target_user_id,
-            Attendance.subject_id == subject.id,
-            Attendance.date >= start_date
-        ).all()
-        
-        # Count by status
-        present_count = sum(1 for a in attendances if a.status == 'present')
-        absent_count = sum(1 for a in attendances if a.status == 'absent')
-        late_count = sum(1 for a in attendances if a.status == 'late')
-        
+    for row in rows:
         # Calculate total classes (this is simplified - in a real app you would use the schedule)
-        total_classes = len(attendances)
+        total_classes = row.total or 0
+        present_count = row.present or 0
+        absent_count = row.absent or 0
+        late_count = row.late or 0
         
         # Calculate percentage
         percentage = (present_count + late_count) / total_classes * 100 if total_classes > 0 else 0
@@ -202,9 +594,9 @@ def get_attendance_stats():
         
         # Add subject-specific stats
         stats['subjects'].append({
-            'id': subject.id,
-            'name': subject.name,
-            'code': subject.code,
+            'id': row.id,
+            'name': row.name,
+            'code': row.code,
             'total_classes': total_classes,
             'present': present_count,
             'absent': absent_count,
@@ -1,9 +1,15 @@
 from flask import request, jsonify
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, current_user
 from app import db
 from app.models.user import User
+from app.utils.password_hashing import PasswordHashingBusy, hashing_metrics
 import re
 
+def _hashing_busy_response(e):
+    response = jsonify({'error': 'Server is busy, please retry shortly'})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 503
+
 def register_user():
     """Register a new user."""
     data = request.get_json()
@@ -51,6 +57,9 @@ def register_user():
             'access_token': access_token,
             'refresh_token': refresh_token
         }), 201
+    except PasswordHashingBusy as e:
+        db.session.rollback()
+        return _hashing_busy_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -65,8 +74,17 @@ def login_user():
     
     # Find user by email
     user = User.query.filter_by(email=data['email']).first()
-    if not user or not user.check_password(data['password']):
-        return jsonify({'error': 'Invalid email or password'}), 401
+    try:
+        if not user or not user.check_password(data['password']):
+            return jsonify({'error': 'Invalid email or password'}), 401
+        
+        # Upgrade hashes made at an older cost factor while the password is at hand
+        if user.password_needs_rehash():
+            user.set_password(data['password'])
+            db.session.commit()
+    except PasswordHashingBusy as e:
+        db.session.rollback()
+        return _hashing_busy_response(e)
     
     # Generate tokens
     access_token = create_access_token(identity=user.id)
@@ -82,8 +100,7 @@ def login_user():
 @jwt_required()
 def get_user_profile():
     """Get the current user's profile."""
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user = db.session.get(User, current_user.id)
     
     if not user:
         return jsonify({'error': 'User not found'}), 404
@@ -91,3 +108,14 @@ def get_user_profile():
     return jsonify({
         'user': user.to_dict()
     }), 200
+
+@jwt_required()
+def get_password_hashing_metrics():
+    """Get this worker's password hashing latency and queue metrics (admins only)."""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Only admins can view hashing metrics'}), 403
+    
+    metrics = hashing_metrics()
+    for stats in metrics['operations'].values():
+        stats['buckets'] = {str(bound): count for bound, count in stats['buckets'].items()}
+    return jsonify(metrics), 200
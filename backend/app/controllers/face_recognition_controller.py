@@ -1,20 +1,20 @@
 from flask import request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, current_user
 from app import db
 from app.models.user import User
-from app.utils.face_recognition_utils import encode_face, compare_faces
-import base64
-import numpy as np
-import json
-import cv2
-import os
-import tempfile
+
+# The face and image utils (numpy, OpenCV) are imported inside the
+# handlers, so booting the app does not load them
 
 @jwt_required()
 def register_face():
     """Register a user's face for recognition."""
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    from app.utils.face_recognition_utils import encode_face
+    from app.utils.face_gallery import get_face_gallery
+    from app.utils.image_utils import decode_image
+    
+    # The face encoding is written to the full row, not the cached user
+    user = db.session.get(User, current_user.id)
     
     if not user:
         return jsonify({'error': 'User not found'}), 404
@@ -24,33 +24,24 @@ def register_face():
         return jsonify({'error': 'No image data provided'}), 400
     
     try:
-        # Decode base64 image
-        image_data = request.json['image']
-        if 'data:image' in image_data:
-            # Remove the data URL prefix if present
-            image_data = image_data.split(',')[1]
-        
-        # Decode base64 to binary
-        image_binary = base64.b64decode(image_data)
-        
-        # Create a temporary file to save the image
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-            temp_file.write(image_binary)
-            temp_file_path = temp_file.name
+        # Decode the image straight into memory
+        image = decode_image(request.json['image'])
+        if image is None:
+            return jsonify({'error': 'Invalid image data'}), 400
         
         # Process the image to get face encoding
-        face_encoding = encode_face(temp_file_path)
-        
-        # Clean up the temporary file
-        os.unlink(temp_file_path)
+        face_encoding = encode_face(image)
         
         if face_encoding is None:
             return jsonify({'error': 'No face detected in the image'}), 400
         
         # Save the face encoding to the user record
-        user.face_encoding = json.dumps(face_encoding.tolist())
+        user.set_face_encoding(face_encoding)
         db.session.commit()
         
+        # Keep the in-memory gallery in sync without a full reload
+        get_face_gallery().add(user.id, face_encoding)
+        
         return jsonify({
             'message': 'Face registered successfully',
             'user_id': user.id
@@ -61,59 +52,49 @@ def register_face():
 
 @jwt_required()
 def recognize_face():
-    """Recognize a face from an image."""
+    """Identify a face from an image against all registered users."""
+    from app.utils.face_recognition_utils import encode_face
+    from app.utils.face_gallery import get_face_gallery
+    from app.utils.image_utils import decode_image
+    
     # Get image data from request
     if 'image' not in request.json:
         return jsonify({'error': 'No image data provided'}), 400
     
     try:
-        # Decode base64 image
-        image_data = request.json['image']
-        if 'data:image' in image_data:
-            # Remove the data URL prefix if present
-            image_data = image_data.split(',')[1]
-        
-        # Decode base64 to binary
-        image_binary = base64.b64decode(image_data)
-        
-        # Create a temporary file to save the image
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-            temp_file.write(image_binary)
-            temp_file_path = temp_file.name
+        # Decode the image straight into memory
+        image = decode_image(request.json['image'])
+        if image is None:
+            return jsonify({'error': 'Invalid image data'}), 400
         
         # Process the image to get face encoding
-        face_encoding = encode_face(temp_file_path)
-        
-        # Clean up the temporary file
-        os.unlink(temp_file_path)
+        face_encoding = encode_face(image)
         
         if face_encoding is None:
             return jsonify({'error': 'No face detected in the image'}), 400
         
-        # Get the user ID from the token
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        if not user.face_encoding:
-            return jsonify({'error': 'User has not registered a face'}), 400
-        
-        # Compare the face with the stored encoding
-        stored_encoding = np.array(json.loads(user.face_encoding))
-        is_match = compare_faces(stored_encoding, face_encoding, 
-                                tolerance=current_app.config['FACE_RECOGNITION_TOLERANCE'])
+        # Identify the face against every registered user in one pass
+        candidates = get_face_gallery().search(
+            face_encoding,
+            tolerance=current_app.config['FACE_RECOGNITION_TOLERANCE'],
+            k=current_app.config.get('FACE_RECOGNITION_TOP_K', 3)
+        )
         
-        if is_match:
+        if candidates:
+            best_user_id, best_distance = candidates[0]
             return jsonify({
                 'message': 'Face recognized successfully',
-                'user_id': user.id,
+                'user_id': best_user_id,
+                'distance': best_distance,
+                'candidates': [
+                    {'user_id': user_id, 'distance': distance}
+                    for user_id, distance in candidates
+                ],
                 'match': True
             }), 200
         else:
             return jsonify({
-                'message': 'Face does not match',
+                'message': 'Face does not match any registered user',
                 'match': False
             }), 200
     
@@ -1,12 +1,10 @@
 from flask import request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.utils.liveness_detection_utils import detect_blinks, analyze_thermal_image
-import base64
-import numpy as np
-import cv2
-import os
-import tempfile
-import json
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+import time
+
+# The liveness and image utils (numpy, OpenCV) are imported inside the
+# handlers, so booting the app does not load them
 
 @jwt_required()
 def verify_liveness():
@@ -31,6 +29,9 @@ def verify_liveness():
 
 def verify_liveness_blink():
     """Verify liveness using blink detection."""
+    from app.utils.liveness_detection_utils import detect_blinks
+    from app.utils.image_utils import decode_image
+    
     # Get video frames from request
     if 'frames' not in request.json:
         return jsonify({'error': 'No video frames provided'}), 400
@@ -40,29 +41,17 @@ def verify_liveness_blink():
         return jsonify({'error': 'Not enough frames provided'}), 400
     
     try:
-        # Process frames to detect blinks
+        # Decode every frame straight into memory
         frame_images = []
         for frame_data in frames:
-            # Decode base64 image
-            if 'data:image' in frame_data:
-                # Remove the data URL prefix if present
-                frame_data = frame_data.split(',')[1]
-            
-            # Decode base64 to binary
-            frame_binary = base64.b64decode(frame_data)
-            
-            # Create a temporary file to save the frame
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-                temp_file.write(frame_binary)
-                frame_images.append(temp_file.name)
+            frame = decode_image(frame_data)
+            if frame is None:
+                return jsonify({'error': 'Invalid frame data'}), 400
+            frame_images.append(frame)
         
         # Detect blinks in the sequence of frames
         blink_count = detect_blinks(frame_images)
         
-        # Clean up temporary files
-        for frame_path in frame_images:
-            os.unlink(frame_path)
-        
         # Check if enough blinks were detected
         min_blinks_required = current_app.config['MIN_BLINKS_REQUIRED']
         is_live = blink_count >= min_blinks_required
@@ -74,39 +63,25 @@ def verify_liveness_blink():
         }), 200
     
     except Exception as e:
-        # Clean up any remaining temporary files
-        for frame_path in frame_images:
-            if os.path.exists(frame_path):
-                os.unlink(frame_path)
-        
         return jsonify({'error': str(e)}), 500
 
 def verify_liveness_thermal():
     """Verify liveness using thermal image analysis."""
+    from app.utils.liveness_detection_utils import analyze_thermal_image
+    from app.utils.image_utils import decode_image
+    
     # Get thermal image from request
     if 'thermal_image' not in request.json:
         return jsonify({'error': 'No thermal image provided'}), 400
     
     try:
-        # Decode base64 image
-        image_data = request.json['thermal_image']
-        if 'data:image' in image_data:
-            # Remove the data URL prefix if present
-            image_data = image_data.split(',')[1]
-        
-        # Decode base64 to binary
-        image_binary = base64.b64decode(image_data)
-        
-        # Create a temporary file to save the image
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-            temp_file.write(image_binary)
-            temp_file_path = temp_file.name
+        # Decode the image straight into memory
+        image = decode_image(request.json['thermal_image'])
+        if image is None:
+            return jsonify({'error': 'Invalid thermal image data'}), 400
         
         # Analyze thermal image to detect if it's a real person
-        is_live, confidence = analyze_thermal_image(temp_file_path)
-        
-        # Clean up the temporary file
-        os.unlink(temp_file_path)
+        is_live, confidence = analyze_thermal_image(image)
         
         return jsonify({
             'is_live': is_live,
@@ -115,3 +90,125 @@ def verify_liveness_thermal():
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+def _session_serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='liveness-session')
+
+def _dump_session(session):
+    """Sign and timestamp the session state so any worker can resume it from the next chunk."""
+    return _session_serializer().dumps(session)
+
+def _load_session(token):
+    """
+    Verify and decode a session token issued to the current access token.
+    
+    Tokens expire after LIVENESS_SESSION_TIMEOUT_SECONDS, and are bound to
+    the user and the JWT (by its jti) they were issued under, so they cannot
+    be replayed later or carried over to another login.
+    
+    Returns:
+        tuple: (session, error); session is None when the token is rejected
+    """
+    try:
+        session = _session_serializer().loads(
+            token, max_age=current_app.config['LIVENESS_SESSION_TIMEOUT_SECONDS']
+        )
+    except SignatureExpired:
+        return None, 'Liveness session expired'
+    except BadSignature:
+        return None, 'Invalid liveness session'
+    
+    if session.get('user_id') != str(get_jwt_identity()) or session.get('jti') != get_jwt().get('jti'):
+        return None, 'Invalid liveness session'
+    return session, None
+
+@jwt_required()
+def start_liveness_session():
+    """Open a streaming blink-detection session."""
+    session = {
+        'user_id': str(get_jwt_identity()),
+        'jti': get_jwt().get('jti'),
+        'started_at': time.time(),
+        'frames': 0,
+        'closed_frames': 0,
+        'blinks': 0
+    }
+    
+    return jsonify({
+        'session_token': _dump_session(session),
+        'min_blinks_required': current_app.config['MIN_BLINKS_REQUIRED'],
+        'max_frames': current_app.config['LIVENESS_SESSION_MAX_FRAMES'],
+        'max_chunk_frames': current_app.config['LIVENESS_SESSION_MAX_CHUNK_FRAMES'],
+        'timeout_seconds': current_app.config['LIVENESS_SESSION_TIMEOUT_SECONDS']
+    }), 201
+
+@jwt_required()
+def push_liveness_frames():
+    """
+    Feed a chunk of frames into a streaming blink-detection session.
+    
+    Frames are scored one at a time as they are decoded, and processing stops
+    as soon as enough blinks have been seen or the frame/time budget runs out.
+    While the session is still pending, the response carries a fresh session
+    token for the next chunk.
+    """
+    from app.utils.liveness_detection_utils import frame_eye_aspect_ratio, update_blink_state
+    from app.utils.image_utils import decode_image
+    
+    data = request.get_json()
+    if not data or 'session_token' not in data:
+        return jsonify({'error': 'Session token is required'}), 400
+    
+    session, error = _load_session(data['session_token'])
+    if session is None:
+        return jsonify({'error': error}), 400
+    
+    frames = data.get('frames') or []
+    max_chunk_frames = current_app.config['LIVENESS_SESSION_MAX_CHUNK_FRAMES']
+    if len(frames) > max_chunk_frames:
+        return jsonify({'error': f'Too many frames in one chunk (maximum {max_chunk_frames})'}), 400
+    
+    threshold = current_app.config['BLINK_THRESHOLD']
+    consec_frames = current_app.config['BLINK_CONSEC_FRAMES']
+    min_blinks_required = current_app.config['MIN_BLINKS_REQUIRED']
+    max_frames = current_app.config['LIVENESS_SESSION_MAX_FRAMES']
+    deadline = session['started_at'] + current_app.config['LIVENESS_SESSION_TIMEOUT_SECONDS']
+    
+    try:
+        for frame_data in frames:
+            if session['blinks'] >= min_blinks_required:
+                break
+            if session['frames'] >= max_frames or time.time() > deadline:
+                break
+            
+            frame = decode_image(frame_data)
+            if frame is None:
+                return jsonify({'error': 'Invalid frame data'}), 400
+            
+            update_blink_state(session, frame_eye_aspect_ratio(frame), threshold, consec_frames)
+            session['frames'] += 1
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    is_live = session['blinks'] >= min_blinks_required
+    budget_exhausted = session['frames'] >= max_frames or time.time() > deadline
+    if is_live:
+        status = 'live'
+    elif budget_exhausted:
+        status = 'failed'
+    else:
+        status = 'pending'
+    
+    response = {
+        'status': status,
+        'is_live': is_live,
+        'blink_count': session['blinks'],
+        'frames_processed': session['frames'],
+        'min_blinks_required': min_blinks_required
+    }
+    if status == 'pending':
+        response['session_token'] = _dump_session(session)
+    
+    return jsonify(response), 200
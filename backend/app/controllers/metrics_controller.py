@@ -0,0 +1,22 @@
+import hmac
+from flask import Response, current_app, jsonify, request
+from app.utils.metrics import collect, render
+
+# Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _authorized():
+    """Return True if METRICS_TOKEN is unset or the request carries it as a bearer token."""
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        return True
+    scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(credentials.strip().encode(), token.encode())
+
+def get_metrics():
+    """Expose request, SQL, payload, util and hashing metrics of every worker for Prometheus."""
+    if not _authorized():
+        response = jsonify({'error': 'A valid metrics token is required'})
+        response.headers['WWW-Authenticate'] = 'Bearer'
+        return response, 401
+    return Response(render(collect()), content_type=CONTENT_TYPE)
@@ -0,0 +1,36 @@
+from flask import jsonify, send_file, current_app
+from flask_jwt_extended import jwt_required, current_user
+from app.utils.profiling import PROFILE_HEADER, issue_profile_token, list_profiles, get_profile_path
+
+@jwt_required()
+def create_profile_token():
+    """Issue a signed token that profiles every request sending it (admins only)."""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Only admins can profile requests'}), 403
+    
+    return jsonify({
+        'token': issue_profile_token(current_user.id),
+        'header': PROFILE_HEADER,
+        'expires_in': current_app.config.get('PROFILE_TOKEN_MAX_AGE_SECONDS', 3600)
+    }), 201
+
+@jwt_required()
+def get_profiles():
+    """List stored request profiles, newest first (admins only)."""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Only admins can view profiles'}), 403
+    
+    return jsonify({'profiles': list_profiles()}), 200
+
+@jwt_required()
+def download_profile(profile_id):
+    """Download a request profile in pstats format (admins only)."""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Only admins can view profiles'}), 403
+    
+    profile_path = get_profile_path(profile_id)
+    if not profile_path:
+        return jsonify({'error': 'Profile not found'}), 404
+    
+    return send_file(profile_path, mimetype='application/octet-stream', as_attachment=True,
+                     download_name=f'{profile_id}.prof')
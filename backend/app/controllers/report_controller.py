@@ -0,0 +1,207 @@
+from flask import request, jsonify, send_file, current_app
+from flask_jwt_extended import jwt_required, current_user
+from app import db
+from app.models.user import User
+from app.models.attendance import Attendance
+from app.models.subject import Subject
+from app.utils.attendance_utils import iter_report_rows
+from app.utils.cohort_reports import build_cohort_archive, cohort_conditions
+from app.utils.report_jobs import (
+    submit_report_job, update_job_progress, get_job, report_cache_key, report_paths, DONE
+)
+from sqlalchemy import func
+from datetime import datetime
+
+DOWNLOADS = {
+    'pdf': ('application/pdf', 'attendance_report.pdf'),
+    'zip': ('application/zip', 'attendance_reports.zip')
+}
+
+def _report_status_response(meta):
+    response = {
+        'job_id': meta['job_id'],
+        'status': meta['status']
+    }
+    if meta['status'] == DONE:
+        response['download_url'] = f"/api/reports/{meta['job_id']}/download"
+    if meta.get('progress'):
+        response['progress'] = meta['progress']
+    if meta.get('error'):
+        response['error'] = meta['error']
+    return response
+
+def _parse_report_dates(data):
+    """Parse optional start_date and end_date; returns (dates, error_response)."""
+    dates = {}
+    for field in ('start_date', 'end_date'):
+        dates[field] = None
+        if data.get(field):
+            try:
+                dates[field] = datetime.strptime(data[field], '%Y-%m-%d').date()
+            except ValueError:
+                return None, (jsonify({'error': f'Invalid {field} format. Use YYYY-MM-DD'}), 400)
+    return dates, None
+
+def _can_access(user, meta):
+    return user.role == 'admin' or str(meta['owner_id']) == str(user.id)
+
+@jwt_required()
+def submit_attendance_report():
+    """Queue a PDF attendance report, or return the cached one if nothing has changed."""
+    user = current_user
+    
+    data = request.get_json(silent=True) or {}
+    
+    # Only admins may request reports for other users
+    target_user_id = user.id
+    if user.role == 'admin' and data.get('user_id'):
+        target_user_id = data['user_id']
+    target_user = User.query.get(target_user_id)
+    if not target_user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    subject = None
+    if data.get('subject_id'):
+        subject = Subject.query.get(data['subject_id'])
+        if not subject:
+            return jsonify({'error': 'Subject not found'}), 404
+    
+    dates, error = _parse_report_dates(data)
+    if error:
+        return error
+    
+    conditions = [Attendance.user_id == target_user.id]
+    if subject:
+        conditions.append(Attendance.subject_id == subject.id)
+    if dates['start_date']:
+        conditions.append(Attendance.date >= dates['start_date'])
+    if dates['end_date']:
+        conditions.append(Attendance.date <= dates['end_date'])
+    
+    # Any insert, update or delete of a matching row changes this marker,
+    # and with it the cache key
+    change_marker = tuple(db.session.query(
+        func.count(Attendance.id),
+        func.max(Attendance.id),
+        func.max(Attendance.updated_at)
+    ).filter(*conditions).one())
+    
+    params = {
+        'user_id': target_user.id,
+        'subject_id': subject.id if subject else None,
+        'start_date': dates['start_date'],
+        'end_date': dates['end_date']
+    }
+    job_id = report_cache_key(params, change_marker)
+    
+    target_id = target_user.id
+    subject_id = subject.id if subject else None
+    
+    def build_report(output_path):
+        from app.utils.pdf_generator import generate_attendance_report
+        
+        rows = iter_report_rows(conditions, current_app.config.get('ATTENDANCE_EXPORT_BATCH_SIZE', 5000))
+        generate_attendance_report(
+            rows,
+            user=db.session.get(User, target_id),
+            subject=db.session.get(Subject, subject_id) if subject_id else None,
+            start_date=dates['start_date'],
+            end_date=dates['end_date'],
+            output_path=output_path
+        )
+    
+    meta = submit_report_job(job_id, target_user.id, build_report)
+    status_code = 200 if meta['status'] == DONE else 202
+    return jsonify(_report_status_response(meta)), status_code
+
+@jwt_required()
+def submit_cohort_report():
+    """
+    Queue a zip of per-student PDF reports for a cohort.
+    
+    The cohort is every student, or with subject_id, every student with
+    attendance in that subject. Admins may request any cohort; teachers only
+    the subjects they teach. Poll the job for progress.
+    """
+    user = current_user
+    
+    if user.role not in ('teacher', 'admin'):
+        return jsonify({'error': 'Only teachers and admins can generate cohort reports'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    
+    subject = None
+    if data.get('subject_id'):
+        subject = Subject.query.get(data['subject_id'])
+        if not subject:
+            return jsonify({'error': 'Subject not found'}), 404
+    
+    if user.role == 'teacher' and (not subject or subject.teacher_id != user.id):
+        return jsonify({'error': 'Teachers can only generate reports for their own subjects'}), 403
+    
+    dates, error = _parse_report_dates(data)
+    if error:
+        return error
+    
+    subject_id = subject.id if subject else None
+    student_conditions, attendance_conditions = cohort_conditions(
+        subject_id, dates['start_date'], dates['end_date']
+    )
+    change_marker = tuple(db.session.query(
+        func.count(Attendance.id),
+        func.max(Attendance.id),
+        func.max(Attendance.updated_at)
+    ).filter(*attendance_conditions).one()) + tuple(db.session.query(
+        func.count(User.id),
+        func.max(User.updated_at)
+    ).filter(*student_conditions).one())
+    
+    params = {
+        'cohort': True,
+        'subject_id': subject_id,
+        'start_date': dates['start_date'],
+        'end_date': dates['end_date']
+    }
+    job_id = report_cache_key(params, change_marker)
+    
+    def build_archive(output_path):
+        build_cohort_archive(
+            output_path,
+            subject_id=subject_id,
+            start_date=dates['start_date'],
+            end_date=dates['end_date'],
+            progress=lambda done, total: update_job_progress(job_id, done, total)
+        )
+    
+    meta = submit_report_job(job_id, user.id, build_archive, file_format='zip')
+    status_code = 200 if meta['status'] == DONE else 202
+    return jsonify(_report_status_response(meta)), status_code
+
+@jwt_required()
+def get_report_status(job_id):
+    """Poll a report job."""
+    user = current_user
+    
+    meta = get_job(job_id)
+    if not meta or not _can_access(user, meta):
+        return jsonify({'error': 'Report not found'}), 404
+    
+    return jsonify(_report_status_response(meta)), 200
+
+@jwt_required()
+def download_report(job_id):
+    """Download a finished report."""
+    user = current_user
+    
+    meta = get_job(job_id)
+    if not meta or not _can_access(user, meta):
+        return jsonify({'error': 'Report not found'}), 404
+    
+    if meta['status'] != DONE:
+        return jsonify(_report_status_response(meta)), 409
+    
+    file_format = meta.get('format', 'pdf')
+    mimetype, download_name = DOWNLOADS[file_format]
+    report_path, _ = report_paths(job_id, file_format)
+    return send_file(report_path, mimetype=mimetype, as_attachment=True,
+                     download_name=download_name)
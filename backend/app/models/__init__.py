@@ -1,5 +1,6 @@
 from .user import User
 from .attendance import Attendance
 from .subject import Subject
+from .attendance_rollup import AttendanceDailyRollup
 
 # Add any additional models here
@@ -3,6 +3,14 @@ from datetime import datetime
 
 class Attendance(db.Model):
     __tablename__ = 'attendances'
+    __table_args__ = (
+        # One record per student, subject and day; bulk writes rely on it to skip duplicates
+        db.Index('uq_attendances_user_subject_date', 'user_id', 'subject_id', 'date', unique=True),
+        # Per-user history and period stats, newest first
+        db.Index('ix_attendances_user_date_time', 'user_id', 'date', 'time'),
+        # Roster views (who attended a subject on a day), covering user and status
+        db.Index('ix_attendances_subject_date', 'subject_id', 'date', 'user_id', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -13,6 +21,7 @@ class Attendance(db.Model):
     verification_method = db.Column(db.String(20), nullable=False, default='face')  # 'face', 'manual', etc.
     liveness_verified = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __init__(self, user_id, subject_id, status='present', verification_method='face', liveness_verified=False):
         self.user_id = user_id
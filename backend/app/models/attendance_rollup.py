@@ -0,0 +1,163 @@
+from app import db
+from app.models.attendance import Attendance
+from sqlalchemy import event, inspect, select, func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+class AttendanceDailyRollup(db.Model):
+    """
+    Daily attendance counters per (user, subject, date, status).
+    
+    Maintained in the same transaction as every write to attendances, so
+    period statistics can sum a handful of counter rows instead of scanning
+    raw attendance.
+    """
+    __tablename__ = 'attendance_daily_rollups'
+    __table_args__ = (
+        db.Index('ix_attendance_daily_rollups_user_date', 'user_id', 'date'),
+    )
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subjects.id'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    @staticmethod
+    def apply_deltas(connection, deltas):
+        """
+        Add signed deltas to the daily counters, creating missing rows.
+        
+        Args:
+            connection: SQLAlchemy connection of the transaction that wrote the attendance rows
+            deltas (dict): (user_id, subject_id, date, status) -> change in count
+        """
+        rows = [
+            {'user_id': user_id, 'subject_id': subject_id, 'date': date, 'status': status, 'count': delta}
+            for (user_id, subject_id, date, status), delta in deltas.items()
+            if delta
+        ]
+        if not rows:
+            return
+        
+        table = AttendanceDailyRollup.__table__
+        dialect = connection.dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            insert = postgresql_insert if dialect == 'postgresql' else sqlite_insert
+            stmt = insert(table).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['user_id', 'subject_id', 'date', 'status'],
+                set_={'count': table.c.count + stmt.excluded.count}
+            )
+            connection.execute(stmt)
+            return
+        
+        # Generic fallback: update in place, insert when the counter does not exist yet
+        for row in rows:
+            result = connection.execute(
+                table.update().where(
+                    table.c.user_id == row['user_id'],
+                    table.c.subject_id == row['subject_id'],
+                    table.c.date == row['date'],
+                    table.c.status == row['status']
+                ).values(count=table.c.count + row['count'])
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert().values(**row))
+    
+    @staticmethod
+    def rebuild(connection):
+        """
+        Recompute every counter from raw attendance.
+        
+        Args:
+            connection: SQLAlchemy connection; the caller owns the transaction
+            
+        Returns:
+            int: Number of counter rows written
+        """
+        table = AttendanceDailyRollup.__table__
+        connection.execute(table.delete())
+        aggregate = select(
+            Attendance.user_id, Attendance.subject_id, Attendance.date, Attendance.status,
+            func.count().label('count')
+        ).group_by(Attendance.user_id, Attendance.subject_id, Attendance.date, Attendance.status)
+        connection.execute(
+            table.insert().from_select(['user_id', 'subject_id', 'date', 'status', 'count'], aggregate)
+        )
+        return connection.execute(select(func.count()).select_from(table)).scalar()
+    
+    @staticmethod
+    def find_inconsistencies(connection, limit=100):
+        """
+        Compare the counters against raw attendance.
+        
+        Args:
+            connection: SQLAlchemy connection
+            limit (int): Maximum number of mismatches to return in each direction
+            
+        Returns:
+            dict: 'missing' lists raw (user_id, subject_id, date, status, count)
+                groups with no matching counter; 'unexpected' lists counters
+                that do not match any raw group
+        """
+        table = AttendanceDailyRollup.__table__
+        raw = select(
+            Attendance.user_id, Attendance.subject_id, Attendance.date, Attendance.status,
+            func.count().label('count')
+        ).group_by(Attendance.user_id, Attendance.subject_id, Attendance.date, Attendance.status)
+        rolled = select(
+            table.c.user_id, table.c.subject_id, table.c.date, table.c.status, table.c.count
+        ).where(table.c.count != 0)
+        
+        missing = connection.execute(raw.except_(rolled).limit(limit)).fetchall()
+        unexpected = connection.execute(rolled.except_(raw).limit(limit)).fetchall()
+        return {
+            'missing': [tuple(row) for row in missing],
+            'unexpected': [tuple(row) for row in unexpected]
+        }
+    
+    def __repr__(self):
+        return f'<AttendanceDailyRollup User {self.user_id}, Subject {self.subject_id}, {self.date} {self.status}: {self.count}>'
+
+
+ROLLUP_ATTRS = ('user_id', 'subject_id', 'date', 'status')
+
+def _track_previous_value(target, value, oldvalue, initiator):
+    pass
+
+# active_history makes the ORM load the old value before an attribute is
+# overwritten, even on expired instances, so updates can decrement the old counter
+for _attr in ROLLUP_ATTRS:
+    event.listen(getattr(Attendance, _attr), 'set', _track_previous_value, active_history=True)
+
+def _current_key(target):
+    return tuple(getattr(target, attr) for attr in ROLLUP_ATTRS)
+
+def _previous_key(target):
+    """Rollup key of the row as it was before the pending changes."""
+    state = inspect(target)
+    key = []
+    for attr in ROLLUP_ATTRS:
+        history = state.attrs[attr].history
+        key.append(history.deleted[0] if history.deleted else getattr(target, attr))
+    return tuple(key)
+
+# Keep the counters in step with ORM writes; these run inside the flush, on
+# the same connection and transaction as the attendance row itself
+
+@event.listens_for(Attendance, 'after_insert')
+def _rollup_after_insert(mapper, connection, target):
+    AttendanceDailyRollup.apply_deltas(connection, {_current_key(target): 1})
+
+@event.listens_for(Attendance, 'after_update')
+def _rollup_after_update(mapper, connection, target):
+    previous, current = _previous_key(target), _current_key(target)
+    if previous == current:
+        return
+    
+    AttendanceDailyRollup.apply_deltas(connection, {previous: -1, current: 1})
+
+@event.listens_for(Attendance, 'after_delete')
+def _rollup_after_delete(mapper, connection, target):
+    AttendanceDailyRollup.apply_deltas(connection, {_previous_key(target): -1})
@@ -1,6 +1,5 @@
 from app import db
 from datetime import datetime
-import bcrypt
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -12,7 +11,8 @@ class User(db.Model):
     last_name = db.Column(db.String(50), nullable=False)
     role = db.Column(db.String(20), nullable=False, default='student')  # 'student', 'admin', 'teacher'
     student_id = db.Column(db.String(20), unique=True, nullable=True)  # Only for students
-    face_encoding = db.Column(db.Text, nullable=True)  # Stored as a serialized array
+    face_encoding = db.Column(db.Text, nullable=True)  # Legacy JSON array, read only for rows not yet migrated
+    face_encoding_blob = db.Column(db.LargeBinary, nullable=True)  # Raw little-endian float32 bytes
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -28,13 +28,34 @@ class User(db.Model):
         self.student_id = student_id
     
     def set_password(self, password):
-        """Hash the password and store it in the database."""
-        salt = bcrypt.gensalt()
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        """Hash the password at the configured cost and store it in the database."""
+        from app.utils.password_hashing import hash_password
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
         """Check if the provided password matches the stored hash."""
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        from app.utils.password_hashing import verify_password
+        return verify_password(password, self.password_hash)
+    
+    def password_needs_rehash(self):
+        """Return True if the stored hash predates the current BCRYPT_LOG_ROUNDS."""
+        from app.utils.password_hashing import needs_rehash
+        return needs_rehash(self.password_hash)
+    
+    def set_face_encoding(self, encoding):
+        """Store a face encoding in the compact binary column."""
+        from app.utils.encoding_codec import encoding_to_bytes
+        self.face_encoding_blob = encoding_to_bytes(encoding)
+        self.face_encoding = None
+    
+    def get_face_encoding(self):
+        """Return the stored face encoding as a float32 array, or None if not registered."""
+        from app.utils.encoding_codec import load_encoding
+        return load_encoding(self.face_encoding_blob, self.face_encoding)
+    
+    @property
+    def has_face_registered(self):
+        return self.face_encoding_blob is not None or self.face_encoding is not None
     
     def to_dict(self):
         """Convert user object to dictionary for JSON serialization."""
@@ -45,7 +66,7 @@ class User(db.Model):
             'last_name': self.last_name,
             'role': self.role,
             'student_id': self.student_id,
-            'has_face_registered': self.face_encoding is not None,
+            'has_face_registered': self.has_face_registered,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
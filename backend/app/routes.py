@@ -1,7 +1,23 @@
 from flask import Blueprint, jsonify, request, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 import os
 from werkzeug.utils import secure_filename
+from app.controllers.attendance_controller import (
+    mark_attendance, mark_group_attendance, bulk_mark_attendance, get_attendance_report,
+    export_attendance, get_attendance_stats
+)
+from app.controllers.auth_controller import (
+    register_user, login_user, get_user_profile, get_password_hashing_metrics
+)
+from app.controllers.face_recognition_controller import register_face, recognize_face
+from app.controllers.metrics_controller import get_metrics
+from app.controllers.profiling_controller import create_profile_token, get_profiles, download_profile
+from app.controllers.report_controller import (
+    submit_attendance_report, submit_cohort_report, get_report_status, download_report
+)
+from app.controllers.liveness_detection_controller import (
+    verify_liveness, start_liveness_session, push_liveness_frames
+)
 
 main_bp = Blueprint('main', __name__)
 
@@ -14,121 +30,104 @@ def test_route():
         'version': '1.0.0'
     })
 
+# Prometheus scrape endpoint
+@main_bp.route('/metrics', methods=['GET'])
+def metrics_route():
+    return get_metrics()
+
 # Auth routes
 @main_bp.route('/api/auth/register', methods=['POST'])
 def register():
-    # Placeholder - actual implementation will be in a user controller
-    return jsonify({'message': 'User registered successfully'})
+    return register_user()
 
 @main_bp.route('/api/auth/login', methods=['POST'])
 def login():
-    # Placeholder - actual implementation will be in a user controller
-    return jsonify({
-        'token': 'sample_jwt_token',
-        'user': {
-            'id': 1,
-            'name': 'John Doe',
-            'email': 'john@example.com',
-            'role': 'student'
-        }
-    })
+    return login_user()
 
 @main_bp.route('/api/auth/profile', methods=['GET'])
-@jwt_required()
 def profile():
-    # Placeholder - actual implementation will be in a user controller
-    return jsonify({
-        'id': 1,
-        'name': 'John Doe',
-        'email': 'john@example.com',
-        'role': 'student'
-    })
+    return get_user_profile()
+
+@main_bp.route('/api/auth/hashing-metrics', methods=['GET'])
+def password_hashing_metrics_route():
+    return get_password_hashing_metrics()
 
 # Face recognition routes
 @main_bp.route('/api/faces/register', methods=['POST'])
-@jwt_required()
 def register_face_route():
-    # Placeholder - actual implementation will be in a face recognition controller
-    return jsonify({'message': 'Face registered successfully'})
+    return register_face()
 
 @main_bp.route('/api/faces/recognize', methods=['POST'])
 def recognize_face_route():
-    # Placeholder - actual implementation will be in a face recognition controller
-    return jsonify({
-        'recognized': True,
-        'user_id': 1,
-        'confidence': 0.95
-    })
+    return recognize_face()
 
 # Liveness detection route
 @main_bp.route('/api/liveness/verify', methods=['POST'])
 def verify_liveness_route():
-    # Placeholder - actual implementation will be in a liveness detection controller
-    return jsonify({
-        'is_live': True,
-        'confidence': 0.98
-    })
+    return verify_liveness()
+
+@main_bp.route('/api/liveness/sessions', methods=['POST'])
+def start_liveness_session_route():
+    return start_liveness_session()
+
+@main_bp.route('/api/liveness/sessions/frames', methods=['POST'])
+def push_liveness_frames_route():
+    return push_liveness_frames()
 
 # Attendance routes
 @main_bp.route('/api/attendance/mark', methods=['POST'])
-@jwt_required()
 def mark_attendance_route():
-    # Placeholder - actual implementation will be in an attendance controller
-    return jsonify({'message': 'Attendance marked successfully'})
+    return mark_attendance()
+
+@main_bp.route('/api/attendance/group', methods=['POST'])
+def mark_group_attendance_route():
+    return mark_group_attendance()
+
+@main_bp.route('/api/attendance/bulk', methods=['POST'])
+def bulk_mark_attendance_route():
+    return bulk_mark_attendance()
 
 @main_bp.route('/api/attendance/report', methods=['GET'])
-@jwt_required()
 def get_attendance_report_route():
-    # Placeholder - actual implementation will be in an attendance controller
-    return jsonify([
-        {'date': '2023-01-01', 'subject': 'MATH101', 'status': 'present'},
-        {'date': '2023-01-02', 'subject': 'CS101', 'status': 'absent'},
-        {'date': '2023-01-03', 'subject': 'PHYS101', 'status': 'present'}
-    ])
+    return get_attendance_report()
+
+@main_bp.route('/api/attendance/export', methods=['GET'])
+def export_attendance_route():
+    return export_attendance()
 
 @main_bp.route('/api/attendance/stats', methods=['GET'])
-@jwt_required()
 def get_attendance_stats_route():
-    # Placeholder - actual implementation will be in an attendance controller
-    return jsonify({
-        'total_classes': 30,
-        'present': 25,
-        'absent': 3,
-        'late': 2,
-        'attendance_percentage': 83.33,
-        'subjects': [
-            {
-                'id': 1,
-                'name': 'Mathematics',
-                'code': 'MATH101',
-                'total_classes': 10,
-                'present': 9,
-                'absent': 1,
-                'late': 0,
-                'attendance_percentage': 90
-            },
-            {
-                'id': 2,
-                'name': 'Computer Science',
-                'code': 'CS101',
-                'total_classes': 10,
-                'present': 8,
-                'absent': 1,
-                'late': 1,
-                'attendance_percentage': 80
-            },
-            {
-                'id': 3,
-                'name': 'Physics',
-                'code': 'PHYS101',
-                'total_classes': 10,
-                'present': 8,
-                'absent': 1,
-                'late': 1,
-                'attendance_percentage': 80
-            }
-        ]
-    })
+    return get_attendance_stats()
+
+# PDF report job routes
+@main_bp.route('/api/reports', methods=['POST'])
+def submit_attendance_report_route():
+    return submit_attendance_report()
+
+@main_bp.route('/api/reports/cohort', methods=['POST'])
+def submit_cohort_report_route():
+    return submit_cohort_report()
+
+@main_bp.route('/api/reports/<job_id>', methods=['GET'])
+def get_report_status_route(job_id):
+    return get_report_status(job_id)
+
+@main_bp.route('/api/reports/<job_id>/download', methods=['GET'])
+def download_report_route(job_id):
+    return download_report(job_id)
+
+# Request profiling routes
+@main_bp.route('/api/admin/profiles/token', methods=['POST'])
+def create_profile_token_route():
+    return create_profile_token()
+
+@main_bp.route('/api/admin/profiles', methods=['GET'])
+def get_profiles_route():
+    return get_profiles()
+
+@main_bp.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+def download_profile_route(profile_id):
+    return download_profile(profile_id)
 
 # Subject routes
 @main_bp.route('/api/subjects', methods=['GET'])
@@ -0,0 +1,112 @@
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+from app.models.attendance import Attendance
+from app.models.attendance_rollup import AttendanceDailyRollup
+from app.models.subject import Subject
+
+# Rows per INSERT statement; keeps SQLite under its bound-parameter limit
+INSERT_BATCH_SIZE = 500
+
+UNIQUE_COLUMNS = ['user_id', 'subject_id', 'date']
+
+
+def insert_attendances(rows):
+    """
+    Insert attendance rows, skipping any that already exist for the same user, subject and day.
+    
+    Uses one set-based INSERT ... ON CONFLICT DO NOTHING per batch on
+    PostgreSQL and SQLite, backed by the unique index on
+    (user_id, subject_id, date). The daily rollup counters for the inserted
+    rows are updated in the same transaction, which the caller owns.
+    
+    Args:
+        rows (list): Dicts with user_id, subject_id, date, time, status,
+            verification_method and liveness_verified
+    
+    Returns:
+        set: (user_id, subject_id, date) keys of the rows actually inserted
+    """
+    if not rows:
+        return set()
+    
+    table = Attendance.__table__
+    dialect = db.session.get_bind().dialect.name
+    
+    if dialect == 'postgresql':
+        insert = postgresql_insert
+    elif dialect == 'sqlite':
+        insert = sqlite_insert
+    else:
+        return _insert_attendances_fallback(rows)
+    
+    inserted = set()
+    deltas = {}
+    for i in range(0, len(rows), INSERT_BATCH_SIZE):
+        stmt = (
+            insert(table)
+            .values(rows[i:i + INSERT_BATCH_SIZE])
+            .on_conflict_do_nothing(index_elements=UNIQUE_COLUMNS)
+            .returning(table.c.user_id, table.c.subject_id, table.c.date, table.c.status)
+        )
+        for user_id, subject_id, date, status in db.session.execute(stmt):
+            inserted.add((user_id, subject_id, date))
+            key = (user_id, subject_id, date, status)
+            deltas[key] = deltas.get(key, 0) + 1
+    
+    # Core inserts bypass the ORM events, so update the rollups explicitly
+    AttendanceDailyRollup.apply_deltas(db.session.connection(), deltas)
+    return inserted
+
+
+def _insert_attendances_fallback(rows):
+    """Check-then-insert for databases without ON CONFLICT support."""
+    table = Attendance.__table__
+    inserted = set()
+    for row in rows:
+        exists = db.session.query(
+            Attendance.query.filter_by(
+                user_id=row['user_id'], subject_id=row['subject_id'], date=row['date']
+            ).exists()
+        ).scalar()
+        if not exists:
+            db.session.execute(table.insert().values(**row))
+            inserted.add((row['user_id'], row['subject_id'], row['date']))
+            AttendanceDailyRollup.apply_deltas(db.session.connection(), {
+                (row['user_id'], row['subject_id'], row['date'], row['status']): 1
+            })
+    return inserted
+
+
+def iter_report_rows(conditions, batch_size=5000):
+    """
+    Yield the rows of an attendance report, newest first, in fixed-size batches.
+    
+    The subject code is joined in the same query, and rows are read through
+    a server-side cursor, so neither the ORM objects nor the full result set
+    are ever held in memory.
+    
+    Args:
+        conditions (list): Filter expressions on Attendance
+        batch_size (int): Rows fetched per round trip
+    
+    Yields:
+        Row: date, time, subject_code, status and verification_method
+    """
+    stmt = select(
+        Attendance.date,
+        Attendance.time,
+        Subject.code.label('subject_code'),
+        Attendance.status,
+        Attendance.verification_method
+    ).outerjoin(Subject, Subject.id == Attendance.subject_id).where(*conditions).order_by(
+        Attendance.date.desc(), Attendance.time.desc(), Attendance.id.desc()
+    ).execution_options(yield_per=batch_size)
+    
+    result = db.session.execute(stmt)
+    try:
+        for batch in result.partitions():
+            yield from batch
+    finally:
+        result.close()
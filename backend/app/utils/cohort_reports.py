@@ -0,0 +1,193 @@
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import groupby
+from types import SimpleNamespace
+from flask import current_app
+from sqlalchemy import select
+from werkzeug.utils import secure_filename
+from app import db
+from app.models.user import User
+from app.models.attendance import Attendance
+from app.models.subject import Subject
+
+logger = logging.getLogger(__name__)
+
+STUDENT_FIELDS = ('id', 'first_name', 'last_name', 'student_id')
+
+
+def _init_worker():
+    """Create the report styles once in each pool process."""
+    from app.utils.pdf_generator import get_report_styles
+    get_report_styles()
+
+
+def _render_student_report(task):
+    """Render one student's PDF in a pool process from plain data; returns (filename, path)."""
+    from app.utils.pdf_generator import generate_attendance_report, ReportRow
+    
+    student, subject, start_date, end_date, rows, output_dir, chunk_rows = task
+    
+    name = secure_filename(f"{student['student_id'] or student['id']}_{student['last_name']}_{student['first_name']}")
+    path = os.path.join(output_dir, f'{name}.pdf')
+    generate_attendance_report(
+        (ReportRow(*row) for row in rows),
+        user=SimpleNamespace(**student),
+        subject=SimpleNamespace(**subject) if subject else None,
+        start_date=start_date,
+        end_date=end_date,
+        output_path=path,
+        chunk_rows=chunk_rows
+    )
+    return f'{name}.pdf', path
+
+
+def cohort_conditions(subject_id=None, start_date=None, end_date=None):
+    """
+    Build the student and attendance filters for a cohort.
+    
+    A cohort is every student, or with a subject, every student with
+    attendance recorded in that subject.
+    
+    Returns:
+        tuple: (student_conditions, attendance_conditions)
+    """
+    student_conditions = [User.role == 'student']
+    attendance_conditions = [Attendance.user_id.in_(select(User.id).where(User.role == 'student'))]
+    if subject_id:
+        student_conditions.append(User.id.in_(
+            select(Attendance.user_id).where(Attendance.subject_id == subject_id)
+        ))
+        attendance_conditions.append(Attendance.subject_id == subject_id)
+    if start_date:
+        attendance_conditions.append(Attendance.date >= start_date)
+    if end_date:
+        attendance_conditions.append(Attendance.date <= end_date)
+    return student_conditions, attendance_conditions
+
+
+def _iter_student_rows(attendance_conditions, batch_size):
+    """Yield (user_id, rows) for every student with matching attendance, from one streamed query."""
+    stmt = select(
+        Attendance.user_id,
+        Attendance.date,
+        Attendance.time,
+        Subject.code,
+        Attendance.status,
+        Attendance.verification_method
+    ).outerjoin(Subject, Subject.id == Attendance.subject_id).where(*attendance_conditions).order_by(
+        Attendance.user_id, Attendance.date.desc(), Attendance.time.desc(), Attendance.id.desc()
+    ).execution_options(yield_per=batch_size)
+    
+    result = db.session.execute(stmt)
+    try:
+        for user_id, group in groupby(result, key=lambda row: row[0]):
+            yield user_id, [tuple(row[1:]) for row in group]
+    finally:
+        result.close()
+
+
+def build_cohort_archive(output_path, subject_id=None, start_date=None, end_date=None,
+                         workers=None, progress=None):
+    """
+    Render one attendance PDF per student in a cohort and zip them together.
+    
+    All attendance for the cohort is read in a single streamed query ordered
+    by student, and each student's rows are handed to a process pool as
+    plain data, so rendering scales with the number of cores while at most
+    a few students' rows are held in memory at once. Must be called inside
+    an application context.
+    
+    Args:
+        output_path (str): Where to write the zip archive
+        subject_id (int, optional): Restrict the cohort and the reports to a subject
+        start_date (date, optional): Start date for the report period
+        end_date (date, optional): End date for the report period
+        workers (int, optional): Pool size, defaults to COHORT_REPORT_WORKERS
+        progress (callable, optional): Called as progress(done, total) after
+            each report is added to the archive
+    
+    Returns:
+        int: Number of reports in the archive
+    
+    Raises:
+        ValueError: If subject_id does not exist
+    """
+    if workers is None:
+        workers = current_app.config.get('COHORT_REPORT_WORKERS', 2)
+    batch_size = current_app.config.get('ATTENDANCE_EXPORT_BATCH_SIZE', 5000)
+    chunk_rows = current_app.config.get('REPORT_TABLE_CHUNK_ROWS', 1000)
+    
+    subject = None
+    if subject_id:
+        row = db.session.get(Subject, subject_id)
+        if row is None:
+            raise ValueError(f'Subject {subject_id} not found')
+        subject = {'name': row.name, 'code': row.code}
+    
+    student_conditions, attendance_conditions = cohort_conditions(subject_id, start_date, end_date)
+    students = [
+        dict(zip(STUDENT_FIELDS, row))
+        for row in db.session.execute(
+            select(*(getattr(User, field) for field in STUDENT_FIELDS))
+            .where(*student_conditions).order_by(User.id)
+        )
+    ]
+    total = len(students)
+    
+    def tasks():
+        # Merge the students with their row groups; both are ordered by user ID
+        groups = _iter_student_rows(attendance_conditions, batch_size)
+        pending_group = next(groups, None)
+        for student in students:
+            while pending_group is not None and pending_group[0] < student['id']:
+                pending_group = next(groups, None)
+            rows = []
+            if pending_group is not None and pending_group[0] == student['id']:
+                rows = pending_group[1]
+                pending_group = next(groups, None)
+            yield (student, subject, start_date, end_date, rows, staging_dir, chunk_rows)
+    
+    staging_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(output_path)))
+    done = 0
+    try:
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            def add(result):
+                nonlocal done
+                filename, path = result
+                archive.write(path, filename)
+                os.unlink(path)
+                done += 1
+                if progress:
+                    progress(done, total)
+            
+            # Starting the pool costs more than rendering a handful of reports
+            if min(workers, total) <= 1 or total < current_app.config.get('COHORT_REPORT_MIN_POOL_STUDENTS', 50):
+                for task in tasks():
+                    add(_render_student_report(task))
+                return done
+            
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            ) as pool:
+                # Bound the tasks in flight so memory does not grow with the cohort
+                in_flight = set()
+                for task in tasks():
+                    if len(in_flight) >= 2 * workers:
+                        finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            add(future.result())
+                    in_flight.add(pool.submit(_render_student_report, task))
+                for future in in_flight:
+                    add(future.result())
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    
+    logger.info('Built cohort archive with %d reports', done)
+    return done
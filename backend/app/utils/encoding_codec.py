@@ -0,0 +1,65 @@
+import json
+import numpy as np
+
+# Encodings are stored as raw little-endian float32, 4 bytes per dimension
+ENCODING_DTYPE = np.dtype('<f4')
+
+
+def encoding_to_bytes(encoding):
+    """
+    Serialize a face encoding to its compact binary form.
+    
+    Args:
+        encoding (array-like): Face encoding
+        
+    Returns:
+        bytes: Raw little-endian float32 bytes (512 bytes for a 128-d vector)
+    """
+    return np.asarray(encoding, dtype=ENCODING_DTYPE).tobytes()
+
+
+def encoding_from_bytes(data):
+    """
+    Deserialize a binary face encoding without copying the buffer.
+    
+    Args:
+        data (bytes): Raw little-endian float32 bytes
+        
+    Returns:
+        numpy.ndarray: Read-only float32 view over the bytes
+    """
+    return np.frombuffer(data, dtype=ENCODING_DTYPE)
+
+
+def encoding_from_json(text):
+    """
+    Deserialize a legacy JSON-encoded face encoding.
+    
+    Args:
+        text (str): JSON list of floats, as written before the binary column existed
+        
+    Returns:
+        numpy.ndarray: float32 face encoding
+    """
+    return np.asarray(json.loads(text), dtype=ENCODING_DTYPE)
+
+
+def load_encoding(blob, text):
+    """
+    Read an encoding from whichever storage column is populated.
+    
+    The binary column wins; the JSON text column is only consulted for rows
+    written by older code during the rollout.
+    
+    Args:
+        blob (bytes, optional): Value of the binary encoding column
+        text (str, optional): Value of the legacy JSON encoding column
+        
+    Returns:
+        numpy.ndarray or None: Face encoding, or None if neither is set
+    """
+    if blob is not None:
+        return encoding_from_bytes(blob)
+    if text is not None:
+        return encoding_from_json(text)
+    return None
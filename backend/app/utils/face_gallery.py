@@ -0,0 +1,329 @@
+import threading
+import time
+import numpy as np
+from app.utils.encoding_codec import load_encoding
+from app.utils.metrics import timed
+
+ENCODING_DIMENSIONS = 128
+
+
+class FaceGallery:
+    """
+    In-memory gallery of registered face encodings for 1:N identification.
+
+    All encodings live in one contiguous float32 matrix with a parallel array
+    of user IDs, so a probe is answered with a single vectorized distance
+    computation instead of one comparison per user. The gallery is
+    process-wide: each worker process holds its own copy, loaded lazily from
+    the database on first use and updated in place on registration. Other
+    workers pick up a registration through refresh_from_db, which compares a
+    cheap database stamp and only re-reads the rows that changed.
+    """
+
+    def __init__(self, dimensions=ENCODING_DIMENSIONS, initial_capacity=1024):
+        self.dimensions = dimensions
+        self._lock = threading.RLock()
+        self._encodings = np.empty((initial_capacity, dimensions), dtype=np.float32)
+        self._sq_norms = np.empty(initial_capacity, dtype=np.float32)
+        self._user_ids = np.empty(initial_capacity, dtype=np.int64)
+        self._index = {}  # user_id -> row in the matrix
+        self._size = 0
+        self._stamp = None  # (registered count, latest updated_at) when last synced
+        self._checked_at = None
+        self.loaded = False
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, user_id):
+        return int(user_id) in self._index
+
+    def _grow(self, min_capacity):
+        """Grow the backing arrays geometrically so appends stay amortized O(1)."""
+        capacity = max(min_capacity, 2 * self._encodings.shape[0], 16)
+        encodings = np.empty((capacity, self.dimensions), dtype=np.float32)
+        sq_norms = np.empty(capacity, dtype=np.float32)
+        user_ids = np.empty(capacity, dtype=np.int64)
+        encodings[:self._size] = self._encodings[:self._size]
+        sq_norms[:self._size] = self._sq_norms[:self._size]
+        user_ids[:self._size] = self._user_ids[:self._size]
+        self._encodings, self._sq_norms, self._user_ids = encodings, sq_norms, user_ids
+
+    def load(self, entries):
+        """
+        Replace the gallery contents.
+
+        Args:
+            entries (iterable): (user_id, encoding) pairs
+        """
+        entries = list(entries)
+        with self._lock:
+            self._size = 0
+            self._index = {}
+            if len(entries) > self._encodings.shape[0]:
+                self._grow(len(entries))
+            for user_id, encoding in entries:
+                self._set_row(user_id, encoding)
+            self.loaded = True
+
+    @staticmethod
+    def _registered():
+        from app import db
+        from app.models.user import User
+        return db.or_(User.face_encoding_blob.isnot(None), User.face_encoding.isnot(None))
+
+    @classmethod
+    def _db_stamp(cls):
+        """Return (registered users, latest updated_at among them); changes with any registration."""
+        from app import db
+        from app.models.user import User
+
+        count, latest = db.session.query(
+            db.func.count(User.id), db.func.max(User.updated_at)
+        ).filter(cls._registered()).one()
+        return count, latest
+
+    def load_from_db(self):
+        """Load every registered encoding from the users table."""
+        from app.models.user import User
+
+        # Taken first, so a registration racing with the load shows up as stale next time
+        stamp = self._db_stamp()
+        rows = User.query.with_entities(
+            User.id, User.face_encoding_blob, User.face_encoding
+        ).filter(self._registered()).all()
+        self.load((user_id, load_encoding(blob, text)) for user_id, blob, text in rows)
+        self._stamp = stamp
+        self._checked_at = time.monotonic()
+
+    def needs_refresh(self, max_age):
+        checked_at = self._checked_at
+        return checked_at is None or time.monotonic() - checked_at > max_age
+
+    def refresh_from_db(self):
+        """
+        Catch up with registrations made by other worker processes.
+
+        Compares the (count, latest updated_at) stamp of registered users
+        with the one seen at the last sync. If it moved, only users updated
+        since then are re-read and added, replaced or removed; a full reload
+        happens only if the counts still disagree (e.g. a user was deleted).
+
+        Returns:
+            bool: True if the gallery changed
+        """
+        from app.models.user import User
+
+        if not self.loaded:
+            self.load_from_db()
+            return True
+
+        stamp = self._db_stamp()
+        self._checked_at = time.monotonic()
+        if stamp == self._stamp:
+            return False
+
+        previous_latest = self._stamp[1] if self._stamp else None
+        query = User.query.with_entities(User.id, User.face_encoding_blob, User.face_encoding)
+        if previous_latest is not None:
+            query = query.filter(User.updated_at >= previous_latest)
+        with self._lock:
+            for user_id, blob, text in query.all():
+                if blob is None and text is None:
+                    self.remove(user_id)
+                else:
+                    self.add(user_id, load_encoding(blob, text))
+            if self._size != stamp[0]:
+                self.load_from_db()
+                return True
+        self._stamp = stamp
+        return True
+
+    def _set_row(self, user_id, encoding):
+        encoding = np.asarray(encoding, dtype=np.float32).reshape(-1)
+        if encoding.shape[0] != self.dimensions:
+            raise ValueError(f'Expected a {self.dimensions}-d encoding, got {encoding.shape[0]}')
+
+        user_id = int(user_id)
+        row = self._index.get(user_id)
+        if row is None:
+            if self._size == self._encodings.shape[0]:
+                self._grow(self._size + 1)
+            row = self._size
+            self._size += 1
+            self._index[user_id] = row
+            self._user_ids[row] = user_id
+
+        self._encodings[row] = encoding
+        self._sq_norms[row] = np.dot(encoding, encoding)
+
+    def add(self, user_id, encoding):
+        """
+        Add or replace the encoding for a user in place.
+
+        Args:
+            user_id (int): ID of the user the encoding belongs to
+            encoding (array-like): Face encoding
+        """
+        with self._lock:
+            self._set_row(user_id, encoding)
+
+    def remove(self, user_id):
+        """
+        Remove a user's encoding, moving the last row into the freed slot.
+
+        Args:
+            user_id (int): ID of the user to remove
+
+        Returns:
+            bool: True if the user was in the gallery
+        """
+        with self._lock:
+            row = self._index.pop(int(user_id), None)
+            if row is None:
+                return False
+
+            last = self._size - 1
+            if row != last:
+                self._encodings[row] = self._encodings[last]
+                self._sq_norms[row] = self._sq_norms[last]
+                self._user_ids[row] = self._user_ids[last]
+                self._index[int(self._user_ids[row])] = row
+            self._size = last
+            return True
+
+    def distances(self, probe):
+        """
+        Compute the Euclidean distance from a probe to every gallery encoding.
+
+        Args:
+            probe (array-like): Face encoding to identify
+
+        Returns:
+            tuple: (user_ids, distances) arrays, aligned row by row
+        """
+        probe = np.asarray(probe, dtype=np.float32).reshape(-1)
+        with self._lock:
+            size = self._size
+            encodings = self._encodings[:size]
+            # |a - p|^2 = |a|^2 - 2 a.p + |p|^2, with |a|^2 precomputed per row
+            sq_dist = self._sq_norms[:size] - 2.0 * (encodings @ probe) + np.dot(probe, probe)
+            user_ids = self._user_ids[:size].copy()
+
+        np.maximum(sq_dist, 0.0, out=sq_dist)
+        return user_ids, np.sqrt(sq_dist)
+
+    def distance_matrix(self, probes):
+        """
+        Compute the distances from several probes to every gallery encoding at once.
+
+        Args:
+            probes (array-like): Face encodings of shape (n, dimensions)
+
+        Returns:
+            tuple: (user_ids, distances) where distances has shape (n, len(gallery))
+        """
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, self.dimensions)
+        with self._lock:
+            size = self._size
+            encodings = self._encodings[:size]
+            sq_dist = (
+                self._sq_norms[:size][np.newaxis, :]
+                - 2.0 * (probes @ encodings.T)
+                + np.einsum('ij,ij->i', probes, probes)[:, np.newaxis]
+            )
+            user_ids = self._user_ids[:size].copy()
+
+        np.maximum(sq_dist, 0.0, out=sq_dist)
+        return user_ids, np.sqrt(sq_dist)
+
+    @timed('face_gallery.match_many')
+    def match_many(self, probes, tolerance=0.6):
+        """
+        Assign each probe to at most one registered user, and each user to at most one probe.
+
+        Pairs are accepted greedily from the closest distance outward, so two
+        faces in the same photo can never both be credited to the same user.
+
+        Args:
+            probes (array-like): Face encodings of shape (n, dimensions)
+            tolerance (float): Maximum distance for a match (lower is stricter)
+
+        Returns:
+            list: One (user_id, distance) tuple or None per probe, in probe order
+        """
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, self.dimensions)
+        matches = [None] * probes.shape[0]
+        user_ids, distances = self.distance_matrix(probes)
+        if distances.size == 0:
+            return matches
+
+        probe_idx, gallery_idx = np.nonzero(distances <= tolerance)
+        order = np.argsort(distances[probe_idx, gallery_idx], kind='stable')
+        taken_users = set()
+        for i in order:
+            p, g = probe_idx[i], gallery_idx[i]
+            if matches[p] is not None or g in taken_users:
+                continue
+            matches[p] = (int(user_ids[g]), float(distances[p, g]))
+            taken_users.add(g)
+
+        return matches
+
+    @timed('face_gallery.search')
+    def search(self, probe, tolerance=0.6, k=1):
+        """
+        Find the closest registered users to a probe encoding.
+
+        Args:
+            probe (array-like): Face encoding to identify
+            tolerance (float): Maximum distance for a match (lower is stricter)
+            k (int): Maximum number of candidates to return
+
+        Returns:
+            list: (user_id, distance) tuples within tolerance, closest first
+        """
+        user_ids, distances = self.distances(probe)
+        if distances.shape[0] == 0 or k <= 0:
+            return []
+
+        k = min(k, distances.shape[0])
+        if k < distances.shape[0]:
+            top = np.argpartition(distances, k - 1)[:k]
+        else:
+            top = np.arange(distances.shape[0])
+        top = top[np.argsort(distances[top])]
+
+        return [
+            (int(user_ids[i]), float(distances[i]))
+            for i in top
+            if distances[i] <= tolerance
+        ]
+
+
+# Process-wide gallery shared by every request in this worker
+face_gallery = FaceGallery()
+_load_lock = threading.Lock()
+
+
+def get_face_gallery(max_age=None):
+    """
+    Return the process-wide gallery, loading it on first use and syncing it at most every max_age seconds.
+
+    Must be called inside an application context.
+
+    Args:
+        max_age (float, optional): Seconds between database syncs, defaults to
+            FACE_GALLERY_REFRESH_SECONDS
+    """
+    from flask import current_app
+
+    if max_age is None:
+        max_age = current_app.config.get('FACE_GALLERY_REFRESH_SECONDS', 5)
+    if not face_gallery.loaded or face_gallery.needs_refresh(max_age):
+        with _load_lock:
+            if not face_gallery.loaded:
+                face_gallery.load_from_db()
+            elif face_gallery.needs_refresh(max_age):
+                face_gallery.refresh_from_db()
+    return face_gallery
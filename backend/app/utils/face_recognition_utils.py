@@ -1,22 +1,65 @@
 import numpy as np
-import cv2
-import os
-from flask import current_app
+from app.utils.image_utils import load_image
+from app.utils.metrics import timed
+
+# The mock landmarks read a frame this dark (mean 0-255 intensity) as closed
+# eyes, so a clip with dark frames, or covering the camera, makes a blink
+MOCK_CLOSED_EYES_BRIGHTNESS = 40
+
+MOCK_OPEN_EYES = {
+    'left_eye': [(20, 30), (24, 28), (28, 28), (32, 30), (28, 32), (24, 32)],
+    'right_eye': [(60, 30), (64, 28), (68, 28), (72, 30), (68, 32), (64, 32)]
+}
+MOCK_CLOSED_EYES = {
+    'left_eye': [(20, 30), (24, 29.5), (28, 29.5), (32, 30), (28, 30.5), (24, 30.5)],
+    'right_eye': [(60, 30), (64, 29.5), (68, 29.5), (72, 30), (68, 30.5), (64, 30.5)]
+}
 
 # Mock implementation for development without face_recognition
-def encode_face(image_path):
+def load_models():
+    """
+    Load the face detection, encoding and landmark models into this process.
+    
+    Call once per process (e.g. in a worker initializer) so the first request
+    does not pay the model-load latency.
+    """
+    # Nothing to load for the mock implementation
+    return None
+
+@timed('encode_face')
+def encode_face(image):
     """
     Generate face encoding from an image.
     
     Args:
-        image_path (str): Path to the image file
+        image (numpy.ndarray or str): Decoded image, or a path to the image file
         
     Returns:
         numpy.ndarray: Mock face encoding
     """
+    image = load_image(image)
+    
     # Return a mock encoding (random vector)
     return np.random.rand(128)
 
+@timed('encode_faces')
+def encode_faces(image, face_locations):
+    """
+    Generate face encodings for several faces in one image in a single batch.
+    
+    Args:
+        image (numpy.ndarray or str): Decoded image, or a path to the image file
+        face_locations (list): Face locations as (top, right, bottom, left) tuples,
+            as returned by detect_faces
+        
+    Returns:
+        numpy.ndarray: Array of shape (len(face_locations), 128), one encoding per face
+    """
+    image = load_image(image)
+    
+    # Return mock encodings (random vectors)
+    return np.random.rand(len(face_locations), 128)
+
 def compare_faces(known_encoding, unknown_encoding, tolerance=0.6):
     """
     Compare a known face encoding with an unknown face encoding.
@@ -32,28 +75,36 @@ def compare_faces(known_encoding, unknown_encoding, tolerance=0.6):
     # For development, always return True (mock implementation)
     return True
 
-def detect_faces(image_path):
+@timed('detect_faces')
+def detect_faces(image):
     """
     Detect faces in an image and return their locations.
     
     Args:
-        image_path (str): Path to the image file
+        image (numpy.ndarray or str): Decoded image, or a path to the image file
         
     Returns:
         list: List of face locations as (top, right, bottom, left) tuples
     """
+    image = load_image(image)
+    
     # Return a mock face location
     return [(0, 100, 100, 0)]
 
-def get_face_landmarks(image_path):
+@timed('get_face_landmarks')
+def get_face_landmarks(image):
     """
     Get facial landmarks for faces in an image.
     
     Args:
-        image_path (str): Path to the image file
+        image (numpy.ndarray or str): Decoded image, or a path to the image file
         
     Returns:
         list: List of facial landmarks for each face
     """
-    # Return mock landmarks
-    return [{'left_eye': [(20, 30), (25, 30)], 'right_eye': [(70, 30), (75, 30)]}]
+    image = load_image(image)
+    
+    # Return mock landmarks (6 points per eye, in dlib's 68-point ordering):
+    # open eyes (EAR 0.33) normally, closed eyes (EAR 0.08) for a dark frame
+    closed = np.asarray(image)[::8, ::8].mean() < MOCK_CLOSED_EYES_BRIGHTNESS
+    return [dict(MOCK_CLOSED_EYES if closed else MOCK_OPEN_EYES)]
@@ -0,0 +1,135 @@
+import atexit
+import logging
+import multiprocessing
+import multiprocessing.util
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from app.utils.face_recognition_utils import get_face_landmarks, load_models
+from app.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_pid = None
+_pool_workers = None
+_pool_finalizer_pid = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    """Preload the models once in each pool process."""
+    load_models()
+
+
+def _extract_chunk(frames):
+    return [get_face_landmarks(frame) for frame in frames]
+
+
+def get_frame_pool(workers):
+    """
+    Return the process pool shared by every request in this worker.
+    
+    The pool is created lazily and re-created if this process was forked
+    after the pool started (e.g. by a preloading gunicorn master), since
+    pool handles do not survive a fork.
+    
+    Args:
+        workers (int): Number of pool processes
+        
+    Returns:
+        ProcessPoolExecutor: Shared pool
+    """
+    global _pool, _pool_pid, _pool_workers, _pool_finalizer_pid
+    
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid() or _pool_workers != workers:
+            if _pool is not None and _pool_pid == os.getpid():
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+            _pool_pid = os.getpid()
+            _pool_workers = workers
+            if _pool_finalizer_pid != _pool_pid:
+                # A multiprocessing child joins its own children before atexit
+                # handlers run, so the pool must be shut down ahead of that join,
+                # and ahead of the finalizers closing the pool's queues (priority 10)
+                multiprocessing.util.Finalize(None, shutdown_frame_pool, kwargs={'wait': True}, exitpriority=100)
+                _pool_finalizer_pid = _pool_pid
+        return _pool
+
+
+def shutdown_frame_pool(wait=False):
+    """Shut down this process's pool, if it owns one; wait=True also waits for its processes to exit."""
+    global _pool
+    
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=wait, cancel_futures=True)
+        _pool = None
+
+
+atexit.register(shutdown_frame_pool)
+
+
+@timed('extract_landmarks')
+def extract_landmarks(frames, workers=None, timeout=None):
+    """
+    Extract facial landmarks for a frame sequence, fanning out across processes.
+    
+    Frames are split into contiguous chunks, one per pool process, and the
+    results are reassembled in frame order. Short sequences, a disabled pool,
+    a daemonic caller (which may not start processes), a broken pool and
+    chunks that miss the time budget all fall back to in-process extraction,
+    so the result is always complete.
+    
+    Args:
+        frames (list): Sequence of decoded frames (numpy.ndarray) or paths to frame images
+        workers (int, optional): Pool size, defaults to LIVENESS_POOL_WORKERS
+        timeout (float, optional): Seconds to wait for the pool, defaults to
+            LIVENESS_POOL_TIMEOUT_SECONDS
+        
+    Returns:
+        list: One get_face_landmarks result per frame, in frame order
+    """
+    frames = list(frames)
+    if workers is None:
+        workers = current_app.config.get('LIVENESS_POOL_WORKERS', 0)
+    if timeout is None:
+        timeout = current_app.config.get('LIVENESS_POOL_TIMEOUT_SECONDS', 5)
+    min_frames = current_app.config.get('LIVENESS_POOL_MIN_FRAMES', 8)
+    
+    if workers <= 1 or len(frames) < max(min_frames, 2) or multiprocessing.current_process().daemon:
+        return _extract_chunk(frames)
+    
+    chunk_size = -(-len(frames) // workers)
+    chunks = [frames[i:i + chunk_size] for i in range(0, len(frames), chunk_size)]
+    
+    try:
+        pool = get_frame_pool(workers)
+        futures = [pool.submit(_extract_chunk, chunk) for chunk in chunks]
+    except (BrokenProcessPool, OSError, RuntimeError) as e:
+        logger.warning('Frame pool unavailable, extracting in-process: %s', e)
+        shutdown_frame_pool()
+        return _extract_chunk(frames)
+    
+    deadline = time.monotonic() + timeout
+    results = []
+    for chunk, future in zip(chunks, futures):
+        try:
+            results.extend(future.result(timeout=max(deadline - time.monotonic(), 0)))
+        except FutureTimeoutError:
+            future.cancel()
+            results.extend(_extract_chunk(chunk))
+        except BrokenProcessPool as e:
+            logger.warning('Frame pool broke mid-request, extracting in-process: %s', e)
+            shutdown_frame_pool()
+            results.extend(_extract_chunk(chunk))
+    
+    return results
@@ -0,0 +1,64 @@
+import base64
+import binascii
+import cv2
+import numpy as np
+
+
+def decode_base64_image(image_data):
+    """
+    Decode a base64 image (optionally a data URL) into raw bytes.
+    
+    Args:
+        image_data (str or bytes): Base64 payload, with or without a
+            "data:image/...;base64," prefix
+        
+    Returns:
+        bytes: Encoded image bytes, or None if the payload is not valid base64
+    """
+    if isinstance(image_data, str):
+        if image_data.startswith('data:image'):
+            # Remove the data URL prefix if present
+            image_data = image_data.split(',', 1)[1]
+        image_data = image_data.encode('ascii', 'ignore')
+    
+    try:
+        return base64.b64decode(image_data)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def decode_image(image_data):
+    """
+    Decode request image data straight into a BGR image buffer, without touching disk.
+    
+    Args:
+        image_data (str or bytes): Base64 string (optionally a data URL) or raw
+            encoded image bytes (JPEG, PNG, ...)
+        
+    Returns:
+        numpy.ndarray: Decoded image of shape (height, width, 3), or None if the
+            data could not be decoded
+    """
+    if isinstance(image_data, str):
+        image_data = decode_base64_image(image_data)
+    if not image_data:
+        return None
+    
+    # Wrap the bytes without copying them; imdecode reads straight from the buffer
+    buffer = np.frombuffer(memoryview(image_data), dtype=np.uint8)
+    return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+
+
+def load_image(image):
+    """
+    Normalize an image argument to a NumPy array.
+    
+    Args:
+        image (numpy.ndarray or str): Decoded image, or a path to an image file
+        
+    Returns:
+        numpy.ndarray: Image buffer
+    """
+    if isinstance(image, np.ndarray):
+        return image
+    return cv2.imread(image)
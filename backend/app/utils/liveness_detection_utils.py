@@ -1,8 +1,10 @@
-import cv2
 import numpy as np
 from flask import current_app
+from app.utils.image_utils import load_image
+from app.utils.face_recognition_utils import get_face_landmarks
+from app.utils.metrics import timed
 
-# Mock implementation for development without dlib
+# Landmark extraction is mocked in face_recognition_utils for development without dlib
 def eye_aspect_ratio(eye):
     """
     Calculate the eye aspect ratio (EAR) which is used to detect blinks.
@@ -13,37 +15,157 @@ def eye_aspect_ratio(eye):
     Returns:
         float: Eye aspect ratio
     """
-    # Return a mock EAR value
-    return 0.3
+    eye = np.asarray(eye, dtype=np.float64)
+    vertical = np.linalg.norm(eye[1] - eye[5]) + np.linalg.norm(eye[2] - eye[4])
+    horizontal = np.linalg.norm(eye[0] - eye[3])
+    return float(vertical / (2.0 * horizontal))
 
-def detect_blinks(frame_paths, threshold=None):
+def eye_aspect_ratio_batch(landmarks):
+    """
+    Calculate the eye aspect ratio of both eyes across many frames in one pass.
+    
+    Args:
+        landmarks (numpy.ndarray): Eye landmarks of shape (N, 2, 6, 2) - frames,
+            eyes (left, right), the 6 eye points, and (x, y). Frames without a
+            face may be filled with NaN.
+        
+    Returns:
+        numpy.ndarray: EAR values of shape (N, 2), NaN where no face was found
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    vertical = (
+        np.linalg.norm(landmarks[..., 1, :] - landmarks[..., 5, :], axis=-1)
+        + np.linalg.norm(landmarks[..., 2, :] - landmarks[..., 4, :], axis=-1)
+    )
+    horizontal = np.linalg.norm(landmarks[..., 0, :] - landmarks[..., 3, :], axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return vertical / (2.0 * horizontal)
+
+def landmarks_to_array(face_landmarks):
+    """
+    Stack per-frame landmarks into the (N, 2, 6, 2) layout used by eye_aspect_ratio_batch.
+    
+    Args:
+        face_landmarks (list): One get_face_landmarks result per frame
+        
+    Returns:
+        numpy.ndarray: Eye landmarks, NaN for frames where no face was found
+    """
+    eyes = np.full((len(face_landmarks), 2, 6, 2), np.nan)
+    for i, faces in enumerate(face_landmarks):
+        if faces:
+            eyes[i, 0] = faces[0]['left_eye']
+            eyes[i, 1] = faces[0]['right_eye']
+    return eyes
+
+def count_blinks(ear_series, threshold, consec_frames=1):
+    """
+    Count blinks in an EAR series without a per-frame Python loop.
+    
+    A blink is a run of at least consec_frames consecutive frames below the
+    threshold that ends with the eyes reopening, matching update_blink_state.
+    
+    Args:
+        ear_series (numpy.ndarray): EAR per frame; NaN counts as eyes open
+        threshold (float): EAR threshold below which the eyes count as closed
+        consec_frames (int): Minimum closed run length that counts as a blink
+        
+    Returns:
+        int: Number of blinks detected
+    """
+    ear_series = np.asarray(ear_series, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        closed = (ear_series < threshold).astype(np.int8)
+    
+    # +1 marks where a closed run starts, -1 where the eyes reopen
+    edges = np.diff(np.concatenate(([0], closed, [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    
+    # Runs still closed at the last frame have not reopened yet
+    reopened = ends < ear_series.shape[0]
+    return int(np.count_nonzero((ends - starts >= consec_frames) & reopened))
+
+def frame_eye_aspect_ratio(frame):
+    """
+    Calculate the mean eye aspect ratio of both eyes in a single frame.
+    
+    Args:
+        frame (numpy.ndarray or str): Decoded frame, or a path to the frame image
+        
+    Returns:
+        float: Mean EAR of the left and right eye, or None if no face was found
+    """
+    landmarks = get_face_landmarks(frame)
+    if not landmarks:
+        return None
+    
+    face = landmarks[0]
+    return (eye_aspect_ratio(face['left_eye']) + eye_aspect_ratio(face['right_eye'])) / 2.0
+
+def update_blink_state(state, ear, threshold, consec_frames):
+    """
+    Advance a blink counter by one frame.
+    
+    A blink is counted when the eyes reopen after staying below the EAR
+    threshold for at least consec_frames consecutive frames.
+    
+    Args:
+        state (dict): Counter state with 'closed_frames' and 'blinks' keys; updated in place
+        ear (float): Eye aspect ratio of the new frame, or None if no face was found
+        threshold (float): EAR threshold below which the eyes count as closed
+        consec_frames (int): Minimum closed run length that counts as a blink
+        
+    Returns:
+        dict: The updated state
+    """
+    if ear is not None and ear < threshold:
+        state['closed_frames'] += 1
+    else:
+        if state['closed_frames'] >= consec_frames:
+            state['blinks'] += 1
+        state['closed_frames'] = 0
+    return state
+
+@timed('detect_blinks')
+def detect_blinks(frames, threshold=None, consec_frames=None):
     """
     Detect blinks in a sequence of video frames.
     
     Args:
-        frame_paths (list): List of paths to frame images
+        frames (list): Sequence of decoded frames (numpy.ndarray) or paths to frame images
         threshold (float, optional): EAR threshold for blink detection
+        consec_frames (int, optional): Minimum closed-eye run length that counts as a blink
         
     Returns:
         int: Number of blinks detected
     """
+    from app.utils.frame_pool import extract_landmarks
+    
     if threshold is None:
         threshold = current_app.config.get('BLINK_THRESHOLD', 0.3)
+    if consec_frames is None:
+        consec_frames = current_app.config.get('BLINK_CONSEC_FRAMES', 2)
     
-    # For development, return a random number of blinks between 2 and 5
-    return np.random.randint(2, 6)
+    # Landmark extraction is the CPU-heavy part; fan it out across the frame pool
+    landmarks = landmarks_to_array(extract_landmarks(frames))
+    ear = eye_aspect_ratio_batch(landmarks).mean(axis=1)
+    return count_blinks(ear, threshold, consec_frames)
 
-def analyze_thermal_image(image_path):
+@timed('analyze_thermal_image')
+def analyze_thermal_image(image):
     """
     Analyze a thermal image to detect if it's a real person.
     This is a simplified implementation - in a real system, you would use
     more sophisticated thermal analysis techniques.
     
     Args:
-        image_path (str): Path to the thermal image
+        image (numpy.ndarray or str): Decoded thermal image, or a path to it
         
     Returns:
         tuple: (is_live, confidence) where is_live is a boolean and confidence is a float
     """
+    image = load_image(image)
+    
     # For development, always return True with high confidence
     return True, 0.95
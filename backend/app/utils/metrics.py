@@ -0,0 +1,473 @@
+import functools
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    import fcntl
+except ImportError:  # Windows; the gunicorn deployment that shares METRICS_DIR is Unix-only
+    fcntl = None
+
+# Kept free of numpy and the face/liveness libraries: the utils that import
+# this module for @timed must stay cheap to import
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Files in METRICS_DIR: one snapshot per live worker, plus the counters and
+# histograms of every exited worker folded into one file
+SNAPSHOT_PATTERN = 'metrics-[0-9]*.json'
+EXITED_NAME = 'metrics-exited.json'
+EXITED_LOCK_NAME = 'metrics-exited.lock'
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_last_flush = 0.0
+_snapshot_name = None
+
+
+class Histogram:
+    """
+    A labelled histogram with fixed bucket bounds, in the Prometheus model.
+    
+    Observations only bump one bucket (found by bisection) and the running
+    sum; the cumulative counts Prometheus expects are computed when rendering.
+    """
+    
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.series = {}  # labels tuple -> [per-bucket counts (last one is +Inf), sum]
+    
+    def observe(self, labels, value):
+        with _lock:
+            entry = self.series.get(labels)
+            if entry is None:
+                entry = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+    
+    def snapshot(self):
+        with _lock:
+            series = [[list(labels), list(counts), total] for labels, (counts, total) in self.series.items()]
+        return {
+            'type': 'histogram', 'help': self.documentation, 'labelnames': list(self.labelnames),
+            'buckets': list(self.buckets), 'series': series
+        }
+    
+    def reset(self):
+        with _lock:
+            self.series = {}
+
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Time spent handling a request.',
+    ('method', 'endpoint', 'status'), LATENCY_BUCKETS
+)
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries', 'SQL statements executed while handling a request.',
+    ('method', 'endpoint'), QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_seconds', 'Time spent executing SQL while handling a request.',
+    ('method', 'endpoint'), LATENCY_BUCKETS
+)
+REQUEST_SIZE = Histogram(
+    'http_request_size_bytes', 'Request body size.', ('method', 'endpoint'), SIZE_BUCKETS
+)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', 'Response body size; streamed responses are not counted.',
+    ('method', 'endpoint'), SIZE_BUCKETS
+)
+UTIL_DURATION = Histogram(
+    'util_call_duration_seconds', 'Time spent in face recognition and liveness utilities.',
+    ('function',), LATENCY_BUCKETS
+)
+
+HISTOGRAMS = (REQUEST_DURATION, REQUEST_QUERIES, REQUEST_DB_TIME, REQUEST_SIZE, RESPONSE_SIZE, UTIL_DURATION)
+
+
+def _reset_after_fork():
+    # A forked worker starts from zero; the parent's observations stay the parent's
+    global _last_flush, _snapshot_name
+    for histogram in HISTOGRAMS:
+        histogram.reset()
+    _last_flush = 0.0
+    _snapshot_name = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def timed(name):
+    """
+    Decorator recording each call's duration in util_call_duration_seconds.
+    
+    Args:
+        name (str): Value of the function label
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                UTIL_DURATION.observe((name,), time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    current = g.get('request_metrics') if has_request_context() else None
+    if current is not None:
+        current[1] += 1
+        current[2] += elapsed
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    starts = context.connection.info.get('metrics_query_start') if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def _before_request():
+    # [start, SQL statements, SQL seconds]
+    g.request_metrics = [time.perf_counter(), 0, 0.0]
+
+
+def _after_request(response):
+    current = g.pop('request_metrics', None)
+    if current is None:
+        return response
+    
+    # Label by URL rule, not path, so ids in URLs do not explode the series count
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    labels = (request.method, endpoint)
+    REQUEST_DURATION.observe(labels + (str(response.status_code),), time.perf_counter() - current[0])
+    REQUEST_QUERIES.observe(labels, current[1])
+    REQUEST_DB_TIME.observe(labels, current[2])
+    REQUEST_SIZE.observe(labels, request.content_length or 0)
+    if response.content_length is not None:
+        RESPONSE_SIZE.observe(labels, response.content_length)
+    
+    maybe_flush()
+    return response
+
+
+def _hashing_snapshot():
+    """This process's password hashing metrics in snapshot form."""
+    from app.utils.password_hashing import LATENCY_BUCKETS as HASH_BUCKETS, hashing_metrics
+    
+    metrics = hashing_metrics()
+    series = []
+    for operation, stats in metrics['operations'].items():
+        cumulative = list(stats['buckets'].values())
+        counts = [cumulative[0]] + [b - a for a, b in zip(cumulative, cumulative[1:])]
+        counts.append(stats['count'] - cumulative[-1])
+        series.append([[operation], counts, stats['sum']])
+    
+    def single(metric_type, documentation, value):
+        return {'type': metric_type, 'help': documentation, 'labelnames': [], 'series': [[[], value]]}
+    
+    return {
+        'password_hash_duration_seconds': {
+            'type': 'histogram', 'help': 'Time spent in bcrypt, by operation.', 'labelnames': ['operation'],
+            'buckets': list(HASH_BUCKETS), 'series': series
+        },
+        'password_hash_queue_wait_seconds_total': single(
+            'counter', 'Time hash calls spent queued for a hashing thread.', metrics['queue_wait_seconds_sum']
+        ),
+        'password_hash_rejected_total': single(
+            'counter', 'Hash calls refused because the queue was full.', metrics['rejected']
+        ),
+        'password_hash_queue_depth': single('gauge', 'Hash calls waiting for a thread.', metrics['queue_depth']),
+        'password_hash_running': single('gauge', 'Hash calls running.', metrics['running'])
+    }
+
+
+def snapshot():
+    """
+    Return this process's metrics as a JSON-serializable dict.
+    
+    Returns:
+        dict: Metric name -> type, help text, label names, bucket bounds
+            (histograms only) and a list of [label values, value(s)] series
+    """
+    metrics = {histogram.name: histogram.snapshot() for histogram in HISTOGRAMS}
+    metrics.update(_hashing_snapshot())
+    return metrics
+
+
+def _metrics_dir():
+    return current_app.config.get('METRICS_DIR') if has_app_context() else None
+
+
+def _write_json(path, data):
+    # Readers only ever see a complete file
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None  # Removed, or not there yet
+
+
+def _write_snapshot(directory):
+    # Callers hold _flush_lock, so no two threads share the temporary file
+    global _last_flush, _snapshot_name
+    
+    if _snapshot_name is None:
+        _snapshot_name = f'metrics-{os.getpid()}-{time.time_ns()}.json'
+    os.makedirs(directory, exist_ok=True)
+    _write_json(os.path.join(directory, _snapshot_name), {'pid': os.getpid(), 'metrics': snapshot()})
+    _last_flush = time.monotonic()
+
+
+def flush():
+    """
+    Write this process's snapshot to METRICS_DIR for other workers to merge.
+    
+    The file name carries the pid and a start timestamp, so a later process
+    that reuses the pid does not overwrite an exited worker's counters.
+    Waits for a flush already running in another thread.
+    """
+    directory = _metrics_dir()
+    if not directory:
+        return
+    with _flush_lock:
+        _write_snapshot(directory)
+
+
+def maybe_flush():
+    """Flush if METRICS_FLUSH_SECONDS have passed; never blocks a request behind another flush."""
+    directory = _metrics_dir()
+    if not directory:
+        return
+    interval = current_app.config.get('METRICS_FLUSH_SECONDS', 5)
+    if time.monotonic() - _last_flush < interval or not _flush_lock.acquire(blocking=False):
+        return
+    try:
+        _write_snapshot(directory)
+    except OSError:
+        logger.exception('Could not write the metrics snapshot')
+    finally:
+        _flush_lock.release()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _merge(total, metrics, include_gauges):
+    for name, metric in metrics.items():
+        if metric['type'] == 'gauge' and not include_gauges:
+            continue
+        merged = total.setdefault(name, dict(metric, series={}))
+        for entry in metric['series']:
+            labels, values = tuple(entry[0]), entry[1:]
+            if labels not in merged['series']:
+                merged['series'][labels] = [list(v) if isinstance(v, list) else v for v in values]
+                continue
+            for i, value in enumerate(values):
+                current = merged['series'][labels][i]
+                if isinstance(value, list):
+                    merged['series'][labels][i] = [a + b for a, b in zip(current, value)]
+                else:
+                    merged['series'][labels][i] = current + value
+
+
+def _to_snapshot(merged):
+    """Turn _merge output back into snapshot form."""
+    return {
+        name: dict(metric, series=[[list(labels)] + values for labels, values in metric['series'].items()])
+        for name, metric in merged.items()
+    }
+
+
+def _fold_exited(directory, paths):
+    """
+    Merge exited workers' snapshots into the exited-workers file and delete them.
+    
+    Runs under an exclusive lock on a file in METRICS_DIR, so two workers
+    collecting at once never fold the same snapshot twice; a snapshot
+    already gone was folded by the other worker.
+    """
+    with open(os.path.join(directory, EXITED_LOCK_NAME), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)  # Released when the file is closed
+        exited_path = os.path.join(directory, EXITED_NAME)
+        exited = {}
+        data = _read_json(exited_path)
+        if data is not None:
+            _merge(exited, data['metrics'], include_gauges=False)
+        
+        folded = []
+        for path in paths:
+            data = _read_json(path)
+            if data is not None:
+                _merge(exited, data['metrics'], include_gauges=False)
+                folded.append(path)
+        if not folded:
+            return
+        
+        _write_json(exited_path, {'pid': None, 'metrics': _to_snapshot(exited)})
+        for path in folded:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def collect():
+    """
+    Merge the metrics of every worker sharing METRICS_DIR.
+    
+    This process's own snapshot is always current; other workers' are as
+    fresh as their last flush. Counters and histograms of exited workers are
+    kept so totals never go backwards, while their gauges are dropped. The
+    first collect to see an exited worker's snapshot folds it into one
+    shared file, so the directory does not grow with worker restarts.
+    
+    Returns:
+        dict: Metric name -> metric, with series keyed by label values
+    """
+    directory = _metrics_dir()
+    total = {}
+    if not directory:
+        _merge(total, snapshot(), include_gauges=True)
+        return total
+    
+    flush()
+    exited = []
+    for path in sorted(glob.glob(os.path.join(directory, SNAPSHOT_PATTERN))):
+        data = _read_json(path)
+        if data is None:
+            continue  # Folded by another worker; counted in the exited-workers file
+        if _pid_alive(data['pid']):
+            _merge(total, data['metrics'], include_gauges=True)
+        elif fcntl is None:
+            _merge(total, data['metrics'], include_gauges=False)
+        else:
+            exited.append(path)
+    
+    if exited:
+        try:
+            _fold_exited(directory, exited)
+        except OSError:
+            logger.exception('Could not fold exited workers into the metrics')
+            for path in exited:
+                data = _read_json(path)
+                if data is not None:
+                    _merge(total, data['metrics'], include_gauges=False)
+    data = _read_json(os.path.join(directory, EXITED_NAME))
+    if data is not None:
+        _merge(total, data['metrics'], include_gauges=False)
+    return total
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_bound(bound):
+    return repr(float(bound)) if isinstance(bound, float) else f'{bound}'
+
+
+def render(metrics):
+    """
+    Render merged metrics in the Prometheus text exposition format.
+    
+    Args:
+        metrics (dict): As returned by collect()
+    
+    Returns:
+        str: Exposition text
+    """
+    lines = []
+    for name, metric in sorted(metrics.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        names = metric['labelnames']
+        for labels, values in sorted(metric['series'].items()):
+            if metric['type'] != 'histogram':
+                lines.append(f'{name}{_labels(names, labels)} {values[0]}')
+                continue
+            counts, total = values
+            cumulative = 0
+            for bound, count in zip(list(metric['buckets']) + ['+Inf'], counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == '+Inf' else f'le="{_format_bound(bound)}"'
+                lines.append(f'{name}_bucket{_labels(names, labels, le)} {cumulative}')
+            lines.append(f'{name}_sum{_labels(names, labels)} {total}')
+            lines.append(f'{name}_count{_labels(names, labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def clear_metrics_dir(directory):
+    """Remove the snapshots of a previous server run; call once before workers start."""
+    for path in glob.glob(os.path.join(directory, 'metrics-*')):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def init_metrics(app):
+    """
+    Record per-request metrics for an application.
+    
+    Adds before/after request hooks and, once per process, SQLAlchemy
+    cursor listeners that attribute SQL statements to the current request.
+    
+    Args:
+        app (Flask): Application to instrument
+    """
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from flask import current_app, has_app_context
+
+# Upper bounds (seconds) of the hash latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_executor = None
+_executor_pid = None
+_state_lock = threading.Lock()
+_in_flight = 0  # Operations admitted: queued plus running
+_running = 0
+_average_seconds = None  # Moving average of recent bcrypt call durations
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when the hashing queue is full; callers should answer 503."""
+    
+    def __init__(self, retry_after):
+        super().__init__('Password hashing is saturated')
+        self.retry_after = retry_after
+
+
+def _config(key, default):
+    return current_app.config.get(key, default) if has_app_context() else default
+
+
+def _new_metrics():
+    return {
+        'operations': {
+            operation: {'count': 0, 'sum': 0.0, 'buckets': [0] * len(LATENCY_BUCKETS)}
+            for operation in ('hash', 'verify')
+        },
+        'queue_wait_seconds_sum': 0.0,
+        'queue_depth_max': 0,
+        'rejected': 0
+    }
+
+
+_metrics = _new_metrics()
+
+
+def _get_executor():
+    """Return this process's hashing executor, creating it after fork if needed."""
+    global _executor, _executor_pid
+    
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ThreadPoolExecutor(
+            max_workers=_config('PASSWORD_HASH_WORKERS', 2),
+            thread_name_prefix='password-hash'
+        )
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def _observe(operation, waited, duration):
+    global _average_seconds
+    
+    with _state_lock:
+        if _average_seconds is None:
+            _average_seconds = duration
+        else:
+            _average_seconds += 0.2 * (duration - _average_seconds)
+        stats = _metrics['operations'][operation]
+        stats['count'] += 1
+        stats['sum'] += duration
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if duration <= bound:
+                stats['buckets'][i] += 1
+        _metrics['queue_wait_seconds_sum'] += waited
+
+
+def _run(operation, fn, *args):
+    """
+    Run a bcrypt call on the dedicated executor, refusing work once the queue is full.
+    
+    bcrypt releases the GIL while hashing, so the executor threads use real
+    cores while the request thread waits. At most PASSWORD_HASH_WORKERS calls
+    run at once and at most PASSWORD_HASH_QUEUE_LIMIT more wait behind them.
+    A call is also refused when, at the recent average bcrypt duration, it
+    would wait longer than PASSWORD_HASH_MAX_WAIT_SECONDS for a thread.
+    Refused calls fail immediately instead of tying up a request thread;
+    with the queue kept shorter than the server's request threads, a login
+    storm always leaves threads free for other requests.
+    """
+    global _in_flight
+    
+    workers = _config('PASSWORD_HASH_WORKERS', 2)
+    limit = workers + _config('PASSWORD_HASH_QUEUE_LIMIT', 1)
+    max_wait = _config('PASSWORD_HASH_MAX_WAIT_SECONDS', 1.0)
+    with _state_lock:
+        # Calls ahead of this one that must finish before a thread frees up
+        ahead = _in_flight - workers + 1
+        expected_wait = ahead / workers * _average_seconds if ahead > 0 and _average_seconds else 0
+        if _in_flight >= limit or expected_wait > max_wait:
+            _metrics['rejected'] += 1
+            raise PasswordHashingBusy(_config('PASSWORD_HASH_RETRY_AFTER_SECONDS', 2))
+        _in_flight += 1
+        executor = _get_executor()
+        _metrics['queue_depth_max'] = max(_metrics['queue_depth_max'], _in_flight - _running)
+    
+    submitted = time.perf_counter()
+    
+    def task():
+        global _running
+        started = time.perf_counter()
+        with _state_lock:
+            _running += 1
+        try:
+            return fn(*args)
+        finally:
+            with _state_lock:
+                _running -= 1
+            _observe(operation, started - submitted, time.perf_counter() - started)
+    
+    try:
+        return executor.submit(task).result()
+    finally:
+        with _state_lock:
+            _in_flight -= 1
+
+
+def hash_password(password, rounds=None):
+    """
+    Hash a password with bcrypt on the hashing executor.
+    
+    Args:
+        password (str): Plain-text password
+        rounds (int, optional): bcrypt cost factor, defaults to BCRYPT_LOG_ROUNDS
+    
+    Returns:
+        str: The bcrypt hash
+    
+    Raises:
+        PasswordHashingBusy: If the hashing queue is full
+    """
+    if rounds is None:
+        rounds = _config('BCRYPT_LOG_ROUNDS', 12)
+    salt = bcrypt.gensalt(rounds=rounds)
+    return _run('hash', bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+
+def verify_password(password, password_hash):
+    """
+    Check a password against a bcrypt hash on the hashing executor.
+    
+    Raises:
+        PasswordHashingBusy: If the hashing queue is full
+    """
+    return _run('verify', bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+def hash_rounds(password_hash):
+    """Return the cost factor a bcrypt hash was created with, or None if it is not a bcrypt hash."""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(password_hash, rounds=None):
+    """Return True if a hash was created with a cost factor other than BCRYPT_LOG_ROUNDS."""
+    if rounds is None:
+        rounds = _config('BCRYPT_LOG_ROUNDS', 12)
+    return hash_rounds(password_hash) != rounds
+
+
+def hashing_metrics():
+    """
+    Return a snapshot of this process's hashing metrics.
+    
+    Returns:
+        dict: Per-operation latency histograms with cumulative bucket counts
+            keyed by upper bound, the current queue depth and running count,
+            the largest queue depth seen, total queue wait and the number of
+            rejected calls
+    """
+    with _state_lock:
+        snapshot = {
+            'operations': {
+                operation: {
+                    'count': stats['count'],
+                    'sum': stats['sum'],
+                    'buckets': dict(zip(LATENCY_BUCKETS, stats['buckets']))
+                }
+                for operation, stats in _metrics['operations'].items()
+            },
+            'queue_depth': _in_flight - _running,
+            'running': _running,
+            'queue_depth_max': _metrics['queue_depth_max'],
+            'queue_wait_seconds_sum': _metrics['queue_wait_seconds_sum'],
+            'rejected': _metrics['rejected']
+        }
+    return snapshot
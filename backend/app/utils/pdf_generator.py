@@ -1,39 +1,138 @@
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, LongTable, TableStyle, Paragraph, Spacer, Frame, PageTemplate
+from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.units import inch
 from flask import current_app
 import os
 from datetime import datetime
 import uuid
+from collections import namedtuple
 
-def generate_attendance_report(attendances, user=None, subject=None, start_date=None, end_date=None):
+REPORT_TABLE_HEADER = ['Date', 'Time', 'Subject', 'Status', 'Verification Method']
+REPORT_TABLE_COL_WIDTHS = [1.2 * inch, 1 * inch, 1.5 * inch, 1 * inch, 1.5 * inch]
+REPORT_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+# Plain-data report row, for callers without an Attendance object or query row
+ReportRow = namedtuple('ReportRow', ['date', 'time', 'subject_code', 'status', 'verification_method'])
+
+_styles = None
+
+
+def get_report_styles():
+    """Return the shared paragraph stylesheet, creating it on first use."""
+    global _styles
+    if _styles is None:
+        _styles = getSampleStyleSheet()
+    return _styles
+
+
+class StreamingDocTemplate(SimpleDocTemplate):
+    """
+    SimpleDocTemplate that is built from a stream of flowable chunks.
+    
+    SimpleDocTemplate.build needs every flowable up front; build_chunks lays
+    out one short list at a time, so a report with tens of thousands of rows
+    never holds more than one table chunk in memory.
+    """
+    
+    def build_chunks(self, chunks):
+        """
+        Build the document.
+        
+        Args:
+            chunks (iterable): Lists of flowables, consumed lazily in order
+        """
+        # Same page templates as SimpleDocTemplate.build
+        self._calc()
+        frame = Frame(self.leftMargin, self.bottomMargin, self.width, self.height, id='normal')
+        self.addPageTemplates([
+            PageTemplate(id='First', frames=frame, pagesize=self.pagesize),
+            PageTemplate(id='Later', frames=frame, pagesize=self.pagesize)
+        ])
+        
+        self._startBuild()
+        canv = self.canv
+        canv._doctemplate = self
+        try:
+            for flowables in chunks:
+                while flowables:
+                    self.clean_hanging()
+                    self.handle_flowable(flowables)
+        finally:
+            del canv._doctemplate
+        self._endBuild()
+
+
+def _report_row(record):
+    """
+    Format one report row.
+    
+    Accepts either an Attendance object or a row from iter_report_rows, which
+    carries the subject code directly instead of through the relationship.
+    """
+    subject_code = getattr(record, 'subject_code', None)
+    if subject_code is None:
+        subject = getattr(record, 'subject', None)
+        subject_code = subject.code if subject else "Unknown"
+    
+    return [
+        record.date.strftime('%Y-%m-%d'),
+        record.time.strftime('%H:%M:%S'),
+        subject_code,
+        record.status.capitalize(),
+        record.verification_method.capitalize()
+    ]
+
+def generate_attendance_report(attendances, user=None, subject=None, start_date=None, end_date=None,
+                               output_path=None, chunk_rows=None):
     """
     Generate a PDF attendance report.
     
+    Records are consumed in a single pass: table rows are laid out in
+    LongTable chunks of REPORT_TABLE_CHUNK_ROWS as they arrive and the
+    summary counts are accumulated along the way, so memory stays bounded
+    when attendances is a generator.
+    
     Args:
-        attendances (list): List of attendance records
+        attendances (iterable): Attendance records, or rows from
+            iter_report_rows; read once, in order
         user (User, optional): User object for user-specific reports
         subject (Subject, optional): Subject object for subject-specific reports
         start_date (date, optional): Start date for the report period
         end_date (date, optional): End date for the report period
-        
+        output_path (str, optional): Where to write the PDF; defaults to a
+            uniquely named file in UPLOAD_FOLDER
+        chunk_rows (int, optional): Rows per table chunk, defaults to
+            REPORT_TABLE_CHUNK_ROWS
+    
     Returns:
         str: Path to the generated PDF file
     """
-    # Create a unique filename for the report
-    report_id = str(uuid.uuid4())
-    report_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f'report_{report_id}.pdf')
+    report_path = output_path
+    if report_path is None:
+        # Create a unique filename for the report
+        report_id = str(uuid.uuid4())
+        report_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f'report_{report_id}.pdf')
     
     # Ensure the upload directory exists
     os.makedirs(os.path.dirname(report_path), exist_ok=True)
     
     # Create the PDF document
-    doc = SimpleDocTemplate(report_path, pagesize=letter)
+    doc = StreamingDocTemplate(report_path, pagesize=letter)
+    if chunk_rows is None:
+        chunk_rows = current_app.config.get('REPORT_TABLE_CHUNK_ROWS', 1000)
     
     # Get styles
-    styles = getSampleStyleSheet()
+    styles = get_report_styles()
     title_style = styles['Heading1']
     subtitle_style = styles['Heading2']
     normal_style = styles['Normal']
@@ -68,66 +167,49 @@ def generate_attendance_report(attendances, user=None, subject=None, start_date=
     elements.append(Paragraph(f"Generated on: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}", normal_style))
     elements.append(Spacer(1, 0.5 * inch))
     
-    # Add attendance table
-    if attendances:
-        # Define table data
-        table_data = [['Date', 'Time', 'Subject', 'Status', 'Verification Method']]
+    # Count by status while the rows stream past
+    counts = {'present': 0, 'absent': 0, 'late': 0}
+    total = [0]
+    
+    def table_chunk(rows):
+        # The header repeats on every page the chunk spans
+        return [LongTable([REPORT_TABLE_HEADER] + rows, colWidths=REPORT_TABLE_COL_WIDTHS,
+                          style=REPORT_TABLE_STYLE, repeatRows=1)]
+    
+    def chunks():
+        yield elements
         
+        rows = []
         for attendance in attendances:
-            # Get subject name
-            subject_name = attendance.subject.code if hasattr(attendance, 'subject') else "Unknown"
-            
-            # Format date and time
-            date_str = attendance.date.strftime('%Y-%m-%d')
-            time_str = attendance.time.strftime('%H:%M:%S')
-            
-            # Add row to table
-            table_data.append([
-                date_str,
-                time_str,
-                subject_name,
-                attendance.status.capitalize(),
-                attendance.verification_method.capitalize()
-            ])
-        
-        # Create the table
-        table = Table(table_data, colWidths=[1.2 * inch, 1 * inch, 1.5 * inch, 1 * inch, 1.5 * inch])
-        
-        # Add style to the table
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        elements.append(table)
-        
-        # Add summary
-        elements.append(Spacer(1, 0.5 * inch))
-        elements.append(Paragraph("Summary:", subtitle_style))
+            total[0] += 1
+            if attendance.status in counts:
+                counts[attendance.status] += 1
+            rows.append(_report_row(attendance))
+            if len(rows) >= chunk_rows:
+                yield table_chunk(rows)
+                rows = []
+        if rows:
+            yield table_chunk(rows)
         
-        # Count by status
-        present_count = sum(1 for a in attendances if a.status == 'present')
-        absent_count = sum(1 for a in attendances if a.status == 'absent')
-        late_count = sum(1 for a in attendances if a.status == 'late')
-        total_count = len(attendances)
+        total_count = total[0]
+        if not total_count:
+            yield [Paragraph("No attendance records found for the specified criteria.", normal_style)]
+            return
         
         # Calculate attendance percentage
-        attendance_percentage = (present_count + late_count) / total_count * 100 if total_count > 0 else 0
+        attendance_percentage = (counts['present'] + counts['late']) / total_count * 100
         
-        elements.append(Paragraph(f"Total Classes: {total_count}", normal_style))
-        elements.append(Paragraph(f"Present: {present_count}", normal_style))
-        elements.append(Paragraph(f"Absent: {absent_count}", normal_style))
-        elements.append(Paragraph(f"Late: {late_count}", normal_style))
-        elements.append(Paragraph(f"Attendance Percentage: {attendance_percentage:.2f}%", normal_style))
-    else:
-        elements.append(Paragraph("No attendance records found for the specified criteria.", normal_style))
+        yield [
+            Spacer(1, 0.5 * inch),
+            Paragraph("Summary:", subtitle_style),
+            Paragraph(f"Total Classes: {total_count}", normal_style),
+            Paragraph(f"Present: {counts['present']}", normal_style),
+            Paragraph(f"Absent: {counts['absent']}", normal_style),
+            Paragraph(f"Late: {counts['late']}", normal_style),
+            Paragraph(f"Attendance Percentage: {attendance_percentage:.2f}%", normal_style)
+        ]
     
     # Build the PDF
-    doc.build(elements)
+    doc.build_chunks(chunks())
     
     return report_path
@@ -0,0 +1,245 @@
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import secrets
+import threading
+import time
+from flask import current_app, g, request
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+
+logger = logging.getLogger(__name__)
+
+# Requests carrying a token from issue_profile_token in this header are profiled
+PROFILE_HEADER = 'X-Profile-Token'
+
+PROFILE_ID_PATTERN = re.compile(r'^[0-9]+-[0-9]+-[0-9a-f]{8}$')
+
+# cProfile cannot run two profilers at once on Python 3.12+, so each
+# process profiles one request at a time and skips the rest
+_active = threading.Lock()
+
+
+def _token_serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='request-profile')
+
+
+def issue_profile_token(admin_id):
+    """
+    Sign a token that asks for the requests carrying it to be profiled.
+    
+    Args:
+        admin_id (int): Admin the token is issued to
+    
+    Returns:
+        str: Token to send in the X-Profile-Token header
+    """
+    return _token_serializer().dumps({'admin_id': admin_id})
+
+
+def _token_valid(token):
+    """Return True if the token is unexpired, untampered and its admin is still an admin."""
+    from app.utils.user_cache import load_current_user
+    
+    try:
+        payload = _token_serializer().loads(
+            token, max_age=current_app.config.get('PROFILE_TOKEN_MAX_AGE_SECONDS', 3600)
+        )
+    except BadSignature:
+        return False
+    admin = load_current_user(payload.get('admin_id'))
+    return admin is not None and admin.role == 'admin'
+
+
+def profile_paths(profile_id):
+    """Return (profile_path, metadata_path) for a profile ID."""
+    folder = current_app.config['PROFILE_DIR']
+    return (
+        os.path.join(folder, f'profile_{profile_id}.prof'),
+        os.path.join(folder, f'profile_{profile_id}.json')
+    )
+
+
+def _start_profile(trigger):
+    if not _active.acquire(blocking=False):
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiling tool (e.g. a debugger's) is already active
+        _active.release()
+        return
+    g.request_profile = {
+        'profiler': profiler,
+        'trigger': trigger,
+        'started': time.perf_counter(),
+        'app': current_app._get_current_object(),
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.url_rule.rule if request.url_rule is not None else None
+    }
+
+
+def _finish_profile(current):
+    try:
+        current['profiler'].disable()
+        current['duration'] = time.perf_counter() - current['started']
+    finally:
+        _active.release()
+    # May run after the request context is gone, once the response is sent
+    with current['app'].app_context():
+        try:
+            _save_profile(current)
+        except OSError:
+            logger.exception('Could not save the request profile')
+
+
+def _save_profile(current):
+    profile_id = f'{int(time.time() * 1000)}-{os.getpid()}-{secrets.token_hex(4)}'
+    profile_path, meta_path = profile_paths(profile_id)
+    os.makedirs(os.path.dirname(profile_path), exist_ok=True)
+    
+    current['profiler'].dump_stats(profile_path)
+    meta = {
+        'id': profile_id,
+        'method': current['method'],
+        'path': current['path'],
+        'endpoint': current['endpoint'],
+        'status': current.get('status'),
+        'duration_seconds': current['duration'],
+        'trigger': current['trigger'],
+        'created_at': time.time(),
+        'size': os.path.getsize(profile_path)
+    }
+    tmp_path = f'{meta_path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+    
+    rotate_profiles()
+
+
+def rotate_profiles(folder=None, max_files=None, max_bytes=None):
+    """
+    Delete the oldest profiles until both the file count and total size are under their caps.
+    
+    Args:
+        folder (str, optional): Profile folder, defaults to PROFILE_DIR
+        max_files (int, optional): Profile count cap, defaults to PROFILE_MAX_FILES
+        max_bytes (int, optional): Size cap, defaults to PROFILE_MAX_BYTES
+    
+    Returns:
+        int: Number of profiles deleted
+    """
+    folder = folder or current_app.config['PROFILE_DIR']
+    max_files = max_files if max_files is not None else current_app.config['PROFILE_MAX_FILES']
+    max_bytes = max_bytes if max_bytes is not None else current_app.config['PROFILE_MAX_BYTES']
+    
+    profiles = []
+    try:
+        names = os.listdir(folder)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        if not (name.startswith('profile_') and name.endswith('.prof')):
+            continue
+        path = os.path.join(folder, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        profiles.append((stat.st_mtime, stat.st_size, path))
+    
+    total = sum(size for _, size, _ in profiles)
+    count = len(profiles)
+    deleted = 0
+    for mtime, size, path in sorted(profiles):
+        if count <= max_files and total <= max_bytes:
+            break
+        for stale in (path, os.path.splitext(path)[0] + '.json'):
+            try:
+                os.unlink(stale)
+            except FileNotFoundError:
+                pass
+        total -= size
+        count -= 1
+        deleted += 1
+    
+    return deleted
+
+
+def list_profiles():
+    """
+    Return the metadata of every stored profile, newest first.
+    
+    Profiles live in PROFILE_DIR rather than worker memory, so any worker
+    can list and serve the profiles written by the others.
+    """
+    folder = current_app.config['PROFILE_DIR']
+    try:
+        names = os.listdir(folder)
+    except FileNotFoundError:
+        return []
+    
+    profiles = []
+    for name in names:
+        if not (name.startswith('profile_') and name.endswith('.json')):
+            continue
+        try:
+            with open(os.path.join(folder, name)) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # Rotated out while listing
+    return sorted(profiles, key=lambda meta: meta['created_at'], reverse=True)
+
+
+def get_profile_path(profile_id):
+    """Return the path of a stored profile, or None if the ID is malformed or unknown."""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    profile_path, _ = profile_paths(profile_id)
+    return profile_path if os.path.exists(profile_path) else None
+
+
+def init_profiling(app):
+    """
+    Profile requests that carry a signed profile token or are picked by sampling.
+    
+    Profiled requests run under cProfile and are saved as .prof files
+    (pstats format, which flameprof or snakeviz turn into flame graphs) in
+    the bounded PROFILE_DIR. Unprofiled requests only pay for a header
+    lookup and, with PROFILE_SAMPLE_RATE set, one random number.
+    
+    Args:
+        app (Flask): Application to hook into
+    """
+    sample_rate = app.config.get('PROFILE_SAMPLE_RATE', 0)
+    
+    @app.before_request
+    def start_request_profile():
+        token = request.headers.get(PROFILE_HEADER)
+        if token is not None:
+            if _token_valid(token):
+                _start_profile('token')
+        elif sample_rate and random.random() < sample_rate:
+            _start_profile('sampled')
+    
+    @app.after_request
+    def finish_profile_on_close(response):
+        # The server closes the response after sending the body, so streamed
+        # responses are profiled to the end
+        current = g.pop('request_profile', None)
+        if current is not None:
+            current['status'] = response.status_code
+            response.call_on_close(lambda: _finish_profile(current))
+        return response
+    
+    @app.teardown_request
+    def finish_profile_without_response(exc):
+        # Only reached with a profile still pending if no response was produced
+        current = g.pop('request_profile', None)
+        if current is not None:
+            _finish_profile(current)
@@ -0,0 +1,236 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+# Job states recorded in each job's metadata file
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+# Extensions of report files, as opposed to job metadata
+REPORT_FORMATS = ('.pdf', '.zip')
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+# Held across the "already queued?" check and the enqueue, so identical
+# requests arriving together in one worker start a single job
+_submit_lock = threading.Lock()
+
+
+def _get_executor():
+    """Return this process's background job executor, creating it after fork if needed."""
+    global _executor, _executor_pid
+    
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config.get('REPORT_JOB_WORKERS', 2),
+                thread_name_prefix='report-job'
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def report_cache_key(params, change_marker):
+    """
+    Derive the cache key (and job ID) for a report.
+    
+    Args:
+        params (dict): Normalized report filters
+        change_marker (tuple): Summary of the matching attendance rows that
+            changes whenever any of them is inserted, updated or deleted
+    
+    Returns:
+        str: Hex digest identifying the report content
+    """
+    payload = json.dumps({'params': params, 'marker': change_marker}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def report_paths(job_id, file_format='pdf'):
+    """Return (report_path, metadata_path) for a job ID."""
+    folder = current_app.config['REPORT_FOLDER']
+    return (
+        os.path.join(folder, f'report_{job_id}.{file_format}'),
+        os.path.join(folder, f'report_{job_id}.json')
+    )
+
+
+def _write_meta(meta_path, meta):
+    # Atomic replace so other workers never read a half-written file
+    tmp_path = f'{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def get_job(job_id):
+    """
+    Look up a report job.
+    
+    Job state lives next to the report file rather than in worker memory, so
+    any worker can answer polls and downloads.
+    
+    Args:
+        job_id (str): Job ID returned by submit_report_job
+    
+    Returns:
+        dict: Job metadata with a 'status' key, or None if the job is unknown
+    """
+    _, meta_path = report_paths(job_id)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    report_path, _ = report_paths(job_id, meta.get('format', 'pdf'))
+    if meta['status'] == DONE and not os.path.exists(report_path):
+        # The report file was evicted
+        return None
+    
+    timeout = current_app.config.get('REPORT_JOB_TIMEOUT_SECONDS', 600)
+    if meta['status'] == PENDING and time.time() - meta['submitted_at'] > timeout:
+        meta['status'] = FAILED
+        meta['error'] = 'Report generation timed out'
+    
+    return meta
+
+
+def update_job_progress(job_id, done, total):
+    """
+    Record the progress of a running job so polls can report it.
+    
+    Args:
+        job_id (str): Job ID returned by submit_report_job
+        done (int): Units of work finished
+        total (int): Units of work in the whole job
+    """
+    _, meta_path = report_paths(job_id)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return
+    
+    if meta['status'] == PENDING:
+        meta['progress'] = {'done': done, 'total': total}
+        _write_meta(meta_path, meta)
+
+
+def submit_report_job(job_id, owner_id, build_report, file_format='pdf'):
+    """
+    Queue a report for background generation unless it is cached or already queued.
+    
+    Args:
+        job_id (str): Cache key from report_cache_key
+        owner_id (int): ID of the user the report is about, used for access checks
+        build_report (callable): Called as build_report(output_path) inside an
+            application context on a background thread; writes the report
+        file_format (str): Extension of the report file, 'pdf' or 'zip'
+    
+    Returns:
+        dict: Job metadata
+    """
+    with _submit_lock:
+        existing = get_job(job_id)
+        if existing and existing['status'] in (PENDING, DONE):
+            if existing['status'] == DONE:
+                # Refresh the mtime so eviction treats the file as recently used
+                os.utime(report_paths(job_id, existing.get('format', 'pdf'))[0])
+            return existing
+        
+        os.makedirs(current_app.config['REPORT_FOLDER'], exist_ok=True)
+        report_path, meta_path = report_paths(job_id, file_format)
+        meta = {
+            'job_id': job_id,
+            'owner_id': owner_id,
+            'format': file_format,
+            'status': PENDING,
+            'submitted_at': time.time()
+        }
+        _write_meta(meta_path, meta)
+    
+    app = current_app._get_current_object()
+    
+    def run():
+        with app.app_context():
+            # Another worker may be building the same report; each writes its
+            # own temporary file and the atomic replace keeps one complete copy
+            tmp_path = f'{report_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            try:
+                build_report(tmp_path)
+                os.replace(tmp_path, report_path)
+                _write_meta(meta_path, dict(meta, status=DONE, finished_at=time.time()))
+            except Exception as e:
+                logger.exception('Report job %s failed', job_id)
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                _write_meta(meta_path, dict(meta, status=FAILED, error=str(e), finished_at=time.time()))
+            finally:
+                evict_report_cache()
+    
+    _get_executor().submit(run)
+    return meta
+
+
+def evict_report_cache(folder=None, max_bytes=None, max_age=None):
+    """
+    Delete cached reports that are too old, then the least recently used until under the size cap.
+    
+    Args:
+        folder (str, optional): Report folder, defaults to REPORT_FOLDER
+        max_bytes (int, optional): Size cap, defaults to REPORT_CACHE_MAX_BYTES
+        max_age (float, optional): Age cap in seconds, defaults to REPORT_CACHE_MAX_AGE_SECONDS
+    
+    Returns:
+        int: Number of report files deleted
+    """
+    folder = folder or current_app.config['REPORT_FOLDER']
+    max_bytes = max_bytes if max_bytes is not None else current_app.config['REPORT_CACHE_MAX_BYTES']
+    max_age = max_age if max_age is not None else current_app.config['REPORT_CACHE_MAX_AGE_SECONDS']
+    
+    reports = []
+    try:
+        names = os.listdir(folder)
+    except FileNotFoundError:
+        return 0
+    now = time.time()
+    for name in names:
+        if not name.startswith('report_'):
+            continue
+        path = os.path.join(folder, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        stem, ext = os.path.splitext(path)
+        if ext in REPORT_FORMATS:
+            reports.append((stat.st_mtime, stat.st_size, path))
+        elif ext == '.json' and now - stat.st_mtime > max_age \
+                and not any(os.path.exists(stem + other) for other in REPORT_FORMATS):
+            # Metadata of failed or lost jobs
+            os.unlink(path)
+    
+    total = sum(size for _, size, _ in reports)
+    deleted = 0
+    for mtime, size, path in sorted(reports):
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        for stale in (path, os.path.splitext(path)[0] + '.json'):
+            try:
+                os.unlink(stale)
+            except FileNotFoundError:
+                pass
+        total -= size
+        deleted += 1
+    
+    return deleted
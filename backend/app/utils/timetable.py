@@ -0,0 +1,250 @@
+import threading
+import time
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from sqlalchemy import event
+from app.models.subject import Subject
+
+# One weekly occurrence of a subject; start and end are minutes since midnight
+# of the scheduled day, so a session running past midnight ends after 24 * 60
+Session = namedtuple('Session', ['start', 'end', 'subject_id', 'teacher_id'])
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def local_now(timezone='UTC'):
+    """
+    Return the current wall-clock time in a zone, comparable with subject start and end times.
+    
+    Args:
+        timezone (str): IANA zone name, e.g. APP_TIMEZONE
+    
+    Returns:
+        datetime: Naive local time
+    """
+    return datetime.now(ZoneInfo(timezone)).replace(tzinfo=None)
+
+
+def parse_schedule_days(schedule_days):
+    """
+    Parse Subject.schedule_days into ISO weekdays.
+    
+    Args:
+        schedule_days (str): Comma-separated ISO weekdays, e.g. "1,3,5" for Mon, Wed, Fri
+    
+    Returns:
+        set: Weekday numbers 1-7; malformed entries are ignored
+    """
+    days = set()
+    for part in (schedule_days or '').split(','):
+        part = part.strip()
+        if part.isdigit() and 1 <= int(part) <= 7:
+            days.add(int(part))
+    return days
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute + value.second / 60
+
+
+def _previous_day(day):
+    return (day - 2) % 7 + 1
+
+
+class _SessionList:
+    """Sessions sorted by start, with a running maximum of end times for overlap queries."""
+    
+    def __init__(self, sessions):
+        self.sessions = sorted(sessions)
+        self.starts = [s.start for s in self.sessions]
+        self.max_ends = []
+        max_end = float('-inf')
+        for s in self.sessions:
+            max_end = max(max_end, s.end)
+            self.max_ends.append(max_end)
+    
+    def containing(self, minute, before=0, after=0):
+        """
+        Return the sessions whose [start - before, end + after] contains minute, latest start first.
+        
+        The bisect finds the last session that has started; walking back stops
+        as soon as no earlier session can still be running, so a teacher's
+        non-overlapping sessions are answered in O(log n).
+        """
+        found = []
+        i = bisect_right(self.starts, minute + before) - 1
+        while i >= 0 and self.max_ends[i] + after >= minute:
+            session = self.sessions[i]
+            if session.end + after >= minute:
+                found.append(session)
+            i -= 1
+        return found
+
+
+class TimetableIndex:
+    """
+    In-memory weekly timetable built from Subject rows.
+    
+    Subjects with schedule days and both times set become one session per
+    weekday, indexed per weekday and per (weekday, teacher) so that "what is
+    in session now" never scans the subjects table. Subject times are local
+    wall-clock times (see local_now); a subject whose end time is earlier
+    than its start runs past midnight into the next day. Like the face gallery,
+    each worker process holds its own copy; it is rebuilt lazily after a
+    subject changes in this process, and at least every
+    TIMETABLE_REFRESH_SECONDS to pick up changes made by other workers.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_day = {}
+        self._by_teacher_day = {}
+        self._by_subject = {}
+        self._loaded_at = None
+    
+    def invalidate(self):
+        self._loaded_at = None
+    
+    def is_stale(self, max_age):
+        loaded_at = self._loaded_at
+        return loaded_at is None or time.monotonic() - loaded_at > max_age
+    
+    def load(self, subjects):
+        """
+        Replace the index contents.
+        
+        Args:
+            subjects (iterable): Objects with id, teacher_id, schedule_days,
+                start_time and end_time attributes
+        """
+        by_day, by_teacher_day, by_subject = {}, {}, {}
+        for subject in subjects:
+            if subject.start_time is None or subject.end_time is None:
+                continue
+            days = parse_schedule_days(subject.schedule_days)
+            if not days:
+                continue
+            start, end = _minutes(subject.start_time), _minutes(subject.end_time)
+            if end < start:
+                end += MINUTES_PER_DAY
+            session = Session(start, end, subject.id, subject.teacher_id)
+            by_subject[subject.id] = (days, session)
+            for day in days:
+                by_day.setdefault(day, []).append(session)
+                if subject.teacher_id is not None:
+                    by_teacher_day.setdefault((subject.teacher_id, day), []).append(session)
+        
+        with self._lock:
+            self._by_day = {day: _SessionList(sessions) for day, sessions in by_day.items()}
+            self._by_teacher_day = {key: _SessionList(sessions) for key, sessions in by_teacher_day.items()}
+            self._by_subject = by_subject
+            self._loaded_at = time.monotonic()
+    
+    def load_from_db(self):
+        """Load every scheduled subject from the subjects table."""
+        self.load(Subject.query.with_entities(
+            Subject.id, Subject.teacher_id, Subject.schedule_days, Subject.start_time, Subject.end_time
+        ).all())
+    
+    def _clocks(self, at):
+        """Return (weekday, minute) for at on its own day's clock, then on the previous day's."""
+        day, minute = at.isoweekday(), _minutes(at)
+        return ((day, minute), (_previous_day(day), minute + MINUTES_PER_DAY))
+    
+    def _matches(self, at, teacher_id, before, after):
+        """Return (session, minute) pairs for in_session, minute being at on the session's clock."""
+        found = []
+        for day, minute in self._clocks(at):
+            with self._lock:
+                if teacher_id is not None:
+                    sessions = self._by_teacher_day.get((teacher_id, day))
+                else:
+                    sessions = self._by_day.get(day)
+            if sessions is not None:
+                found.extend((session, minute) for session in sessions.containing(minute, before, after))
+        return found
+    
+    def in_session(self, at, teacher_id=None, before=0, after=0):
+        """
+        Find the subjects in session at a moment.
+        
+        Sessions scheduled the previous day are included while they, or the
+        after margin, run past midnight.
+        
+        Args:
+            at (datetime): Local moment to look up
+            teacher_id (int, optional): Only this teacher's subjects
+            before (float): Minutes before the start that already count
+            after (float): Minutes after the end that still count
+        
+        Returns:
+            list: Session tuples, latest start first
+        """
+        return [session for session, _ in self._matches(at, teacher_id, before, after)]
+    
+    def open_for_attendance(self, at, window, teacher_id=None):
+        """
+        Find the sessions accepting attendance at a moment.
+        
+        Args:
+            at (datetime): Local moment to look up
+            window (float): Minutes after the start during which attendance is accepted
+            teacher_id (int, optional): Only this teacher's subjects
+        
+        Returns:
+            list: Session tuples whose [start, start + window] contains at, latest start first
+        """
+        return [
+            session for session, minute in self._matches(at, teacher_id, 0, window)
+            if session.start <= minute <= session.start + window
+        ]
+    
+    def attendance_window_open(self, subject_id, at, window):
+        """
+        Check whether a subject accepts attendance at a moment.
+        
+        Returns:
+            bool: Whether at falls on a scheduled day within window minutes of
+                the start, or None if the subject has no schedule
+        """
+        schedule = self.schedule_for(subject_id)
+        if schedule is None:
+            return None
+        days, session = schedule
+        return any(
+            day in days and session.start <= minute <= session.start + window
+            for day, minute in self._clocks(at)
+        )
+    
+    def schedule_for(self, subject_id):
+        """Return (weekdays, Session) for a scheduled subject, or None if it has no schedule."""
+        with self._lock:
+            return self._by_subject.get(subject_id)
+
+
+# Process-wide index shared by every request in this worker
+timetable = TimetableIndex()
+_load_lock = threading.Lock()
+
+
+def get_timetable(max_age=300):
+    """
+    Return the process-wide timetable, rebuilding it if a subject changed or it is older than max_age.
+    
+    Must be called inside an application context.
+    """
+    if timetable.is_stale(max_age):
+        with _load_lock:
+            if timetable.is_stale(max_age):
+                timetable.load_from_db()
+    return timetable
+
+
+def _invalidate_timetable(mapper, connection, target):
+    timetable.invalidate()
+
+
+for _event in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Subject, _event, _invalidate_timetable)
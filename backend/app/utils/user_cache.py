@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import jsonify
+from sqlalchemy import event
+from app import db, jwt
+from app.models.user import User
+
+# The fields every protected controller needs; anything else means loading the full row
+CurrentUser = namedtuple('CurrentUser', ['id', 'role'])
+
+
+class UserCache:
+    """
+    Bounded, thread-safe TTL cache of CurrentUser entries keyed by user ID.
+    
+    Entries are evicted least recently used first once the cache is full, and
+    expire after ttl seconds. Each worker process holds its own cache; the
+    User mapper events below invalidate entries changed through this
+    process, and the TTL bounds how long another worker may serve a stale
+    role.
+    """
+    
+    def __init__(self, maxsize=10000, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # user_id -> (expires_at, CurrentUser)
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get(self, user_id):
+        """Return the cached entry for a user, or None if missing or expired."""
+        with self._lock:
+            item = self._entries.get(user_id)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return item[1]
+    
+    def put(self, user_id, value):
+        """Cache an entry for a user, evicting the least recently used if full."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, user_id):
+        """Drop a user's entry, if cached."""
+        with self._lock:
+            self._entries.pop(user_id, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide cache shared by every request in this worker
+user_cache = UserCache()
+
+
+def load_current_user(user_id):
+    """
+    Resolve a JWT identity to a CurrentUser, from the cache when possible.
+    
+    Args:
+        user_id (str or int): JWT identity
+    
+    Returns:
+        CurrentUser: The user's id and role, or None if the user does not exist
+    """
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    
+    user = user_cache.get(user_id)
+    if user is None:
+        row = db.session.query(User.id, User.role).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        user = CurrentUser(*row)
+        user_cache.put(user_id, user)
+    return user
+
+
+def _invalidate_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
+
+
+event.listen(User, 'after_update', _invalidate_user)
+event.listen(User, 'after_delete', _invalidate_user)
+
+
+@jwt.user_identity_loader
+def _user_identity(identity):
+    # PyJWT requires the subject claim to be a string
+    return str(identity)
+
+
+@jwt.user_lookup_loader
+def _user_lookup(jwt_header, jwt_data):
+    return load_current_user(jwt_data['sub'])
+
+
+@jwt.user_lookup_error_loader
+def _user_lookup_error(jwt_header, jwt_data):
+    return jsonify({'error': 'User not found'}), 404
+
+
+def init_user_cache(app):
+    """Size the current-user cache from the app config."""
+    user_cache.maxsize = app.config.get('CURRENT_USER_CACHE_SIZE', 10000)
+    user_cache.ttl = app.config.get('CURRENT_USER_CACHE_TTL_SECONDS', 60)
+    user_cache.clear()
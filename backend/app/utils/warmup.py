@@ -0,0 +1,72 @@
+import logging
+import time
+import numpy as np
+from sqlalchemy import text
+from app import db
+
+logger = logging.getLogger(__name__)
+
+
+def preload(app):
+    """
+    Load everything read-mostly into this process before workers are forked.
+    
+    Loads the face and landmark models, the encoding gallery, the timetable
+    and the report styles, so forked workers share them copy-on-write instead
+    of each loading its own. Database connections opened here are closed
+    afterwards; sockets must not be shared across a fork.
+    
+    Args:
+        app (Flask): Application to preload
+    """
+    from app.utils.face_recognition_utils import load_models
+    from app.utils.face_gallery import get_face_gallery
+    from app.utils.timetable import get_timetable
+    from app.utils.pdf_generator import get_report_styles
+    
+    started = time.perf_counter()
+    load_models()
+    get_report_styles()
+    with app.app_context():
+        gallery = get_face_gallery()
+        get_timetable(app.config.get('TIMETABLE_REFRESH_SECONDS', 300))
+        db.engine.dispose()
+    
+    logger.info('Preloaded models and %d gallery encodings in %.2fs', len(gallery), time.perf_counter() - started)
+
+
+def reset_after_fork(app):
+    """
+    Drop the connection pool inherited from the parent process.
+    
+    close=False leaves the parent's connections open for the parent, while
+    this process starts with an empty pool of its own.
+    """
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def warm_up_worker(app):
+    """
+    Run one dummy request's worth of work in a freshly forked worker.
+    
+    Touches the face detection, encoding and landmark code paths, the
+    gallery search and a database round trip, so lazy initialization happens
+    before the worker accepts traffic rather than on its first request.
+    
+    Args:
+        app (Flask): Application served by the worker
+    """
+    from app.utils.face_recognition_utils import detect_faces, encode_face, get_face_landmarks
+    from app.utils.face_gallery import get_face_gallery
+    
+    started = time.perf_counter()
+    image = np.zeros((64, 64, 3), dtype=np.uint8)
+    with app.app_context():
+        detect_faces(image)
+        get_face_landmarks(image)
+        get_face_gallery().search(encode_face(image), k=1)
+        db.session.execute(text('SELECT 1'))
+        db.session.remove()
+    
+    logger.info('Worker warmed up in %.2fs', time.perf_counter() - started)
@@ -0,0 +1,160 @@
+"""
+Benchmark: query plans and latency for the hot attendance query shapes.
+
+Seeds a synthetic attendances table (10M rows by default) and, for each
+query shape used by the controllers, prints the database's query plan and
+the median latency over repeated runs. Run it once as-is and once with
+--drop-indexes to see what the composite indexes buy.
+
+Usage (from the backend directory):
+    python benchmarks/bench_attendance_queries.py [--rows 10000000] [--database-url URL]
+        [--drop-indexes] [--reuse]
+
+The default database is a SQLite file under /tmp; pass a PostgreSQL URL to
+benchmark against a real server. --reuse skips seeding if the table already
+has the requested number of rows.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, time as dtime, timedelta
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import db  # noqa: E402
+import app.models  # noqa: E402,F401  (registers the tables on db.metadata)
+
+SUBJECTS = 80
+SUBJECTS_PER_USER = 5
+DAYS = 250
+START_DATE = date(2025, 1, 6)
+STATUSES = ('present', 'present', 'present', 'late', 'absent')
+SEED_BATCH = 50000
+
+QUERIES = {
+    'duplicate check (user, subject, date)': (
+        'SELECT id FROM attendances WHERE user_id = :user_id AND subject_id = :subject_id AND date = :day',
+    ),
+    'report page (user, newest first)': (
+        'SELECT id, date, time, status FROM attendances WHERE user_id = :user_id '
+        'ORDER BY date DESC, time DESC LIMIT 100',
+    ),
+    'report (user, subject, date range)': (
+        'SELECT id, date, time, status FROM attendances WHERE user_id = :user_id '
+        'AND subject_id = :subject_id AND date BETWEEN :since AND :day ORDER BY date DESC, time DESC',
+    ),
+    'period stats (user since date, by subject/status)': (
+        'SELECT subject_id, status, COUNT(*) FROM attendances WHERE user_id = :user_id '
+        'AND date >= :since GROUP BY subject_id, status',
+    ),
+    'roster (subject, date)': (
+        'SELECT user_id, status FROM attendances WHERE subject_id = :subject_id AND date = :day',
+    ),
+}
+
+INDEXES = ['uq_attendances_user_subject_date', 'ix_attendances_user_date_time', 'ix_attendances_subject_date']
+
+
+def seed(engine, rows):
+    users = max(rows // (SUBJECTS_PER_USER * DAYS), 1)
+    print(f'Seeding {rows:,} rows ({users:,} users x {SUBJECTS_PER_USER} subjects x {DAYS} days)...')
+    now = datetime(2025, 1, 1)
+
+    def generate():
+        count = 0
+        for day_offset in range(DAYS):
+            day = START_DATE + timedelta(days=day_offset)
+            for user_id in range(1, users + 1):
+                for k in range(SUBJECTS_PER_USER):
+                    if count == rows:
+                        return
+                    subject_id = (user_id * 7 + k) % SUBJECTS + 1
+                    yield {
+                        'user_id': user_id, 'subject_id': subject_id, 'date': day,
+                        'time': dtime(9 + k, (user_id % 10) * 5),
+                        'status': STATUSES[(user_id + day_offset + k) % len(STATUSES)],
+                        'verification_method': 'face', 'liveness_verified': True, 'created_at': now,
+                    }
+                    count += 1
+
+    table = db.metadata.tables['attendances']
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        batch = []
+        for row in generate():
+            batch.append(row)
+            if len(batch) == SEED_BATCH:
+                conn.execute(table.insert(), batch)
+                batch = []
+        if batch:
+            conn.execute(table.insert(), batch)
+    print(f'Seeded in {time.perf_counter() - started:.1f}s')
+    return users
+
+
+def explain(conn, sql, params):
+    if conn.dialect.name == 'sqlite':
+        return [row[-1] for row in conn.execute(text('EXPLAIN QUERY PLAN ' + sql), params)]
+    return [row[0] for row in conn.execute(text('EXPLAIN ' + sql), params)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--database-url', default='sqlite:////tmp/attendance_query_bench.db')
+    parser.add_argument('--drop-indexes', action='store_true', help='benchmark without the composite indexes')
+    parser.add_argument('--reuse', action='store_true', help='reuse an existing seeded database')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    tables = [db.metadata.tables[name] for name in ('users', 'subjects', 'attendances')]
+
+    existing = 0
+    if args.reuse:
+        db.metadata.create_all(engine, tables=tables)
+        with engine.connect() as conn:
+            existing = conn.execute(text('SELECT COUNT(*) FROM attendances')).scalar()
+    if existing != args.rows:
+        db.metadata.drop_all(engine, tables=tables)
+        db.metadata.create_all(engine, tables=tables)
+        users = seed(engine, args.rows)
+    else:
+        users = max(args.rows // (SUBJECTS_PER_USER * DAYS), 1)
+
+    with engine.begin() as conn:
+        for name in INDEXES:
+            conn.execute(text(f'DROP INDEX IF EXISTS {name}'))
+        if not args.drop_indexes:
+            for index in db.metadata.tables['attendances'].indexes:
+                index.create(conn)
+        conn.execute(text('ANALYZE'))
+
+    user_id = users // 2 or 1
+    params = {
+        'user_id': user_id,
+        'subject_id': (user_id * 7) % SUBJECTS + 1,
+        'day': START_DATE + timedelta(days=DAYS // 2),
+        'since': START_DATE + timedelta(days=DAYS // 2 - 30),
+    }
+
+    print(f"\nIndexes: {'dropped' if args.drop_indexes else 'present'}; rows: {args.rows:,}\n")
+    with engine.connect() as conn:
+        for name, (sql,) in QUERIES.items():
+            plan = explain(conn, sql, params)
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                conn.execute(text(sql), params).fetchall()
+                timings.append(time.perf_counter() - started)
+            print(f'{name}: median {statistics.median(timings) * 1000:.3f} ms')
+            for line in plan:
+                print(f'    {line}')
+
+
+if __name__ == '__main__':
+    main()
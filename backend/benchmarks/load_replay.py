@@ -0,0 +1,303 @@
+"""
+Benchmark: replay the class-start attendance spike against the app.
+
+Seeds a synthetic institution (teachers, one subject per teacher with a
+session starting now, students with enrolled face encodings), then has
+every student walk the flow a kiosk drives when a lecture starts:
+    
+    login -> recognize face -> verify liveness -> mark attendance
+
+The flow is replayed through the WSGI interface (Flask's test client, no
+network) by several worker processes at once, each with its own app and
+connection pool, like gunicorn workers. Reports requests per second,
+p50/p95/p99 latency, database queries per request, error rate and success
+rate for each endpoint. A request succeeds when it does what the kiosk
+needs, not just when it returns 2xx: the login is accepted, the face is
+recognized as the right student, liveness passes and attendance is marked.
+Without face_recognition installed, the mock encoder returns a random
+encoding per call, so recognize never succeeds; its latency is still real.
+
+Usage (from the backend directory):
+    python benchmarks/load_replay.py [--students 500] [--subjects 10] [--processes 4]
+        [--ramp-seconds 0] [--frames 12] [--database-url URL] [--json results.json]
+
+The default database is a throwaway SQLite file under /tmp; pass a
+PostgreSQL URL (of an empty database) to measure against a real server.
+--ramp-seconds spreads student arrivals evenly over that many seconds
+instead of releasing them all at once. Password hashing runs at the
+configured BCRYPT_LOG_ROUNDS, so set that variable to match production.
+"""
+import argparse
+import base64
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SEED = 20240101
+PASSWORD = 'replay-password'
+SESSION_MINUTES = 90
+IMAGE_SIZE = 96
+SEED_BATCH = 1000
+
+ENDPOINTS = ('login', 'recognize', 'liveness', 'mark')
+
+
+def make_app(database_url):
+    from app import create_app
+    from app.config import Config
+    
+    class ReplayConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+    
+    return create_app(ReplayConfig)
+
+
+def student_image(index):
+    """Base64 JPEG of a seeded synthetic face image for one student."""
+    import cv2
+    
+    rng = np.random.default_rng(SEED + index)
+    image = rng.integers(0, 256, size=(IMAGE_SIZE, IMAGE_SIZE, 3), dtype=np.uint8)
+    ok, encoded = cv2.imencode('.jpg', image)
+    return base64.b64encode(encoded.tobytes()).decode('ascii')
+
+
+def liveness_frames(count):
+    """
+    Base64 JPEG frames for one liveness check; the same clip is reused by every student.
+    
+    Two dark frames out of every five read as closed eyes to the mock
+    landmarks, so a clip of 10 or more frames blinks twice.
+    """
+    import cv2
+    
+    rng = np.random.default_rng(SEED)
+    frames = []
+    for i in range(count):
+        brightness = 32 if i % 5 in (2, 3) else 256
+        image = rng.integers(0, brightness, size=(IMAGE_SIZE, IMAGE_SIZE, 3), dtype=np.uint8)
+        ok, encoded = cv2.imencode('.jpg', image)
+        frames.append(base64.b64encode(encoded.tobytes()).decode('ascii'))
+    return frames
+
+
+def seed(app, students, subjects):
+    """
+    Create the synthetic institution and return the teacher id of each subject.
+    
+    Every account shares one password hash, so seeding does not pay for a
+    bcrypt hash per user; logins still verify at full cost.
+    """
+    from app import db
+    from app.models.user import User
+    from app.models.subject import Subject
+    from app.utils.encoding_codec import encoding_to_bytes
+    from app.utils.face_recognition_utils import encode_face
+    from app.utils.image_utils import decode_image
+    from app.utils.password_hashing import hash_password
+    from app.utils.timetable import local_now
+    
+    print(f'Seeding {students:,} students and {subjects} subjects...')
+    with app.app_context():
+        db.create_all()
+        password_hash = hash_password(PASSWORD)
+        now = datetime.utcnow()
+        
+        teachers = [
+            {'email': f'teacher{i}@replay.test', 'password_hash': password_hash, 'first_name': 'Teacher',
+             'last_name': str(i), 'role': 'teacher', 'created_at': now, 'updated_at': now}
+            for i in range(subjects)
+        ]
+        db.session.execute(User.__table__.insert(), teachers)
+        teacher_ids = [row.id for row in db.session.execute(
+            db.select(User.id).where(User.role == 'teacher').order_by(User.id)
+        )]
+        
+        # Each subject's session started a minute ago on the local clock, so its
+        # attendance window is open
+        start = local_now(app.config['APP_TIMEZONE']) - timedelta(minutes=1)
+        end = start + timedelta(minutes=SESSION_MINUTES)
+        db.session.execute(Subject.__table__.insert(), [
+            {'name': f'Replay Subject {i}', 'code': f'RPL{i:03d}', 'teacher_id': teacher_id,
+             'schedule_days': str(start.isoweekday()), 'start_time': start.time(), 'end_time': end.time(),
+             'created_at': now, 'updated_at': now}
+            for i, teacher_id in enumerate(teacher_ids)
+        ])
+        
+        # Enroll each student with the encoding of the image they will present
+        for offset in range(0, students, SEED_BATCH):
+            batch = []
+            for index in range(offset, min(offset + SEED_BATCH, students)):
+                encoding = encode_face(decode_image(student_image(index)))
+                batch.append({
+                    'email': f'student{index}@replay.test', 'password_hash': password_hash,
+                    'first_name': 'Student', 'last_name': str(index), 'role': 'student',
+                    'student_id': f'R{index:07d}', 'face_encoding_blob': encoding_to_bytes(encoding),
+                    'created_at': now, 'updated_at': now
+                })
+            db.session.execute(User.__table__.insert(), batch)
+        db.session.commit()
+        db.engine.dispose()
+    return teacher_ids
+
+
+def replay_worker(task):
+    """
+    Replay the flow for a slice of students in this process.
+    
+    Returns a list of (endpoint, status, seconds, queries, succeeded) tuples;
+    status is None when the request raised instead of returning a response.
+    """
+    database_url, indexes, teacher_ids, frames, start_at, ramp_seconds, total = task
+    from sqlalchemy import event
+    from app import db
+    from app.utils.warmup import warm_up_worker
+    
+    app = make_app(database_url)
+    warm_up_worker(app)
+    client = app.test_client()
+    
+    queries = [0]
+    with app.app_context():
+        def count_query(*args):
+            queries[0] += 1
+        event.listen(db.engine, 'before_cursor_execute', count_query)
+    
+    results = []
+    
+    def call(endpoint, method, path, succeeded, **kwargs):
+        queries[0] = 0
+        started = time.perf_counter()
+        try:
+            response = client.open(path, method=method, **kwargs)
+            status, body = response.status_code, response.get_json(silent=True)
+        except Exception:
+            status, body = None, None
+        seconds = time.perf_counter() - started
+        results.append((endpoint, status, seconds, queries[0], bool(body and succeeded(status, body))))
+        return status, body
+    
+    liveness_payload = {'method': 'blink', 'frames': frames}
+    for index in indexes:
+        # Students arrive evenly spread over the ramp
+        delay = start_at + ramp_seconds * index / total - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        
+        status, body = call('login', 'POST', '/api/auth/login', lambda status, body: status == 200,
+                            json={'email': f'student{index}@replay.test', 'password': PASSWORD})
+        if status != 200:
+            continue
+        user_id = body['user']['id']
+        headers = {'Authorization': f"Bearer {body['access_token']}"}
+        
+        call('recognize', 'POST', '/api/faces/recognize',
+             lambda status, body: status == 200 and body.get('match') and body.get('user_id') == user_id,
+             headers=headers, json={'image': student_image(index)})
+        status, body = call('liveness', 'POST', '/api/liveness/verify',
+                            lambda status, body: status == 200 and body.get('is_live'),
+                            headers=headers, json=liveness_payload)
+        liveness_verified = bool(body and body.get('is_live'))
+        # The kiosk knows its classroom teacher; the subject comes from the timetable
+        call('mark', 'POST', '/api/attendance/mark', lambda status, body: status in (200, 201), headers=headers, json={
+            'teacher_id': teacher_ids[index % len(teacher_ids)],
+            'verification_method': 'face',
+            'liveness_verified': liveness_verified
+        })
+    return results
+
+
+def summarize(results, duration):
+    by_endpoint = defaultdict(list)
+    for result in results:
+        by_endpoint[result[0]].append(result)
+    
+    summary = {'duration_seconds': duration, 'requests': len(results),
+               'requests_per_second': len(results) / duration if duration else None, 'endpoints': {}}
+    for endpoint in ENDPOINTS + tuple(sorted(set(by_endpoint) - set(ENDPOINTS))):
+        rows = by_endpoint.get(endpoint)
+        if not rows:
+            continue
+        latencies = np.array([seconds for _, _, seconds, _, _ in rows])
+        statuses = Counter(str(status) for _, status, _, _, _ in rows)
+        errors = sum(1 for _, status, _, _, _ in rows if status is None or status >= 400)
+        successes = sum(1 for _, _, _, _, succeeded in rows if succeeded)
+        summary['endpoints'][endpoint] = {
+            'requests': len(rows),
+            'requests_per_second': len(rows) / duration if duration else None,
+            'p50_ms': float(np.percentile(latencies, 50)) * 1000,
+            'p95_ms': float(np.percentile(latencies, 95)) * 1000,
+            'p99_ms': float(np.percentile(latencies, 99)) * 1000,
+            'queries_per_request': sum(q for _, _, _, q, _ in rows) / len(rows),
+            'error_rate': errors / len(rows),
+            'success_rate': successes / len(rows),
+            'statuses': dict(statuses)
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=500, help='students arriving for the lecture')
+    parser.add_argument('--subjects', type=int, default=10, help='subjects starting now, one teacher each')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='worker processes replaying')
+    parser.add_argument('--ramp-seconds', type=float, default=0, help='spread arrivals over this many seconds')
+    parser.add_argument('--frames', type=int, default=12, help='frames sent with each liveness check')
+    parser.add_argument('--database-url', help='empty database to seed (default: SQLite file under /tmp)')
+    parser.add_argument('--json', help='also write the summary to this file')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        # SQLite serializes writers; a generous busy timeout keeps lock waits from surfacing as errors
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'replay.db')}?timeout=30"
+        teacher_ids = seed(make_app(database_url), args.students, args.subjects)
+        
+        frames = liveness_frames(args.frames)
+        processes = max(1, min(args.processes, args.students))
+        # Leave the workers time to boot and warm up before the lecture starts
+        start_at = time.time() + 5 + processes
+        tasks = [
+            (database_url, range(i, args.students, processes), teacher_ids, frames,
+             start_at, args.ramp_seconds, args.students)
+            for i in range(processes)
+        ]
+        
+        print(f'Replaying with {processes} processes...')
+        # Unlike multiprocessing.Pool's daemonic children, executor processes
+        # may start their own liveness frame pool, as gunicorn workers do
+        with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn')) as executor:
+            chunks = list(executor.map(replay_worker, tasks))
+        duration = time.time() - start_at
+    
+    summary = summarize([result for chunk in chunks for result in chunk], duration)
+    summary.update(students=args.students, subjects=args.subjects, processes=processes,
+                   ramp_seconds=args.ramp_seconds)
+    
+    print(f"\n{summary['requests']:,} requests in {duration:.1f}s "
+          f"({summary['requests_per_second']:.1f} req/s)\n")
+    print(f"{'endpoint':<12}{'requests':>10}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'queries':>9}{'errors':>8}{'success':>9}  statuses")
+    for endpoint, stats in summary['endpoints'].items():
+        statuses = ' '.join(f'{status}:{count}' for status, count in sorted(stats['statuses'].items()))
+        print(f"{endpoint:<12}{stats['requests']:>10,}{stats['requests_per_second']:>9.1f}"
+              f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}"
+              f"{stats['queries_per_request']:>9.1f}{stats['error_rate']:>8.1%}{stats['success_rate']:>9.1%}  {statuses}")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Liveness hot paths: eye aspect ratio, blink counting and the full blink detection pipeline."""
+import pytest
+
+from conftest import FRAME_COUNTS, synthetic_landmarks
+
+
+def bench_eye_aspect_ratio(measure):
+    from app.utils.liveness_detection_utils import eye_aspect_ratio
+    
+    eye = synthetic_landmarks(1)[0, 0]
+    measure(eye_aspect_ratio, eye)
+
+
+@pytest.mark.parametrize('frames', FRAME_COUNTS)
+def bench_eye_aspect_ratio_batch(measure, frames):
+    from app.utils.liveness_detection_utils import eye_aspect_ratio_batch
+    
+    landmarks = synthetic_landmarks(frames)
+    ears = measure(eye_aspect_ratio_batch, landmarks, items=frames)
+    assert ears.shape == (frames, 2)
+
+
+@pytest.mark.parametrize('frames', FRAME_COUNTS)
+def bench_count_blinks(measure, frames):
+    from app.utils.liveness_detection_utils import eye_aspect_ratio_batch, count_blinks
+    
+    ear = eye_aspect_ratio_batch(synthetic_landmarks(frames)).mean(axis=1)
+    blinks = measure(count_blinks, ear, 0.3, 2, items=frames)
+    # The final blink is still closed when the sequence ends
+    assert blinks == frames // 10 - 1
+
+
+@pytest.mark.parametrize('frames', FRAME_COUNTS)
+def bench_count_blinks_per_frame(measure, frames):
+    """The per-frame eye aspect ratio and blink state loop that the batch functions replace."""
+    from app.utils.liveness_detection_utils import (
+        eye_aspect_ratio, eye_aspect_ratio_batch, update_blink_state, count_blinks
+    )
+    
+    landmarks = synthetic_landmarks(frames)
+    
+    def per_frame(landmarks):
+        state = {'closed_frames': 0, 'blinks': 0}
+        for frame in landmarks:
+            ear = (eye_aspect_ratio(frame[0]) + eye_aspect_ratio(frame[1])) / 2.0
+            update_blink_state(state, ear, 0.3, 2)
+        return state['blinks']
+    
+    blinks = measure(per_frame, landmarks, items=frames)
+    assert blinks == count_blinks(eye_aspect_ratio_batch(landmarks).mean(axis=1), 0.3, 2)
+
+
+@pytest.mark.parametrize('frames', FRAME_COUNTS)
+def bench_detect_blinks(measure, app, frame_image, frames):
+    from app.utils.liveness_detection_utils import detect_blinks
+    
+    sequence = [frame_image] * frames
+    with app.app_context():
+        measure(detect_blinks, sequence, items=frames)
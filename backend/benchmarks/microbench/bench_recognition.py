@@ -0,0 +1,39 @@
+"""Face recognition hot paths: 1:N gallery search, group matching, comparison and encoding."""
+import numpy as np
+import pytest
+
+from conftest import GALLERY_SIZES, large
+
+
+@pytest.mark.parametrize('size', [large(size) for size in GALLERY_SIZES])
+def bench_gallery_search(measure, galleries, probes, size):
+    gallery = galleries[size]
+    probe = probes[0]
+    matches = measure(gallery.search, probe, 0.6, 3, items=size)
+    assert matches and matches[0][0] == 1
+
+
+@pytest.mark.parametrize('size', [large(size) for size in GALLERY_SIZES])
+def bench_gallery_match_many(measure, galleries, probes, size):
+    # One classroom photo: 32 known faces and 32 strangers
+    gallery = galleries[size]
+    matches = measure(gallery.match_many, probes, 0.6, items=len(probes) * size)
+    assert sum(match is not None for match in matches) >= 32
+
+
+def bench_compare_faces(measure, rng_encodings):
+    from app.utils.face_recognition_utils import compare_faces
+    
+    known, unknown = rng_encodings[:1000], rng_encodings[1000:2000]
+    
+    def compare_all():
+        return [compare_faces(a, b) for a, b in zip(known, unknown)]
+    
+    measure(compare_all, items=len(known))
+
+
+def bench_encode_face(measure, frame_image):
+    from app.utils.face_recognition_utils import encode_face
+    
+    encoding = measure(encode_face, frame_image)
+    assert np.asarray(encoding).shape == (128,)
@@ -0,0 +1,26 @@
+"""PDF report generation for attendance lists of increasing size."""
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import REPORT_SIZES, large, synthetic_report_rows
+
+# Slow sizes run a fixed number of rounds instead of being calibrated
+ROUNDS = {100: None, 10000: 3, 100000: 1}
+
+STUDENT = SimpleNamespace(first_name='Bench', last_name='Student', student_id='B0001')
+
+
+@pytest.mark.parametrize('rows', [large(rows) for rows in REPORT_SIZES])
+def bench_generate_attendance_report(measure, tmp_path, rows):
+    from app.utils.pdf_generator import generate_attendance_report
+    
+    records = synthetic_report_rows(rows)
+    output_path = str(tmp_path / 'report.pdf')
+    
+    def render():
+        return generate_attendance_report(records, user=STUDENT, output_path=output_path, chunk_rows=1000)
+    
+    measure(render, items=rows, rounds=ROUNDS[rows])
+    assert os.path.getsize(output_path) > 0
@@ -0,0 +1,175 @@
+"""
+Shared fixtures for the microbenchmark suite.
+
+Every fixture is built from a fixed seed, so two runs benchmark exactly
+the same inputs and their results are comparable. Each benchmark goes
+through the `measure` fixture, which adds throughput, latency percentiles
+and peak memory to the pytest-benchmark JSON (under extra_info).
+
+Usage (from the backend directory):
+    python -m pytest benchmarks/microbench                        # run and print
+    python -m pytest benchmarks/microbench --benchmark-autosave   # store a baseline
+    python -m pytest benchmarks/microbench --benchmark-compare --regression-threshold 10
+    python -m pytest benchmarks/microbench -m "not large"         # skip the 100k cases
+
+--benchmark-compare compares against the latest stored run (or a given
+run number); with a regression threshold, any benchmark whose median got
+slower by more than that percentage fails the run. The threshold can also
+be set through BENCH_REGRESSION_THRESHOLD.
+"""
+import os
+import sys
+import tracemalloc
+from datetime import date, time, timedelta
+
+import numpy as np
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+
+SEED = 20240101
+ENCODING_DIMENSIONS = 128
+GALLERY_SIZES = (1000, 10000, 100000)
+REPORT_SIZES = (100, 10000, 100000)
+FRAME_COUNTS = (30, 300)
+PERCENTILES = (50, 90, 99)
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--regression-threshold',
+        type=float,
+        default=float(os.environ['BENCH_REGRESSION_THRESHOLD']) if os.environ.get('BENCH_REGRESSION_THRESHOLD') else None,
+        help='with --benchmark-compare, fail if any median regresses by more than this percentage'
+    )
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    # Runs before pytest-benchmark reads its options
+    threshold = config.getoption('regression_threshold')
+    if threshold is not None and not config.getoption('benchmark_compare_fail'):
+        # Built directly: --benchmark-compare-fail only parses whole percentages
+        from pytest_benchmark.utils import PercentageRegressionCheck
+        config.option.benchmark_compare_fail = [PercentageRegressionCheck('median', threshold)]
+
+
+def large(size, threshold=100000):
+    """Wrap a parameter so the biggest sizes carry the 'large' marker."""
+    return pytest.param(size, marks=pytest.mark.large) if size >= threshold else size
+
+
+@pytest.fixture
+def measure(benchmark):
+    """
+    Benchmark a callable and record throughput, latency percentiles and peak memory.
+    
+    Returns a function run(fn, *args, items=1, rounds=None). items is how
+    many units of work one call performs (encodings searched, rows rendered)
+    and turns the median into a throughput. rounds switches to a fixed
+    number of single-iteration rounds for calls too slow to calibrate.
+    Peak memory comes from one extra, untimed call under tracemalloc, so
+    tracing never skews the timings. With --benchmark-disable the call runs
+    once, untimed, and nothing is recorded.
+    """
+    def run(fn, *args, items=1, rounds=None):
+        if rounds:
+            result = benchmark.pedantic(fn, args=args, rounds=rounds, iterations=1)
+        else:
+            result = benchmark(fn, *args)
+        if benchmark.stats is None:
+            return result
+        
+        timings = np.asarray(benchmark.stats.stats.data)
+        median = float(np.median(timings))
+        benchmark.extra_info['items'] = items
+        benchmark.extra_info['throughput_per_second'] = items / median if median else None
+        for p in PERCENTILES:
+            benchmark.extra_info[f'p{p}_seconds'] = float(np.percentile(timings, p))
+        
+        tracemalloc.start()
+        try:
+            fn(*args)
+            benchmark.extra_info['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return result
+    
+    return run
+
+
+@pytest.fixture(scope='session')
+def app():
+    """Application with an in-memory database and the frame pool disabled."""
+    from app import create_app
+    from app.config import Config
+    
+    class BenchConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        LIVENESS_POOL_WORKERS = 0
+    
+    return create_app(BenchConfig)
+
+
+@pytest.fixture(scope='session')
+def rng_encodings():
+    """Seeded unit-scale encodings, enough for the largest gallery plus probes."""
+    rng = np.random.default_rng(SEED)
+    return rng.normal(scale=0.1, size=(max(GALLERY_SIZES) + 64, ENCODING_DIMENSIONS)).astype(np.float32)
+
+
+@pytest.fixture(scope='session')
+def galleries(rng_encodings):
+    """FaceGallery instances keyed by size, built once per session."""
+    from app.utils.face_gallery import FaceGallery
+    
+    built = {}
+    for size in GALLERY_SIZES:
+        gallery = FaceGallery(initial_capacity=size)
+        gallery.load(enumerate(rng_encodings[:size], start=1))
+        built[size] = gallery
+    return built
+
+
+@pytest.fixture(scope='session')
+def probes(rng_encodings):
+    """Probe encodings: near-copies of gallery members mixed with unknown faces."""
+    rng = np.random.default_rng(SEED + 1)
+    known = rng_encodings[:32] + rng.normal(scale=0.01, size=(32, ENCODING_DIMENSIONS)).astype(np.float32)
+    unknown = rng_encodings[-32:]
+    return np.concatenate([known, unknown])
+
+
+@pytest.fixture(scope='session')
+def frame_image():
+    """A seeded 480x640 BGR frame."""
+    return np.random.default_rng(SEED).integers(0, 256, size=(480, 640, 3), dtype=np.uint8)
+
+
+def synthetic_landmarks(n_frames, seed=SEED):
+    """(n_frames, 2, 6, 2) eye landmarks with a blink roughly every 10 frames plus jitter."""
+    rng = np.random.default_rng(seed)
+    open_eye = np.array([(0, 0), (4, -2), (8, -2), (12, 0), (8, 2), (4, 2)], dtype=np.float64)
+    landmarks = np.broadcast_to(open_eye, (n_frames, 2, 6, 2)).copy()
+    closed = (np.arange(n_frames) % 10) >= 8
+    landmarks[closed, :, 1:3, 1] = -0.5
+    landmarks[closed, :, 4:6, 1] = 0.5
+    landmarks += rng.normal(scale=0.05, size=landmarks.shape)
+    return landmarks
+
+
+def synthetic_report_rows(n_rows, seed=SEED):
+    """n_rows ReportRow tuples, newest first, with a fixed status mix."""
+    from app.utils.pdf_generator import ReportRow
+    
+    rng = np.random.default_rng(seed)
+    statuses = np.array(['present', 'present', 'present', 'late', 'absent'])[rng.integers(0, 5, n_rows)]
+    subjects = np.array([f'SUB{i:03d}' for i in range(20)])[rng.integers(0, 20, n_rows)]
+    start = date(2025, 1, 6)
+    return [
+        ReportRow(start + timedelta(days=(n_rows - i) // 4), time(9 + i % 4, 0), str(subjects[i]),
+                  str(statuses[i]), 'face')
+        for i in range(n_rows)
+    ]
@@ -0,0 +1,116 @@
+"""
+Benchmark: cold-start time and memory of the backend package.
+
+Starts a fresh interpreter per run with `python -X importtime`, imports the
+app package and calls create_app(), then reports the median import and
+create_app() times, peak resident memory and the slowest imports. The
+results are checked against the tracked budget in startup_budget.json,
+which also lists heavy modules that must not be imported at boot; the
+script exits non-zero if any limit is exceeded, so it can gate CI.
+
+Usage (from the backend directory):
+    python benchmarks/startup.py [--runs 5] [--top 15] [--budget benchmarks/startup_budget.json]
+
+The child process runs against a throwaway SQLite database, so the
+benchmark never touches the development database.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET = os.path.join(BACKEND_DIR, 'benchmarks', 'startup_budget.json')
+
+CHILD = r'''
+import json, resource, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    'import_seconds': imported - started,
+    'create_app_seconds': created - imported,
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    'max_rss_mb': rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024,
+    'modules': sorted(sys.modules),
+}))
+'''
+
+
+def run_once(database_url):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['importtime'] = parse_importtime(proc.stderr)
+    return result
+
+
+def parse_importtime(stderr):
+    """Return (cumulative_us, self_us, module) for every line of -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to start')
+    parser.add_argument('--top', type=int, default=15, help='slowest imports to list')
+    parser.add_argument('--budget', default=DEFAULT_BUDGET, help='budget file to check against')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'startup.db')}"
+        runs = [run_once(database_url) for _ in range(args.runs)]
+
+    measured = {
+        'import_seconds': statistics.median(r['import_seconds'] for r in runs),
+        'create_app_seconds': statistics.median(r['create_app_seconds'] for r in runs),
+        'max_rss_mb': max(r['max_rss_mb'] for r in runs),
+    }
+
+    print(f'Median of {args.runs} cold starts:')
+    print(f"  import app        {measured['import_seconds'] * 1000:8.1f} ms")
+    print(f"  create_app()      {measured['create_app_seconds'] * 1000:8.1f} ms")
+    print(f"  peak RSS          {measured['max_rss_mb']:8.1f} MB")
+
+    print('\nSlowest imports (cumulative, last run):')
+    for cumulative_us, self_us, name in sorted(runs[-1]['importtime'], reverse=True)[:args.top]:
+        print(f'  {cumulative_us / 1000:8.1f} ms  {name.strip()}')
+
+    with open(args.budget) as f:
+        budget = json.load(f)
+
+    failures = []
+    for key, value in measured.items():
+        limit = budget.get(key)
+        if limit is not None and value > limit:
+            failures.append(f'{key} = {value:.3f} exceeds budget {limit}')
+    loaded = set(runs[-1]['modules'])
+    for module in budget.get('forbidden_modules', []):
+        if module in loaded:
+            failures.append(f'{module} is imported at startup')
+
+    if failures:
+        print('\nStartup budget exceeded:')
+        for failure in failures:
+            print(f'  {failure}')
+        sys.exit(1)
+    print(f'\nWithin budget ({os.path.relpath(args.budget, BACKEND_DIR)}).')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import multiprocessing
+import os
+import tempfile
+
+# Production server configuration: gunicorn -c gunicorn.conf.py
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '5001')}")
+
+# Import the app (and preload models, gallery and timetable) once in the
+# master; forked workers share that memory copy-on-write
+preload_app = True
+
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# Each worker starts its own pools on top of this, so their sizes multiply
+# by the worker count and default to small fixed numbers (see app/config.py):
+#   LIVENESS_POOL_WORKERS  frame-extraction processes, default 2
+#   COHORT_REPORT_WORKERS  PDF-rendering processes per cohort report job, default 2
+#   PASSWORD_HASH_WORKERS  bcrypt threads, default 2; with PASSWORD_HASH_QUEUE_LIMIT
+#                          it must stay below GUNICORN_THREADS, or a login storm
+#                          ties up every request thread before any call is refused
+# With the default worker count, a pool of N adds about N * 2 * cpu_count
+# processes or threads to the host; raise GUNICORN_WORKERS or a pool, not both.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))  # Only used by the gthread worker class
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+# Workers share their /metrics counters through snapshot files here
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'attendance-metrics'))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    # Counters start from zero with each server run
+    from app.utils.metrics import clear_metrics_dir
+    clear_metrics_dir(os.environ['METRICS_DIR'])
+
+
+def post_fork(server, worker):
+    from app.utils.warmup import reset_after_fork
+    reset_after_fork(worker.app.wsgi())
+
+
+def post_worker_init(worker):
+    # Runs in the worker before it starts accepting connections
+    from app.utils.warmup import warm_up_worker
+    warm_up_worker(worker.wsgi)
+
+
+def worker_exit(server, worker):
+    # Leave the exiting worker's final counts for the others to merge
+    from app.utils.metrics import flush
+    app = getattr(worker, 'wsgi', None)  # Unset if the worker died while booting
+    if app is not None:
+        with app.app_context():
+            flush()
@@ -0,0 +1,67 @@
+"""store face encodings as binary float32
+
+Revision ID: 8c4d2b7e91a3
+Revises: 3f9a1c2e7b10
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import numpy as np
+import json
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4d2b7e91a3'
+down_revision = '3f9a1c2e7b10'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+users = sa.table(
+    'users',
+    sa.column('id', sa.Integer),
+    sa.column('face_encoding', sa.Text),
+    sa.column('face_encoding_blob', sa.LargeBinary),
+)
+
+
+def _convert(connection, source_column, convert):
+    """Rewrite encodings from one column into the other in id-ordered batches."""
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(users.c.id, source_column)
+            .where(source_column.isnot(None), users.c.id > last_id)
+            .order_by(users.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        for user_id, value in rows:
+            connection.execute(
+                users.update().where(users.c.id == user_id).values(**convert(value))
+            )
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('face_encoding_blob', sa.LargeBinary(), nullable=True))
+
+    # Move existing JSON encodings into the binary column and drop the text copy
+    _convert(op.get_bind(), users.c.face_encoding, lambda text: {
+        'face_encoding_blob': np.asarray(json.loads(text), dtype='<f4').tobytes(),
+        'face_encoding': None,
+    })
+
+
+def downgrade():
+    _convert(op.get_bind(), users.c.face_encoding_blob, lambda blob: {
+        'face_encoding': json.dumps(np.frombuffer(blob, dtype='<f4').tolist()),
+        'face_encoding_blob': None,
+    })
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('face_encoding_blob')
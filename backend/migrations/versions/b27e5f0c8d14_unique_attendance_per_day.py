@@ -0,0 +1,32 @@
+"""unique attendance per user, subject and day
+
+Revision ID: b27e5f0c8d14
+Revises: 8c4d2b7e91a3
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b27e5f0c8d14'
+down_revision = '8c4d2b7e91a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the earliest record of any duplicates left by the old read-then-write check
+    op.execute("""
+        DELETE FROM attendances
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM attendances GROUP BY user_id, subject_id, date
+        )
+    """)
+    op.create_index('uq_attendances_user_subject_date', 'attendances',
+                    ['user_id', 'subject_id', 'date'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_attendances_user_subject_date', table_name='attendances')
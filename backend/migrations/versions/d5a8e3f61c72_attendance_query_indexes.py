@@ -0,0 +1,28 @@
+"""composite indexes for attendance queries
+
+Revision ID: d5a8e3f61c72
+Revises: b27e5f0c8d14
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a8e3f61c72'
+down_revision = 'b27e5f0c8d14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_attendances_user_date_time', 'attendances',
+                    ['user_id', 'date', 'time'], unique=False)
+    op.create_index('ix_attendances_subject_date', 'attendances',
+                    ['subject_id', 'date', 'user_id', 'status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_attendances_subject_date', table_name='attendances')
+    op.drop_index('ix_attendances_user_date_time', table_name='attendances')
@@ -0,0 +1,48 @@
+"""daily attendance rollup counters
+
+Revision ID: e9b3c7a1f045
+Revises: d5a8e3f61c72
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9b3c7a1f045'
+down_revision = 'd5a8e3f61c72'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_app() runs db.create_all() on boot, which may already have created
+    # the table (without data) before this migration runs
+    if 'attendance_daily_rollups' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table('attendance_daily_rollups',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('subject_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['subject_id'], ['subjects.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'subject_id', 'date', 'status')
+        )
+        op.create_index('ix_attendance_daily_rollups_user_date', 'attendance_daily_rollups',
+                        ['user_id', 'date'], unique=False)
+
+    # Backfill from existing attendance; `flask rollups rebuild` does the same later
+    op.execute('DELETE FROM attendance_daily_rollups')
+    op.execute("""
+        INSERT INTO attendance_daily_rollups (user_id, subject_id, date, status, count)
+        SELECT user_id, subject_id, date, status, COUNT(*)
+        FROM attendances
+        GROUP BY user_id, subject_id, date, status
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_attendance_daily_rollups_user_date', table_name='attendance_daily_rollups')
+    op.drop_table('attendance_daily_rollups')
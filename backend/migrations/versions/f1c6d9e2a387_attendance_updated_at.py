@@ -0,0 +1,28 @@
+"""track when attendance rows change
+
+Revision ID: f1c6d9e2a387
+Revises: e9b3c7a1f045
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c6d9e2a387'
+down_revision = 'e9b3c7a1f045'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('attendances') as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.execute('UPDATE attendances SET updated_at = created_at')
+
+
+def downgrade():
+    with op.batch_alter_table('attendances') as batch_op:
+        batch_op.drop_column('updated_at')
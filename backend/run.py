@@ -1,5 +1,7 @@
+import os
 from app import create_app
 
+# Development server only; in production run gunicorn -c gunicorn.conf.py
 if __name__ == '__main__':
     app = create_app()
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5001)), debug=app.config['DEBUG'])
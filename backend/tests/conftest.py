@@ -0,0 +1,63 @@
+import base64
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.config import Config
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        BCRYPT_LOG_ROUNDS = 4
+        LIVENESS_POOL_WORKERS = 0
+        METRICS_DIR = None
+        UPLOAD_FOLDER = str(tmp_path / 'uploads')
+        REPORT_FOLDER = str(tmp_path / 'uploads' / 'reports')
+        PROFILE_DIR = str(tmp_path / 'profiles')
+    
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """Create a user and return (user_id, auth headers)."""
+    from flask_jwt_extended import create_access_token
+    from app.models.user import User
+    
+    def make_user(role='student', **fields):
+        with app.app_context():
+            count = User.query.count()
+            user = User(email=f'{role}{count}@test.local', password='test-password', first_name=role.title(),
+                        last_name=str(count), role=role, **fields)
+            db.session.add(user)
+            db.session.commit()
+            token = create_access_token(identity=user.id)
+            return user.id, {'Authorization': f'Bearer {token}'}
+    
+    return make_user
+
+
+def encode_frame(brightness, size=64):
+    """Base64 JPEG of a flat grey frame."""
+    import cv2
+    import numpy as np
+    
+    ok, encoded = cv2.imencode('.jpg', np.full((size, size, 3), brightness, dtype=np.uint8))
+    return base64.b64encode(encoded.tobytes()).decode('ascii')
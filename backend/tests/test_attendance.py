@@ -0,0 +1,21 @@
+import pytest
+
+
+@pytest.mark.parametrize('body', ['null', '[]', 'not json'])
+def test_group_attendance_without_an_object_body(client, make_user, body):
+    _, headers = make_user('teacher')
+    
+    response = client.post('/api/attendance/group', headers=headers, data=body, content_type='application/json')
+    
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Subject ID is required'
+
+
+@pytest.mark.parametrize('body', ['null', '[]', 'not json'])
+def test_bulk_attendance_without_an_object_body(client, make_user, body):
+    _, headers = make_user('teacher')
+    
+    response = client.post('/api/attendance/bulk', headers=headers, data=body, content_type='application/json')
+    
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Subject ID is required'
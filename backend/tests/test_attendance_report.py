@@ -0,0 +1,82 @@
+import base64
+from datetime import date, time, timedelta
+
+import pytest
+
+from app import db
+from app.models.subject import Subject
+from app.utils.attendance_utils import insert_attendances
+
+SUBJECTS = 5
+DAYS = 5
+
+
+@pytest.fixture
+def student(app, make_user):
+    """A student with one attendance per subject and day, several sharing a date and time."""
+    user_id, headers = make_user()
+    with app.app_context():
+        subjects = [Subject(name=f'Subject {i}', code=f'SUB{i}') for i in range(SUBJECTS)]
+        db.session.add_all(subjects)
+        db.session.flush()
+        insert_attendances([
+            {'user_id': user_id, 'subject_id': subject.id, 'date': date(2025, 3, 1) + timedelta(days=day),
+             'time': time(9, 0) if i % 2 else time(11, 30), 'status': 'present',
+             'verification_method': 'face', 'liveness_verified': True}
+            for day in range(DAYS) for i, subject in enumerate(subjects)
+        ])
+        db.session.commit()
+    return user_id, headers
+
+
+def test_cursor_pages_have_no_duplicates_or_gaps(client, student):
+    _, headers = student
+    seen = []
+    cursor = None
+    while True:
+        params = {'limit': 7}
+        if cursor:
+            params['cursor'] = cursor
+        response = client.get('/api/attendance/report', headers=headers, query_string=params)
+        assert response.status_code == 200
+        page = response.get_json()
+        seen.extend(row['id'] for row in page['attendances'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    
+    full = client.get('/api/attendance/report', headers=headers, query_string={'limit': 100}).get_json()
+    assert len(seen) == len(set(seen)) == SUBJECTS * DAYS
+    assert seen == [row['id'] for row in full['attendances']]
+
+
+@pytest.mark.parametrize('cursor', ['not-base64!', base64.urlsafe_b64encode(b'[1, 2]').decode(),
+                                    base64.urlsafe_b64encode(b'["2025-13-01", "09:00:00", 1]').decode()])
+def test_malformed_cursor_is_rejected(client, student, cursor):
+    _, headers = student
+    
+    response = client.get('/api/attendance/report', headers=headers, query_string={'cursor': cursor})
+    
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid cursor'
+
+
+def test_fields_projection(client, student):
+    _, headers = student
+    
+    response = client.get('/api/attendance/report', headers=headers,
+                          query_string={'fields': 'subject_id,status', 'limit': 3, 'include_total': 'true'})
+    
+    page = response.get_json()
+    assert response.status_code == 200
+    assert page['total'] == SUBJECTS * DAYS
+    assert [set(row) for row in page['attendances']] == [{'subject_id', 'status'}] * 3
+    assert page['next_cursor'] is not None
+
+
+def test_unknown_field_is_rejected(client, student):
+    _, headers = student
+    
+    response = client.get('/api/attendance/report', headers=headers, query_string={'fields': 'status,password_hash'})
+    
+    assert response.status_code == 400
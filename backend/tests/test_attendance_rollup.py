@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models.attendance import Attendance
+from app.models.attendance_rollup import AttendanceDailyRollup
+from app.models.subject import Subject
+from app.utils.attendance_utils import insert_attendances
+
+
+@pytest.fixture
+def subject_id(app, make_user):
+    teacher_id, _ = make_user('teacher')
+    with app.app_context():
+        subject = Subject(name='Chemistry', code='CHM101', teacher_id=teacher_id)
+        db.session.add(subject)
+        db.session.commit()
+        return subject.id
+
+
+def assert_consistent():
+    with db.engine.connect() as connection:
+        assert AttendanceDailyRollup.find_inconsistencies(connection) == {'missing': [], 'unexpected': []}
+
+
+def counters():
+    return {
+        (row.user_id, row.subject_id, row.date, row.status): row.count
+        for row in AttendanceDailyRollup.query.filter(AttendanceDailyRollup.count != 0)
+    }
+
+
+def add_attendance(user_id, subject_id, status='present'):
+    attendance = Attendance(user_id=user_id, subject_id=subject_id, status=status)
+    db.session.add(attendance)
+    db.session.commit()
+    return attendance
+
+
+def test_insert(app, make_user, subject_id):
+    user_id, _ = make_user()
+    with app.app_context():
+        attendance = add_attendance(user_id, subject_id)
+        
+        assert counters() == {(user_id, subject_id, attendance.date, 'present'): 1}
+        assert_consistent()
+
+
+def test_status_change_on_an_expired_instance(app, make_user, subject_id):
+    user_id, _ = make_user()
+    with app.app_context():
+        attendance = add_attendance(user_id, subject_id)
+        # The commit expired the instance, so the old status must be loaded before the overwrite
+        attendance.status = 'late'
+        db.session.commit()
+        
+        assert counters() == {(user_id, subject_id, attendance.date, 'late'): 1}
+        assert_consistent()
+
+
+def test_date_change(app, make_user, subject_id):
+    user_id, _ = make_user()
+    with app.app_context():
+        attendance = add_attendance(user_id, subject_id)
+        yesterday = attendance.date - timedelta(days=1)
+        attendance.date = yesterday
+        db.session.commit()
+        
+        assert counters() == {(user_id, subject_id, yesterday, 'present'): 1}
+        assert_consistent()
+
+
+def test_delete(app, make_user, subject_id):
+    user_id, _ = make_user()
+    with app.app_context():
+        attendance = add_attendance(user_id, subject_id, status='absent')
+        db.session.delete(attendance)
+        db.session.commit()
+        
+        assert counters() == {}
+        assert_consistent()
+
+
+def test_insert_attendances_skips_duplicates(app, make_user, subject_id):
+    first_id, _ = make_user()
+    second_id, _ = make_user()
+    today, now = datetime.utcnow().date(), datetime.utcnow().time()
+    
+    def row(user_id, status):
+        return {'user_id': user_id, 'subject_id': subject_id, 'date': today, 'time': now, 'status': status,
+                'verification_method': 'manual', 'liveness_verified': False}
+    
+    with app.app_context():
+        add_attendance(first_id, subject_id)
+        inserted = insert_attendances([row(first_id, 'late'), row(second_id, 'present')])
+        db.session.commit()
+        
+        assert inserted == {(second_id, subject_id, today)}
+        assert counters() == {(first_id, subject_id, today, 'present'): 1,
+                              (second_id, subject_id, today, 'present'): 1}
+        assert_consistent()
+
+
+def test_check_and_rebuild_commands(app, make_user, subject_id):
+    user_id, _ = make_user()
+    runner = app.test_cli_runner()
+    with app.app_context():
+        add_attendance(user_id, subject_id)
+    
+    result = runner.invoke(args=['rollups', 'check'])
+    assert result.exit_code == 0
+    assert 'consistent' in result.output
+    
+    with app.app_context():
+        db.session.execute(AttendanceDailyRollup.__table__.delete())
+        db.session.commit()
+    
+    result = runner.invoke(args=['rollups', 'check'])
+    assert result.exit_code == 1
+    assert 'missing or wrong counter' in result.output
+    
+    result = runner.invoke(args=['rollups', 'rebuild'])
+    assert result.exit_code == 0
+    assert 'Rebuilt 1 rollup rows.' in result.output
+    
+    result = runner.invoke(args=['rollups', 'check'])
+    assert result.exit_code == 0
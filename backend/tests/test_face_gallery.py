@@ -0,0 +1,77 @@
+import time
+
+import numpy as np
+import pytest
+
+from app import db
+from app.models.user import User
+from app.utils import face_gallery as gallery_module
+from app.utils.face_gallery import get_face_gallery
+
+MAX_AGE = 0.05
+
+
+@pytest.fixture(autouse=True)
+def fresh_gallery(monkeypatch):
+    monkeypatch.setattr(gallery_module, 'face_gallery', gallery_module.FaceGallery())
+
+
+def encoding(seed):
+    return np.random.default_rng(seed).normal(scale=0.1, size=128).astype(np.float32)
+
+
+def register(app, make_user, seed):
+    """Register a face directly in the database, as another worker would."""
+    user_id, _ = make_user()
+    with app.app_context():
+        db.session.get(User, user_id).set_face_encoding(encoding(seed))
+        db.session.commit()
+    return user_id
+
+
+def matches(seed):
+    return [user_id for user_id, _ in get_face_gallery(MAX_AGE).search(encoding(seed), tolerance=0.1)]
+
+
+def test_registration_elsewhere_is_picked_up_after_max_age(app, make_user):
+    first = register(app, make_user, 1)
+    with app.app_context():
+        assert matches(1) == [first]
+        
+        second = register(app, make_user, 2)
+        # Not synced until max_age has passed
+        assert get_face_gallery(60).search(encoding(2), tolerance=0.1) == []
+        
+        time.sleep(MAX_AGE * 2)
+        assert matches(2) == [second]
+        assert matches(1) == [first]
+
+
+def test_cleared_encoding_is_removed_after_max_age(app, make_user):
+    first = register(app, make_user, 1)
+    second = register(app, make_user, 2)
+    with app.app_context():
+        assert matches(1) == [first]
+        
+        user = db.session.get(User, first)
+        user.face_encoding_blob = None
+        db.session.commit()
+        time.sleep(MAX_AGE * 2)
+        
+        assert matches(1) == []
+        assert matches(2) == [second]
+
+
+def test_deleted_user_is_removed_after_max_age(app, make_user):
+    first = register(app, make_user, 1)
+    second = register(app, make_user, 2)
+    with app.app_context():
+        assert len(get_face_gallery(MAX_AGE)) == 2
+        
+        db.session.delete(db.session.get(User, first))
+        db.session.commit()
+        time.sleep(MAX_AGE * 2)
+        
+        assert matches(1) == []
+        assert matches(2) == [second]
+        assert len(get_face_gallery(MAX_AGE)) == 1
@@ -0,0 +1,20 @@
+import multiprocessing
+
+import numpy as np
+from flask import Flask
+
+
+def extract_in_daemon(frame_count):
+    from app.utils.frame_pool import extract_landmarks
+    
+    app = Flask(__name__)
+    app.config.update(LIVENESS_POOL_MIN_FRAMES=8, LIVENESS_POOL_TIMEOUT_SECONDS=5)
+    frames = [np.full((32, 32, 3), 200, dtype=np.uint8)] * frame_count
+    with app.app_context():
+        return len(extract_landmarks(frames, workers=2))
+
+
+def test_extract_landmarks_in_daemonic_process_stays_in_process():
+    # multiprocessing.Pool children are daemonic and may not start the frame pool
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        assert pool.apply(extract_in_daemon, (12,)) == 12
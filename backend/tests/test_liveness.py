@@ -0,0 +1,38 @@
+from conftest import encode_frame
+
+OPEN = 200
+CLOSED = 0
+
+
+def verify(client, headers, pattern):
+    frames = [encode_frame(OPEN if state == 'o' else CLOSED) for state in pattern]
+    return client.post('/api/liveness/verify', headers=headers, json={'method': 'blink', 'frames': frames})
+
+
+def test_blinking_sequence_is_live(client, make_user):
+    _, headers = make_user()
+    
+    response = verify(client, headers, 'ooccooccoooo')
+    
+    assert response.status_code == 200
+    assert response.get_json()['blink_count'] == 2
+    assert response.get_json()['is_live'] is True
+
+
+def test_open_eyes_sequence_is_not_live(client, make_user):
+    _, headers = make_user()
+    
+    response = verify(client, headers, 'o' * 12)
+    
+    assert response.status_code == 200
+    assert response.get_json()['blink_count'] == 0
+    assert response.get_json()['is_live'] is False
+
+
+def test_short_closure_is_not_a_blink(client, make_user):
+    _, headers = make_user()
+    
+    # One closed frame is below BLINK_CONSEC_FRAMES
+    response = verify(client, headers, 'oocoooccoooo')
+    
+    assert response.get_json()['blink_count'] == 1
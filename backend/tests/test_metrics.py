@@ -0,0 +1,59 @@
+import glob
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from app.utils import metrics
+
+
+def exited_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def write_snapshot(directory, pid, requests):
+    histogram = metrics.REQUEST_QUERIES.snapshot()
+    histogram['series'] = [[['GET', '/api/test'], [requests] + [0] * len(metrics.QUERY_COUNT_BUCKETS), 0.0]]
+    with open(os.path.join(directory, f'metrics-{pid}-1.json'), 'w') as f:
+        json.dump({'pid': pid, 'metrics': {metrics.REQUEST_QUERIES.name: histogram}}, f)
+
+
+def test_collect_folds_exited_workers_once(app, tmp_path):
+    directory = str(tmp_path / 'metrics')
+    os.makedirs(directory)
+    app.config['METRICS_DIR'] = directory
+    write_snapshot(directory, exited_pid(), 3)
+    write_snapshot(directory, exited_pid(), 4)
+    
+    with app.app_context():
+        for _ in range(2):
+            merged = metrics.collect()
+            counts, _ = merged['http_request_db_queries']['series'][('GET', '/api/test')]
+            assert counts[0] == 7
+    
+    names = sorted(os.path.basename(path) for path in glob.glob(os.path.join(directory, 'metrics-*.json')))
+    assert names == [metrics._snapshot_name, metrics.EXITED_NAME]
+
+
+def test_concurrent_flushes_do_not_collide(app, tmp_path):
+    app.config['METRICS_DIR'] = str(tmp_path / 'metrics')
+    errors = []
+    
+    def flush_repeatedly():
+        with app.app_context():
+            try:
+                for _ in range(50):
+                    metrics.flush()
+            except OSError as e:
+                errors.append(e)
+    
+    threads = [threading.Thread(target=flush_repeatedly) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert errors == []
@@ -0,0 +1,16 @@
+def test_metrics_open_without_a_token(app, client):
+    response = client.get('/metrics')
+    
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+
+
+def test_metrics_token_is_required_when_set(app, client):
+    app.config['METRICS_TOKEN'] = 'scrape-secret'
+    
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+    
+    assert response.status_code == 200
+    assert 'http_request_duration_seconds' in response.get_data(as_text=True)
@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+from app.utils import password_hashing
+
+
+@pytest.fixture
+def occupy(app):
+    """Return occupy(n), which admits n hash calls that block until the test ends."""
+    release = threading.Event()
+    threads = []
+    
+    def block():
+        with app.app_context():
+            password_hashing._run('hash', release.wait)
+    
+    def occupy(count):
+        for _ in range(count):
+            thread = threading.Thread(target=block)
+            thread.start()
+            threads.append(thread)
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            metrics = password_hashing.hashing_metrics()
+            if metrics['running'] + metrics['queue_depth'] >= len(threads):
+                break
+            time.sleep(0.01)
+    
+    yield occupy
+    release.set()
+    for thread in threads:
+        thread.join()
+
+
+def login(client, email='student0@test.local'):
+    return client.post('/api/auth/login', json={'email': email, 'password': 'test-password'})
+
+
+def test_default_admission_leaves_request_threads_free(app, client, make_user, occupy):
+    make_user()
+    # The default server runs 4 request threads per worker
+    occupy(app.config['PASSWORD_HASH_WORKERS'] + app.config['PASSWORD_HASH_QUEUE_LIMIT'])
+    assert app.config['PASSWORD_HASH_WORKERS'] + app.config['PASSWORD_HASH_QUEUE_LIMIT'] < 4
+    
+    response = login(client)
+    
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(app.config['PASSWORD_HASH_RETRY_AFTER_SECONDS'])
+
+
+def test_login_is_refused_when_the_expected_wait_is_too_long(app, client, make_user, occupy, monkeypatch):
+    make_user()
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE_LIMIT=10, PASSWORD_HASH_MAX_WAIT_SECONDS=0.5)
+    monkeypatch.setattr(password_hashing, '_average_seconds', 1.0)
+    occupy(1)
+    
+    response = login(client)
+    
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
+
+
+def test_hash_and_verify_round_trip(app):
+    with app.app_context():
+        password_hash = password_hashing.hash_password('correct horse')
+        
+        assert password_hashing.hash_rounds(password_hash) == app.config['BCRYPT_LOG_ROUNDS']
+        assert password_hashing.verify_password('correct horse', password_hash)
+        assert not password_hashing.verify_password('wrong horse', password_hash)
+
+
+def test_login_rehashes_at_the_new_cost(app, client, make_user):
+    from app import db
+    from app.models.user import User
+    
+    user_id, _ = make_user()
+    app.config['BCRYPT_LOG_ROUNDS'] = 5
+    
+    response = login(client)
+    
+    assert response.status_code == 200
+    with app.app_context():
+        password_hash = db.session.get(User, user_id).password_hash
+        assert password_hashing.hash_rounds(password_hash) == 5
+        assert password_hashing.verify_password('test-password', password_hash)
+
+
+def test_hashing_metrics_endpoint(app, client, make_user, occupy):
+    _, student_headers = make_user()
+    _, admin_headers = make_user('admin')
+    login(client)
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE_LIMIT=0)
+    occupy(1)
+    login(client)
+    
+    assert client.get('/api/auth/hashing-metrics', headers=student_headers).status_code == 403
+    response = client.get('/api/auth/hashing-metrics', headers=admin_headers)
+    
+    assert response.status_code == 200
+    metrics = response.get_json()
+    assert set(metrics) == {'operations', 'queue_depth', 'running', 'queue_depth_max',
+                            'queue_wait_seconds_sum', 'rejected'}
+    assert metrics['operations']['verify']['count'] >= 1
+    assert metrics['operations']['hash']['count'] >= 2
+    assert set(metrics['operations']['verify']['buckets']) == {str(b) for b in password_hashing.LATENCY_BUCKETS}
+    assert metrics['running'] == 1
+    assert metrics['rejected'] >= 1
@@ -0,0 +1,33 @@
+import threading
+import time
+
+from app.utils.report_jobs import DONE, get_job, submit_report_job
+
+
+def test_identical_concurrent_submissions_build_once(app):
+    builds = []
+    start = threading.Barrier(8)
+    
+    def build_report(output_path):
+        builds.append(output_path)
+        time.sleep(0.1)
+        with open(output_path, 'wb') as f:
+            f.write(b'%PDF-1.4\n')
+    
+    def submit():
+        with app.app_context():
+            start.wait()
+            submit_report_job('same-filters', 1, build_report)
+    
+    threads = [threading.Thread(target=submit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    with app.app_context():
+        deadline = time.monotonic() + 5
+        while get_job('same-filters')['status'] != DONE and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert get_job('same-filters')['status'] == DONE
+    assert len(builds) == 1
@@ -0,0 +1,60 @@
+from datetime import datetime, time, timedelta
+from types import SimpleNamespace
+
+from app.utils.timetable import TimetableIndex, local_now
+
+# 2024-01-01 is a Monday
+MONDAY = datetime(2024, 1, 1)
+
+
+def subject(subject_id, days, start, end, teacher_id=1):
+    return SimpleNamespace(id=subject_id, teacher_id=teacher_id, schedule_days=days,
+                           start_time=start, end_time=end)
+
+
+def test_session_crossing_midnight_belongs_to_its_start_day():
+    index = TimetableIndex()
+    index.load([subject(1, '1', time(23, 30), time(1, 0))])
+    
+    assert [s.subject_id for s in index.in_session(MONDAY.replace(hour=23, minute=45))] == [1]
+    assert [s.subject_id for s in index.in_session(MONDAY + timedelta(days=1, minutes=30))] == [1]
+    assert index.in_session(MONDAY + timedelta(days=1, hours=1, minutes=30)) == []
+    # Sunday night into Monday is not scheduled
+    assert index.in_session(MONDAY.replace(minute=30)) == []
+
+
+def test_attendance_window_crossing_midnight():
+    index = TimetableIndex()
+    index.load([subject(1, '7', time(23, 55), time(23, 59))])
+    sunday = MONDAY - timedelta(days=1)
+    
+    after_midnight = MONDAY.replace(minute=5)
+    assert [s.subject_id for s in index.open_for_attendance(after_midnight, window=15)] == [1]
+    assert index.attendance_window_open(1, after_midnight, window=15) is True
+    assert index.attendance_window_open(1, MONDAY.replace(minute=20), window=15) is False
+    assert index.attendance_window_open(1, sunday.replace(hour=23, minute=56), window=15) is True
+
+
+def test_mark_attendance_uses_app_timezone(app, client, make_user):
+    from app import db
+    from app.models.subject import Subject
+    
+    # Kolkata is UTC+05:30, so a session starting now there is hours away in UTC
+    app.config['APP_TIMEZONE'] = 'Asia/Kolkata'
+    teacher_id, _ = make_user('teacher')
+    _, headers = make_user()
+    start = local_now('Asia/Kolkata') - timedelta(minutes=1)
+    with app.app_context():
+        db.session.add(Subject(name='Physics', code='PHY101', teacher_id=teacher_id,
+                               schedule_days=str(start.isoweekday()), start_time=start.time(),
+                               end_time=(start + timedelta(minutes=60)).time()))
+        db.session.commit()
+    
+    response = client.post('/api/attendance/mark', headers=headers, json={'teacher_id': teacher_id})
+    
+    assert response.status_code == 201
+    
+    app.config['APP_TIMEZONE'] = 'UTC'
+    response = client.post('/api/attendance/mark', headers=headers, json={'teacher_id': teacher_id})
+    
+    assert response.status_code == 404
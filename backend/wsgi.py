@@ -0,0 +1,7 @@
+from app import create_app
+from app.utils.warmup import preload
+
+# Production entry point: gunicorn imports this once in the master (see
+# gunicorn.conf.py), so the preloaded state is shared with every worker
+app = create_app()
+preload(app)